@@ -0,0 +1,90 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Allocation Budget
+
+Runs every synthetic ROM under tracemalloc and checks what a steady-state
+frame allocates, both with and without pixels produced:
+
+ | retained : bytes still allocated after the frame, per frame (leaks, growing caches)
+ | peak     : highest traced memory during the frame above its start (churn)
+
+    python -m Benchmark.alloc
+    python -m Benchmark.alloc --frames 4 --retained 0 --peak 2048
+
+The exit status is 1 if any ROM goes over the budget. tracemalloc makes the
+emulator a lot slower, keep the frame count low.
+
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+from Benchmark.roms import Corpus, MakeBus
+
+# Default budget per frame. CPython still creates transient ints above the
+# small int cache (clock counters, bank offsets), the peak allows for those.
+RETAINED_BUDGET = 1024
+PEAK_BUDGET = 4 * 1024
+
+
+def MeasureFrames(bus, frames: int = 2, warmup: int = 2) -> (float, int):
+    """Allocation of steady-state frames
+
+    :param bus: an emulator with an inserted cartridge, already reset
+    :param frames: frames measured
+    :param warmup: frames run first, boot code and lazily built tables are not counted
+    :return: retained bytes per frame, highest peak of a frame
+    """
+    for _ in range(warmup):
+        bus.clockFrame()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(frames):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            bus.clockFrame()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return retained / max(frames, 1), peak
+
+
+def CheckBudget(frames: int = 2, retained: int = RETAINED_BUDGET, peak: int = PEAK_BUDGET, roms: dict = None) -> list:
+    """Measure every ROM against the budget
+
+    :param roms: {name: image}, the synthetic ROMs by default
+    :return: [(name, retained per frame, peak, over budget)]
+    """
+    rows = []
+    for name, image in (roms or Corpus()).items():
+        for render in (False, True):
+            bus = MakeBus(image)
+            bus.ppu.bRender = render
+            nRetained, nPeak = MeasureFrames(bus, frames)
+            rows.append((name + (".render" if render else ""), nRetained, nPeak,
+                         nRetained > retained or nPeak > peak))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="RingNES per frame allocation budget")
+    parser.add_argument("--frames", type=int, default=2, help="frames measured per ROM")
+    parser.add_argument("--retained", type=int, default=RETAINED_BUDGET, help="bytes a frame may leave allocated")
+    parser.add_argument("--peak", type=int, default=PEAK_BUDGET, help="bytes a frame may have allocated at once")
+    args = parser.parse_args(argv)
+
+    rows = CheckBudget(args.frames, args.retained, args.peak)
+    for name, nRetained, nPeak, over in rows:
+        print("{:<24} {:>10.0f} B retained {:>8} B peak{}".format(name, nRetained, nPeak, "  OVER BUDGET" if over else ""))
+    return 1 if any(row[3] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Mini Assembler
+
+A two pass 6502 assembler for the synthetic benchmark and test ROMs. The
+opcodes come from the Cpu6502 instruction table, so the assembler speaks
+exactly the instruction set the emulator decodes.
+
+ | label:              : defines label at the current address
+ | NAME = expr         : defines a constant
+ | .org expr           : moves the current address
+ | .byte expr, ...     : raw bytes
+ | .word expr, ...     : little endian words
+ | .fill count, expr   : count copies of a byte
+ | ; comment
+
+Operands:
+
+ | (none) / A          : implied / accumulator
+ | #expr               : immediate
+ | expr / expr,X / expr,Y        : zero page or absolute (zero page if the value is known and < $100)
+ | (expr) / (expr,X) / (expr),Y  : indirect
+ | expr                : relative for branches
+
+Expressions are terms joined by + and -. A term is $hex, %binary, decimal,
+'c', a label or constant, * for the current address, optionally prefixed
+with < (low byte) or > (high byte).
+
+"""
+
+import re
+
+from cpu import Cpu6502
+
+"""Opcode Table
+
+(mnemonic, addressing mode) -> opcode, built from Cpu6502.LOOKUP. The
+addressing modes are named after the Cpu6502 handlers (ZP0, ABX, IZY, ...).
+
+"""
+OPCODES = None
+BRANCHES = ("BCC", "BCS", "BEQ", "BMI", "BNE", "BPL", "BVC", "BVS")
+OPERAND_SIZE = {"IMP": 0, "IMM": 1, "ZP0": 1, "ZPX": 1, "ZPY": 1, "REL": 1, "IZX": 1, "IZY": 1,
+                "ABS": 2, "ABX": 2, "ABY": 2, "IND": 2}
+
+
+def Opcodes() -> dict:
+    global OPCODES
+    if OPCODES is None:
+        Cpu6502()  # builds the shared instruction table
+        OPCODES = {}
+        for opcode, op in enumerate(Cpu6502.LOOKUP):
+            if op.opname != "???":
+                OPCODES.setdefault((op.opname, op.addrmode.__name__.lstrip("_")), opcode)
+        # $EA is the official NOP, the table also names some illegal opcodes NOP
+        OPCODES[("NOP", "IMP")] = 0xEA
+    return OPCODES
+
+
+TERM = re.compile(r"\s*([<>]?)\s*(\$[0-9A-Fa-f]+|%[01]+|\d+|'.'|[A-Za-z_.][\w.]*|\*)\s*")
+
+
+class Assembler(object):
+    def __init__(self, origin: int = 0x8000, symbols: dict = None):
+        """
+        :param origin: address of the first byte
+        :param symbols: predefined constants, e.g. register addresses
+        """
+        self.nOrigin = origin
+        self.symbols = dict(symbols or {})
+
+    def assemble(self, source: str) -> bytes:
+        """Assemble source into a flat image starting at the origin
+
+        Gaps left by .org are filled with $FF.
+
+        :return: the machine code, labels are left in self.symbols
+        """
+        lines = self.__parse(source)
+        # Pass 1 sizes every line and defines the labels, pass 2 emits the bytes
+        modes = {}
+        self.__pass(lines, modes, None)
+        out = bytearray()
+        self.__pass(lines, modes, out)
+        return bytes(out)
+
+    @staticmethod
+    def __parse(source: str) -> list:
+        lines = []
+        for nLine, text in enumerate(source.splitlines(), 1):
+            text = re.sub(r";.*", "", text).strip()
+            while True:
+                m = re.match(r"([A-Za-z_.][\w.]*)\s*:\s*", text)
+                if not m:
+                    break
+                lines.append((nLine, "label", m.group(1), ""))
+                text = text[m.end():]
+            if not text:
+                continue
+            m = re.match(r"([A-Za-z_][\w]*)\s*=\s*(.+)$", text)
+            if m:
+                lines.append((nLine, "=", m.group(1), m.group(2)))
+                continue
+            parts = text.split(None, 1)
+            lines.append((nLine, parts[0].upper(), None, parts[1].strip() if len(parts) > 1 else ""))
+        return lines
+
+    def __pass(self, lines: list, modes: dict, out):
+        nAddr = self.nOrigin
+        for i, (nLine, op, name, arg) in enumerate(lines):
+            try:
+                if op == "label":
+                    self.__define(name, nAddr, out is None)
+                elif op == "=":
+                    value = self.__eval(arg, nAddr, out is None)
+                    self.__define(name, value, out is None)
+                elif op == ".ORG":
+                    nTarget = self.__eval(arg, nAddr, False)
+                    if nTarget < nAddr:
+                        raise ValueError(".org ${:04X} is behind the current address ${:04X}".format(nTarget, nAddr))
+                    if out is not None:
+                        out += b"\xFF" * (nTarget - nAddr)
+                    nAddr = nTarget
+                elif op in (".BYTE", ".DB"):
+                    for expr in self.__split(arg):
+                        if expr.startswith('"'):
+                            data = expr.strip('"').encode("ascii")
+                        else:
+                            data = bytes([self.__eval(expr, nAddr, out is None) & 0xFF])
+                        if out is not None:
+                            out += data
+                        nAddr += len(data)
+                elif op in (".WORD", ".DW"):
+                    for expr in self.__split(arg):
+                        if out is not None:
+                            out += (self.__eval(expr, nAddr, False) & 0xFFFF).to_bytes(2, "little")
+                        nAddr += 2
+                elif op == ".FILL":
+                    count, value = (self.__split(arg) + ["0"])[:2]
+                    nCount = self.__eval(count, nAddr, False)
+                    if out is not None:
+                        out += bytes([self.__eval(value, nAddr, False) & 0xFF]) * nCount
+                    nAddr += nCount
+                else:
+                    if i not in modes:
+                        modes[i] = self.__mode(op, arg, nAddr)
+                    mode, expr = modes[i]
+                    opcode = Opcodes().get((op, mode))
+                    if opcode is None:
+                        raise ValueError("{} does not support {} addressing".format(op, mode))
+                    if out is not None:
+                        out.append(opcode)
+                        out += self.__operand(mode, expr, nAddr)
+                    nAddr += 1 + OPERAND_SIZE[mode]
+            except ValueError as e:
+                raise ValueError("line {}: {}".format(nLine, e)) from None
+
+    def __mode(self, op: str, arg: str, nAddr: int) -> (str, str):
+        """Pick the addressing mode on pass 1, unknown symbols get the wide form"""
+        arg = arg.replace(" ", "")
+        upper = arg.upper()
+        if op in BRANCHES:
+            return "REL", arg
+        if arg == "" or upper == "A":
+            return "IMP", ""
+        if arg.startswith("#"):
+            return "IMM", arg[1:]
+        if upper.endswith(",X)"):
+            return "IZX", arg[1:-3]
+        if upper.endswith("),Y"):
+            return "IZY", arg[1:-3]
+        if arg.startswith("(") and arg.endswith(")"):
+            return "IND", arg[1:-1]
+        index = ""
+        if upper.endswith(",X") or upper.endswith(",Y"):
+            index, arg = upper[-1], arg[:-2]
+        value = self.__eval(arg, nAddr, True)
+        zp = {"": "ZP0", "X": "ZPX", "Y": "ZPY"}[index]
+        if value is not None and value < 0x100 and (op, zp) in Opcodes():
+            return zp, arg
+        return {"": "ABS", "X": "ABX", "Y": "ABY"}[index], arg
+
+    def __operand(self, mode: str, expr: str, nAddr: int) -> bytes:
+        if mode == "IMP":
+            return b""
+        value = self.__eval(expr, nAddr, False)
+        if mode == "REL":
+            offset = value - (nAddr + 2)
+            if not -128 <= offset <= 127:
+                raise ValueError("branch target ${:04X} out of range".format(value))
+            return bytes([offset & 0xFF])
+        if OPERAND_SIZE[mode] == 1:
+            if not 0 <= value <= 0xFF:
+                raise ValueError("operand ${:X} does not fit in a byte".format(value))
+            return bytes([value])
+        return (value & 0xFFFF).to_bytes(2, "little")
+
+    def __define(self, name: str, value, first_pass: bool):
+        if first_pass and name in self.symbols:
+            raise ValueError("{} is already defined".format(name))
+        self.symbols[name] = value
+
+    @staticmethod
+    def __split(arg: str) -> list:
+        return [s.strip() for s in re.findall(r'"[^"]*"|[^,]+', arg) if s.strip()]
+
+    def __eval(self, expr: str, nAddr: int, allow_unknown: bool):
+        """Evaluate an expression, None if it uses a symbol not defined yet and allow_unknown"""
+        total = 0
+        sign = 1
+        pos = 0
+        expr = expr.strip()
+        if not expr:
+            raise ValueError("missing operand")
+        while True:
+            m = TERM.match(expr, pos)
+            if not m:
+                raise ValueError("bad expression '{}'".format(expr))
+            part, token = m.group(1), m.group(2)
+            if token == "*":
+                value = nAddr
+            elif token[0] == "$":
+                value = int(token[1:], 16)
+            elif token[0] == "%":
+                value = int(token[1:], 2)
+            elif token[0] == "'":
+                value = ord(token[1])
+            elif token[0].isdigit():
+                value = int(token)
+            elif token in self.symbols and self.symbols[token] is not None:
+                value = self.symbols[token]
+            elif allow_unknown:
+                return None
+            else:
+                raise ValueError("undefined symbol {}".format(token))
+            if part == "<":
+                value &= 0xFF
+            elif part == ">":
+                value = (value >> 8) & 0xFF
+            total += sign * value
+            pos = m.end()
+            if pos >= len(expr):
+                return total
+            if expr[pos] not in "+-":
+                raise ValueError("bad expression '{}'".format(expr))
+            sign = 1 if expr[pos] == "+" else -1
+            pos += 1
+
+
+def Assemble(source: str, origin: int = 0x8000, symbols: dict = None) -> bytes:
+    return Assembler(origin, symbols).assemble(source)
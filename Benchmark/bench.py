@@ -0,0 +1,136 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Benchmark Runner
+
+Run from the repository root:
+
+    python -m Benchmark.bench --json baseline.json
+    python -m Benchmark.bench --compare baseline.json --threshold 0.10
+    python -m Benchmark.bench --alloc --workers 2
+
+Results are written as JSON, {"meta": {...}, "results": [Result, ...]}.
+Compare mode reruns the suite and flags every result that got worse than the
+baseline by more than the threshold, the exit status is 1 if any did.
+With --alloc the per frame allocation budget (Benchmark.alloc) is checked
+after the suite, the exit status is 1 if any ROM goes over it. With
+--workers the synthetic ROMs are also run by an EmulatorFarm with that many
+worker processes (Benchmark.workers), the exit status is 1 if anything is
+printed on stderr or the workers' frames differ.
+
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+from Benchmark.alloc import CheckBudget
+from Benchmark.micro import RunMicro
+from Benchmark.workers import CheckWorkers
+from Benchmark.macro import RunMacro
+
+
+def RunSuite(scale: int = 4, repeat: int = 5, frames: int = 2, micro: bool = True, macro: bool = True,
+             filter: str = None) -> dict:
+    results = []
+    if micro:
+        results += RunMicro(scale, repeat)
+    if macro:
+        results += RunMacro(frames, max(repeat // 2, 1))
+    if filter:
+        results = [r for r in results if filter in r["name"]]
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scale": scale,
+            "repeat": repeat,
+            "frames": frames,
+        },
+        "results": results,
+    }
+
+
+def Compare(report: dict, baseline: dict, threshold: float = 0.10) -> list:
+    """Compare a report against a baseline report
+
+    :param threshold: relative change tolerated before a result is a regression
+    :return: [(name, baseline value, value, relative change, regressed)], relative change
+        is positive when the result got better
+    """
+    base = {r["name"]: r for r in baseline["results"]}
+    rows = []
+    for r in report["results"]:
+        b = base.get(r["name"])
+        if b is None or b["value"] == 0:
+            continue
+        change = (r["value"] - b["value"]) / b["value"]
+        if not r["higher"]:
+            change = -change
+        rows.append((r["name"], b["value"], r["value"], change, change < -threshold))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="RingNES benchmark suite")
+    parser.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against a stored result file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="tolerated relative slowdown (default 0.10)")
+    parser.add_argument("--scale", type=int, default=4, help="batch size multiplier of the micro benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="batches per benchmark, the best is kept")
+    parser.add_argument("--frames", type=int, default=2, help="frames per macro measurement")
+    parser.add_argument("--filter", help="only keep results whose name contains this")
+    parser.add_argument("--micro-only", action="store_true")
+    parser.add_argument("--macro-only", action="store_true")
+    parser.add_argument("--alloc", action="store_true", help="also check the per frame allocation budget")
+    parser.add_argument("--workers", type=int, default=0, help="also check an emulator farm with this many workers")
+    args = parser.parse_args(argv)
+
+    report = RunSuite(args.scale, args.repeat, args.frames,
+                      micro=not args.macro_only, macro=not args.micro_only, filter=args.filter)
+    for r in report["results"]:
+        print("{:<32} {:>14.1f} {}".format(r["name"], r["value"], r["unit"]))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    nStatus = 0
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = Compare(report, baseline, args.threshold)
+        print("\nCompared with {} (threshold {:.0%}):".format(args.compare, args.threshold))
+        for name, old, new, change, regressed in rows:
+            print("{:<32} {:>14.1f} -> {:>14.1f} {:>+8.1%}{}".format(
+                name, old, new, change, "  REGRESSION" if regressed else ""))
+        if any(row[4] for row in rows):
+            nStatus = 1
+
+    if args.alloc:
+        rows = CheckBudget(args.frames)
+        print("\nAllocation per frame:")
+        for name, nRetained, nPeak, over in rows:
+            print("{:<32} {:>10.0f} B retained {:>8} B peak{}".format(
+                name, nRetained, nPeak, "  OVER BUDGET" if over else ""))
+        if any(row[3] for row in rows):
+            nStatus = 1
+
+    if args.workers > 0:
+        bPassed, output = CheckWorkers(args.workers, args.frames)
+        print("\nEmulator farm, {} workers: {}".format(args.workers, "passed" if bPassed else "FAILED"))
+        print(output, end="")
+        if not bPassed:
+            nStatus = 1
+    return nStatus
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Macro Benchmarks
+
+Full frames of the synthetic ROMs, reported as emulated frames per second:
+
+ | frames.<rom>          : every pixel produced, as the GUI runs
+ | frames.<rom>.headless : no pixels, as the batch runner and run-ahead run
+
+"""
+
+import time
+
+from Benchmark.roms import Corpus, MakeBus
+from Benchmark.timing import Result
+from runner import RunHeadless
+
+
+def BenchFrames(name: str, image: bytes, frames: int, repeat: int) -> list:
+    bus = MakeBus(image)
+    # Warm up: boot frame and lookup table construction
+    bus.clockFrame()
+
+    best = 0.0
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        for frame in range(frames):
+            bus.clockFrame()
+        best = max(best, frames / (time.perf_counter() - start))
+    results = [Result("frames." + name, best, "fps", higher=True)]
+
+    best = 0.0
+    for _ in range(max(repeat, 1)):
+        best = max(best, RunHeadless(bus, frames=frames)["fps"])
+    results.append(Result("frames." + name + ".headless", best, "fps", higher=True))
+    return results
+
+
+def RunMacro(frames: int = 2, repeat: int = 3, roms: dict = None) -> list:
+    """Run every macro benchmark
+
+    :param frames: frames per measurement
+    :param repeat: measurements per ROM, the best one is reported
+    :param roms: {name: image}, the synthetic ROMs by default
+    """
+    results = []
+    for name, image in (roms or Corpus()).items():
+        results += BenchFrames(name, image, frames, repeat)
+    return results
@@ -0,0 +1,203 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Micro Benchmarks
+
+ | cpu.addrmode.*  : ns per instruction, a program repeating one instruction per addressing mode
+ | bus.read.*      : ns per Bus.cpuRead of ram, a ppu register, cartridge ram and PRG-ROM
+ | bus.write.*     : ns per Bus.cpuWrite of ram and a ppu register
+ | ppu.dot.*       : ns per Ppu2c02.clock on pre-render, visible, post-render and vblank lines,
+ |                   .headless without producing pixels (bRender off)
+ | ppu.pattern     : ns per GetPatternTable (decoding the 256 tiles of a pattern table)
+ | display.*       : ns per screen conversion to tk colour rows and PhotoImage data
+ | memory.idle.*   : KB traced per emulator built and reset on an NROM and an MMC3 image
+
+"""
+
+import gc
+import time
+import tracemalloc
+
+from Benchmark.roms import BuildImage, MakeBus
+from Benchmark.timing import Result, BestOf
+
+"""Addressing mode programs
+
+One instruction repeated over the first 28KB of PRG-ROM, followed by a
+JMP $8000. LDA is used wherever it has the mode. Pointers read by IZX/IZY
+point into zero filled ram, JMP ($9000) and BNE loop on themselves.
+
+"""
+JMP_START = bytes([0x4C, 0x00, 0x80])
+ADDRESSING_CASES = (
+    ("IMP", bytes([0xE8]), None),                # INX
+    ("IMM", bytes([0xA9, 0x10]), None),          # LDA #$10
+    ("ZP0", bytes([0xA5, 0x10]), None),          # LDA $10
+    ("ZPX", bytes([0xB5, 0x10]), None),          # LDA $10,X
+    ("ZPY", bytes([0xB6, 0x10]), None),          # LDX $10,Y
+    ("ABS", bytes([0xAD, 0x00, 0x02]), None),    # LDA $0200
+    ("ABX", bytes([0xBD, 0x00, 0x02]), None),    # LDA $0200,X
+    ("ABY", bytes([0xB9, 0x00, 0x02]), None),    # LDA $0200,Y
+    ("IZX", bytes([0xA1, 0x10]), None),          # LDA ($10,X)
+    ("IZY", bytes([0xB1, 0x10]), None),          # LDA ($10),Y
+    ("REL", bytes([0xD0, 0xFE]), None),          # BNE *
+    ("IND", bytes([0x6C, 0x00, 0x90]), {0x9000: bytes([0x00, 0x80])}),  # JMP ($9000)
+)
+
+
+def RepeatProgram(instruction: bytes) -> bytes:
+    return instruction * (0x7000 // len(instruction)) + JMP_START
+
+
+def BenchCpu(scale: int, repeat: int) -> list:
+    results = []
+    nInstructions = 2000 * scale
+    for mode, instruction, data in ADDRESSING_CASES:
+        cpu = MakeBus(BuildImage(RepeatProgram(instruction), data=data)).cpu
+
+        def run():
+            nStop = cpu.nInstructions + nInstructions
+            while cpu.nInstructions < nStop:
+                cpu.clock()
+            return nInstructions
+
+        results.append(Result("cpu.addrmode." + mode, BestOf(run, repeat) * 1e9, "ns/op"))
+    return results
+
+
+def BenchBus(scale: int, repeat: int) -> list:
+    results = []
+    bus = MakeBus(BuildImage(JMP_START))
+    nCalls = 10000 * scale
+    for name, addr in (("ram", 0x0010), ("ppu", 0x2002), ("cart", 0x6000), ("prg", 0x8000)):
+        def run():
+            read = bus.cpuRead
+            for _ in range(nCalls):
+                read(addr, True)
+            return nCalls
+
+        results.append(Result("bus.read." + name, BestOf(run, repeat) * 1e9, "ns/op"))
+    for name, addr in (("ram", 0x0010), ("ppu", 0x2003)):
+        def run():
+            write = bus.cpuWrite
+            for _ in range(nCalls):
+                write(addr, 0x00)
+            return nCalls
+
+        results.append(Result("bus.write." + name, BestOf(run, repeat) * 1e9, "ns/op"))
+    return results
+
+
+def ScanlineType(line: int) -> str:
+    if line < 0:
+        return "prerender"
+    if line < 240:
+        return "visible"
+    if line == 240:
+        return "postrender"
+    return "vblank"
+
+
+def BenchPpu(scale: int, repeat: int) -> list:
+    results = []
+    bus = MakeBus(BuildImage(JMP_START))
+    ppu = bus.ppu
+    # Background and sprites on, a few sprites on every line
+    ppu.cpuWrite(0x0001, 0x1E)
+    for i, tile in enumerate(ppu.OAM):
+        tile.y, tile.id, tile.attribute, tile.x = (i * 4) & 0xFF, i, i & 0x43, (i * 13) & 0xFF
+    # Line up with the start of the pre-render line
+    while not ppu.frame_complete:
+        ppu.clock()
+    ppu.frame_complete = False
+
+    clock = ppu.clock
+    nFrames = max(scale // 4, 1)
+    nLines = {"prerender": 1, "visible": 240, "postrender": 1, "vblank": 20}
+    for bRender, suffix in ((True, ""), (False, ".headless")):
+        ppu.bRender = bRender
+        best = {}
+        for _ in range(max(repeat, 1)):
+            elapsed = {}
+            for frame in range(nFrames):
+                for line in range(-1, 261):
+                    start = time.perf_counter()
+                    for dot in range(341):
+                        clock()
+                    kind = ScanlineType(line)
+                    elapsed[kind] = elapsed.get(kind, 0.0) + time.perf_counter() - start
+                ppu.frame_complete = False
+            for kind, t in elapsed.items():
+                t /= nFrames * nLines[kind] * 341
+                best[kind] = min(best.get(kind, t), t)
+        for kind in ("prerender", "visible", "postrender", "vblank"):
+            results.append(Result("ppu.dot." + kind + suffix, best[kind] * 1e9, "ns/op"))
+    ppu.bRender = True
+
+    def run():
+        ppu.GetPatternTable(0, 0)
+        return 1
+
+    results.append(Result("ppu.pattern", BestOf(run, repeat) * 1e9, "ns/op"))
+    return results
+
+
+def BenchDisplay(scale: int, repeat: int) -> list:
+    try:
+        # display needs tkinter, skip the conversion benchmarks without it
+        from display import ScreenToRows, RowsToPhotoData
+    except ImportError:
+        return []
+    ppu = MakeBus(BuildImage(JMP_START)).ppu
+    screen = ppu.GetScreen()
+    rows = ScreenToRows(screen)
+
+    def convert():
+        ScreenToRows(screen)
+        return 1
+
+    def join():
+        RowsToPhotoData(rows)
+        return 1
+
+    return [
+        Result("display.rows", BestOf(convert, repeat) * 1e9, "ns/op"),
+        Result("display.photo", BestOf(join, repeat) * 1e9, "ns/op"),
+    ]
+
+
+def BenchMemory(scale: int, repeat: int) -> list:
+    results = []
+    for name, image in (("nrom", BuildImage(JMP_START)), ("mmc3", BuildImage(JMP_START, mapper=4, chr_banks=0))):
+        # Build one first, the shared tables (opcodes, palette) are not counted
+        MakeBus(image)
+        n = max(scale, 1)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            buses = [MakeBus(image) for _ in range(n)]
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        del buses
+        results.append(Result("memory.idle." + name, size / n / 1024, "KB"))
+    return results
+
+
+BENCHMARKS = (BenchCpu, BenchBus, BenchPpu, BenchDisplay, BenchMemory)
+
+
+def RunMicro(scale: int = 4, repeat: int = 5) -> list:
+    """Run every micro benchmark
+
+    :param scale: batch size multiplier, larger is slower but steadier
+    :param repeat: batches per benchmark, the best one is reported
+    """
+    results = []
+    for bench in BENCHMARKS:
+        results += bench(scale, repeat)
+    return results
@@ -0,0 +1,358 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Synthetic ROMs
+
+Programs written for the mini assembler and packed into iNES images in
+memory, so the benchmarks run without any commercial ROM on disk. To get
+them as files:
+
+    python -m Benchmark.roms Rom/synthetic
+
+"""
+
+import os
+import sys
+
+from Benchmark.asm import Assembler
+from bus import Bus
+from cartridge import Cartridge
+
+# Address of the fixed PRG window the program is placed in, per mapper
+ORIGIN = {
+    0: 0x8000,  # NROM: all 32KB
+    1: 0xC000,  # MMC1: last 16KB bank after reset
+    4: 0xE000,  # MMC3: last 8KB bank
+}
+
+SYMBOLS = {
+    "PPUCTRL": 0x2000, "PPUMASK": 0x2001, "PPUSTATUS": 0x2002, "OAMADDR": 0x2003,
+    "OAMDATA": 0x2004, "PPUSCROLL": 0x2005, "PPUADDR": 0x2006, "PPUDATA": 0x2007,
+    "OAMDMA": 0x4014,
+}
+
+
+def BuildImage(code: bytes, mapper: int = 0, prg_banks: int = 2, chr_banks: int = 1, data: dict = None,
+               origin: int = 0x8000, vectors: tuple = None, marks: bool = False) -> bytes:
+    """Pack a program into an iNES image
+
+    CPU addresses are placed as if the last 32KB of PRG-ROM were mapped to
+    $8000 ~ $FFFF, which holds for the fixed windows of every mapper.
+
+    :param code: machine code starting at origin
+    :param mapper: mapper id
+    :param prg_banks: number of 16KB PRG-ROM banks
+    :param chr_banks: number of 8KB CHR-ROM banks, 0 for CHR-RAM
+    :param data: extra bytes, {cpu address: bytes}
+    :param origin: cpu address of the first byte of code
+    :param vectors: (nmi, reset, irq) addresses, all origin by default
+    :param marks: store the number of every 8KB PRG bank in its first byte,
+        so bank switching is visible to the program
+    :return: the .nes image
+    """
+    header = b'NES\x1a' + bytes([prg_banks, chr_banks, (mapper & 0x0F) << 4, mapper & 0xF0]) + bytes(8)
+    prg = bytearray(b'\xFF' * (prg_banks * 16384))
+    if marks:
+        for bank in range(len(prg) // 0x2000):
+            prg[bank * 0x2000] = bank
+
+    def place(addr: int, chunk: bytes):
+        offset = (len(prg) - (0x10000 - addr)) % len(prg)
+        prg[offset:offset + len(chunk)] = chunk
+
+    place(origin, code)
+    for addr, chunk in (data or {}).items():
+        place(addr, chunk)
+    nmi, reset, irq = vectors or (origin, origin, origin)
+    place(0xFFFA, bytes([nmi & 0xFF, nmi >> 8, reset & 0xFF, reset >> 8, irq & 0xFF, irq >> 8]))
+    chr_ = bytes(range(256)) * (32 * chr_banks)
+    return header + bytes(prg) + chr_
+
+
+def BuildProgram(source: str, mapper: int = 0, prg_banks: int = 2, chr_banks: int = 1, marks: bool = False) -> bytes:
+    """Assemble source into the fixed window of the mapper
+
+    The labels nmi, reset and irq become the vectors, reset defaults to the origin.
+    """
+    origin = ORIGIN[mapper]
+    asm = Assembler(origin, SYMBOLS)
+    code = asm.assemble(source)
+    vectors = tuple(asm.symbols.get(name, origin) for name in ("nmi", "reset", "irq"))
+    return BuildImage(code, mapper, prg_banks, chr_banks, origin=origin, vectors=vectors, marks=marks)
+
+
+def MakeBus(image: bytes) -> Bus:
+    """Build and reset an emulator running image"""
+    cart = Cartridge(image=image)
+    bus = Bus()
+    bus.insertCartridge(cart)
+    bus.reset()
+    return bus
+
+
+"""Corpus
+
+ | alu_loop    : NROM, arithmetic and shifts over a 256 byte buffer, no ppu access
+ | ppu_upload  : NROM, palette upload then name table 0 refilled through $2007 forever, rendering on
+ | sprites     : NROM, palette upload, 64 sprites in rows of 8, moved and copied by OAM DMA on every nmi
+ | mmc1_storm  : MMC1, the 16KB PRG bank and 4KB CHR bank switched through the serial port in a loop
+ | mmc3_storm  : MMC3, palette upload, all eight bank registers rewritten in a loop,
+ |               scanline irq every 32 lines
+
+"""
+ALU_LOOP = """
+reset:  SEI
+        CLD
+        LDX #$FF
+        TXS
+        LDA #$00
+        STA $10
+loop:   LDY #$00
+inner:  TYA
+        CLC
+        ADC $10
+        EOR #$5A
+        ROL A
+        STA $0200,Y
+        LSR A
+        AND #$3F
+        ORA $11
+        STA $11
+        INY
+        BNE inner
+        INC $10
+        JMP loop
+nmi:
+irq:    RTI
+"""
+
+# Wait for the ppu to warm up (two vblanks) and upload the 32 byte palette at the label palette
+LOAD_PALETTE = """
+vwait1: BIT PPUSTATUS
+        BPL vwait1
+vwait2: BIT PPUSTATUS
+        BPL vwait2
+        LDA #$3F
+        STA PPUADDR
+        LDA #$00
+        STA PPUADDR
+        LDX #$00
+pal:    LDA palette,X
+        STA PPUDATA
+        INX
+        CPX #32
+        BNE pal
+"""
+
+PALETTE = """
+palette:
+        .byte $0F, $01, $11, $21, $0F, $06, $16, $26, $0F, $09, $19, $29, $0F, $02, $12, $22
+        .byte $0F, $05, $15, $25, $0F, $0A, $1A, $2A, $0F, $07, $17, $27, $0F, $04, $14, $24
+"""
+
+PPU_UPLOAD = """
+reset:  SEI
+        CLD
+        LDX #$FF
+        TXS
+""" + LOAD_PALETTE + """
+        LDA #$1E
+        STA PPUMASK
+frame:  LDA #$20
+        STA PPUADDR
+        LDA #$00
+        STA PPUADDR
+        LDY #$04
+        LDX #$00
+fill:   TXA
+        CLC
+        ADC $00
+        STA PPUDATA
+        INX
+        BNE fill
+        DEY
+        BNE fill
+        INC $00
+        LDA #$00
+        STA PPUSCROLL
+        STA PPUSCROLL
+        JMP frame
+nmi:
+irq:    RTI
+""" + PALETTE
+
+SPRITES = """
+OAMBUF = $0200
+reset:  SEI
+        CLD
+        LDX #$FF
+        TXS
+""" + LOAD_PALETTE + """
+        LDA #$00
+        STA PPUADDR
+        STA PPUADDR
+        LDX #$00
+init:   TXA             ; X = sprite * 4
+        LSR A
+        LSR A
+        LSR A
+        LSR A
+        LSR A
+        ASL A
+        ASL A
+        ASL A
+        CLC
+        ADC #$40
+        STA OAMBUF,X    ; y: rows of 8 sprites
+        TXA
+        LSR A
+        LSR A
+        STA OAMBUF+1,X  ; tile
+        AND #$43
+        STA OAMBUF+2,X  ; attribute, some flipped
+        TXA
+        ASL A
+        STA OAMBUF+3,X  ; x
+        INX
+        INX
+        INX
+        INX
+        BNE init
+        LDA #$88
+        STA PPUCTRL     ; nmi on, sprites from pattern table 1
+        LDA #$1E
+        STA PPUMASK
+idle:   JMP idle
+nmi:    PHA
+        TXA
+        PHA
+        LDA #$00
+        STA OAMADDR
+        LDA #>OAMBUF
+        STA OAMDMA
+        LDX #$00
+move:   INC OAMBUF+3,X
+        INX
+        INX
+        INX
+        INX
+        BNE move
+        PLA
+        TAX
+        PLA
+irq:    RTI
+""" + PALETTE
+
+MMC1_STORM = """
+reset:  SEI
+        CLD
+        LDX #$FF
+        TXS
+        LDA #$80
+        STA $8000       ; reset the shift register
+        LDA #$1E
+        STA PPUMASK
+loop:   LDX #$00
+bank:   TXA
+        JSR prg
+        LDA $8000       ; bank mark
+        STA $0300,X
+        TXA
+        JSR chr0
+        INX
+        CPX #$08
+        BNE bank
+        JMP loop
+prg:    STA $E000
+        LSR A
+        STA $E000
+        LSR A
+        STA $E000
+        LSR A
+        STA $E000
+        LSR A
+        STA $E000
+        RTS
+chr0:   STA $A000
+        LSR A
+        STA $A000
+        LSR A
+        STA $A000
+        LSR A
+        STA $A000
+        LSR A
+        STA $A000
+        RTS
+nmi:
+irq:    RTI
+"""
+
+MMC3_STORM = """
+reset:  SEI
+        CLD
+        LDX #$FF
+        TXS
+""" + LOAD_PALETTE + """
+        LDA #$00
+        STA PPUADDR
+        STA PPUADDR
+        LDA #$1E
+        STA PPUMASK
+        LDA #$20
+        STA $C000       ; irq latch
+        STA $C001       ; reload
+        STA $E001       ; irq on
+        CLI
+loop:   LDX #$00
+next:   LDY #$00
+regs:   STY $8000       ; select R0 ~ R7
+        STX $8001
+        INY
+        CPY #$08
+        BNE regs
+        LDA $8000       ; bank mark of R6
+        STA $0300,X
+        INX
+        CPX #$0E
+        BNE next
+        JMP loop
+irq:    STA $E000       ; acknowledge
+        STA $E001
+        INC $04
+nmi:    RTI
+""" + PALETTE
+
+CORPUS = {
+    "alu_loop": lambda: BuildProgram(ALU_LOOP),
+    "ppu_upload": lambda: BuildProgram(PPU_UPLOAD),
+    "sprites": lambda: BuildProgram(SPRITES),
+    "mmc1_storm": lambda: BuildProgram(MMC1_STORM, mapper=1, prg_banks=8, chr_banks=4, marks=True),
+    "mmc3_storm": lambda: BuildProgram(MMC3_STORM, mapper=4, prg_banks=8, chr_banks=8, marks=True),
+}
+
+
+def Corpus() -> dict:
+    """{name: image} of every synthetic ROM"""
+    return {name: build() for name, build in CORPUS.items()}
+
+
+def WriteCorpus(directory: str) -> list:
+    """Write the corpus as .nes files
+
+    :return: the written paths
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, image in Corpus().items():
+        path = os.path.join(directory, name + ".nes")
+        with open(path, 'wb') as f:
+            f.write(image)
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    for path in WriteCorpus(sys.argv[1] if len(sys.argv) > 1 else "Rom/synthetic"):
+        print(path)
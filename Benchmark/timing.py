@@ -0,0 +1,36 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Timing helpers shared by the micro and macro benchmarks
+
+A benchmark reports one or more results:
+
+ | name   : dotted name, e.g. "cpu.addrmode.ZPX"
+ | value  : the measurement
+ | unit   : "ns/op", "fps", ...
+ | higher : true if a higher value is better (throughput), false for costs
+
+"""
+
+import time
+
+
+def Result(name: str, value: float, unit: str, higher: bool = False) -> dict:
+    return {"name": name, "value": value, "unit": unit, "higher": higher}
+
+
+def BestOf(fn, repeat: int = 5) -> float:
+    """Best time per operation of fn in seconds
+
+    :param fn: runs a batch and returns the number of operations it did
+    :param repeat: number of batches, the fastest is kept to filter host noise
+    """
+    best = float("inf")
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        n = fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed / max(n, 1))
+    return best
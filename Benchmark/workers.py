@@ -0,0 +1,85 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Worker Check
+
+Runs the synthetic ROMs through an EmulatorFarm with worker processes, in
+a child interpreter, and fails if anything is printed on stderr: shared
+ROM segments leaked or unlinked by a worker, resource tracker warnings,
+worker tracebacks. The frame hashes of the workers must also match the
+same jobs run in the child itself.
+
+    python -m Benchmark.workers
+    python -m Benchmark.workers --workers 4 --context spawn
+
+The exit status is 1 if the check fails.
+
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from Benchmark.roms import WriteCorpus
+from farm import EmulatorFarm, Job
+
+
+def RunFarm(paths: list, workers: int, frames: int, context: str = None) -> dict:
+    """
+    :return: {path: frame hashes}, or {path: error} for the jobs that failed
+    """
+    with EmulatorFarm(workers=workers, context=context) as farm:
+        jobs = [Job(farm.share(path), frames=frames, tag=path) for path in paths]
+        return {r["tag"]: r.get("hashes", r.get("error")) for r in farm.run(jobs)}
+
+
+def checkChild(workers: int, frames: int, context: str = None) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        paths = WriteCorpus(directory)
+        expected = RunFarm(paths, 0, frames)
+        results = RunFarm(paths, workers, frames, context)
+    bFailed = False
+    for path in paths:
+        if results[path] != expected[path]:
+            print("{}: worker hashes differ ({})".format(os.path.basename(path), results[path]))
+            bFailed = True
+    return 1 if bFailed else 0
+
+
+def CheckWorkers(workers: int = 2, frames: int = 2, context: str = None) -> (bool, str):
+    """Run the check in a child interpreter, so everything printed on stderr is caught,
+    including at interpreter exit
+
+    :return: passed, what the child printed
+    """
+    args = [sys.executable, "-m", "Benchmark.workers", "--child", "--workers", str(workers),
+            "--frames", str(frames)]
+    if context:
+        args += ["--context", context]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(args, cwd=root, capture_output=True, text=True)
+    return proc.returncode == 0 and not proc.stderr, proc.stdout + proc.stderr
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="RingNES emulator farm worker check")
+    parser.add_argument("--workers", type=int, default=2, help="worker processes")
+    parser.add_argument("--frames", type=int, default=2, help="frames per job")
+    parser.add_argument("--context", help="multiprocessing start method, the platform default if not given")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return checkChild(args.workers, args.frames, args.context)
+    bPassed, output = CheckWorkers(args.workers, args.frames, args.context)
+    print(output, end="")
+    print("Worker check {}".format("passed" if bPassed else "FAILED"))
+    return 0 if bPassed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,43 +2,176 @@
 Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-18
 """
-from utils import MIRROR
+import copy
+import struct
+
+from utils import MIRROR, MAPPER_CAPS
+
+# Windows published before any image is connected, shared by every mapper
+EMPTY_PRG_WINDOW = memoryview(bytes(0x2000))
+EMPTY_CHR_WINDOW = memoryview(bytes(0x0400))
 
 
 class Mapper(object):
+    CAPS = MAPPER_CAPS.NONE
+    # Subclasses declare their own registers in __slots__ too, third party
+    # mappers without __slots__ simply get a __dict__
+    __slots__ = ("_nPRGBanks", "_nCHRBanks", "_vPRGMemory", "_vCHRMemory", "_pPRGViews", "_pCHRViews",
+                 "vPRGBank", "vCHRBank", "pPRGWindow", "_scheduler")
+
     def __init__(self, prgBanks: int, chrBanks: int):
         self._nPRGBanks = prgBanks
         self._nCHRBanks = chrBanks
+        # Whole PRG / CHR images as seen by the mapper
+        self._vPRGMemory = memoryview(b'')
+        self._vCHRMemory = memoryview(b'')
+        # Window sized views over the images, {offset: memoryview}, created once per
+        # offset so switching banks does not slice (allocate) again
+        self._pPRGViews = {}
+        self._pCHRViews = {}
+        # Bank windows: the currently mapped banks, published as memoryviews over the ROM.
+        # They are only recomputed on register writes (see updateBanks),
+        # so the bus and ppu read bytes straight out of the active bank.
+        #  vPRGBank   : 4 * 8KB windows for cpu $8000 ~ $FFFF,
+        #               addr -> vPRGBank[(addr >> 13) & 0x03][addr & 0x1FFF]
+        #  vCHRBank   : 8 * 1KB windows for ppu $0000 ~ $1FFF,
+        #               addr -> vCHRBank[addr >> 10][addr & 0x03FF]
+        #  pPRGWindow : PRG-ROM offset of each vPRGBank window
+        # 16KB/32KB PRG and 2KB/4KB/8KB CHR banks span several adjacent windows.
+        # The lists are updated in place, callers may keep a reference to them.
+        self.vPRGBank = [EMPTY_PRG_WINDOW] * 4
+        self.vCHRBank = [EMPTY_CHR_WINDOW] * 8
+        self.pPRGWindow = [0] * 4
+        # The ppu, which owns scanline timing and schedules the mapper irq
+        self._scheduler = None
+
+    def connectScheduler(self, ppu):
+        """Connect the ppu scanline scheduler
+
+        Mappers with an irq never get polled, instead they predict the scanline
+        clock their irq fires on and register it with ppu.nIRQClock,
+        the ppu then calls scanline() exactly at that clock.
+        ppu.nScanlineClocks counts the scanline clocks seen so far.
+        """
+        self._scheduler = ppu
+
+    def connectMemory(self, prg, chr):
+        """Attach the PRG and CHR images and publish the initial windows
+
+        :param prg: PRG-ROM image (bytes-like)
+        :param chr: CHR-ROM image (bytes-like) or CHR-RAM (bytearray)
+        """
+        self._vPRGMemory = memoryview(prg)
+        self._vCHRMemory = memoryview(chr)
+        self._pPRGViews = {}
+        self._pCHRViews = {}
+        self.updateBanks()
+
+    def updateBanks(self):
+        """Recompute the bank windows from the mapper registers
+
+        The default layout is the fixed NROM one:
+        32KB PRG (16KB mirrored twice) and 8KB CHR.
+        """
+        self._mapPRG(0, 32, 0)
+        self._mapCHR(0, 8, 0)
+
+    def _mapPRG(self, slot: int, size: int, bank: int):
+        """Publish PRG bank into windows
+
+        :param slot: first 8KB window ($8000 -> 0, $A000 -> 1, $C000 -> 2, $E000 -> 3)
+        :param size: bank size in KB (8, 16, 32)
+        :param bank: bank number in units of size, wraps around the PRG size
+        """
+        self.__mapWindows(self.vPRGBank, self._vPRGMemory, self._pPRGViews, 0x2000, slot, size * 1024, bank,
+                          self.pPRGWindow)
+
+    def _mapCHR(self, slot: int, size: int, bank: int):
+        """Publish CHR bank into windows
 
-    def cpuMapRead(self, addr: int) -> (bool, int, int):
+        :param slot: first 1KB window ($0000 -> 0, $0400 -> 1, ..., $1C00 -> 7)
+        :param size: bank size in KB (1, 2, 4, 8)
+        :param bank: bank number in units of size, wraps around the CHR size
+        """
+        self.__mapWindows(self.vCHRBank, self._vCHRMemory, self._pCHRViews, 0x0400, slot, size * 1024, bank)
+
+    @staticmethod
+    def __mapWindows(windows: list, memory: memoryview, views: dict, window: int, slot: int, size: int,
+                     bank: int, offsets: list = None):
+        nTotal = len(memory)
+        if nTotal == 0:
+            return
+        offset = bank * size
+        for i in range(size // window):
+            # Images smaller than the bank are mirrored
+            start = (offset + i * window) % nTotal
+            view = views.get(start)
+            if view is None:
+                view = views[start] = memory[start:start + window]
+            windows[slot + i] = view
+            if offsets is not None:
+                offsets[slot + i] = start
+
+    def cpuMapRead(self, addr: int) -> int:
         """Check Mapper Read
 
-        The addr between $8000 ~ $FFFF is PRG-ROM which stored in cartridge.
-        If cpu want to read above addr then return true and mapped address
-        else return false and origin address
+        The addr between $8000 ~ $FFFF is PRG-ROM which is read through vPRGBank.
+        The addr between $4020 ~ $7FFF belongs to the cartridge (e.g. PRG-RAM),
+        if the mapper responds to the addr the data is returned, else -1.
+        Nothing is allocated per access, it is on the cpu hot path.
 
         :param addr: address cpu request
-        :return: true, mapped address, data
+        :return: data, -1 if the mapper does not respond
         """
-        pass
+        return -1
 
-    def cpuMapWrite(self, addr: int, data: int) -> (bool, int):
+    def cpuMapWrite(self, addr: int, data: int) -> bool:
         """Check Mapper Write
 
-        The addr between $8000 ~ $FFFF is PRG-ROM which stored in cartridge.
-        If cpu want to write above addr then return true and mapped address
-        else return false and origin address
+        The addr between $8000 ~ $FFFF is PRG-ROM which stored in cartridge,
+        writes there go to the mapper registers.
 
         :param addr: address cpu request, data
-        :return: true, mapped address
+        :return: true if the mapper handled the write
         """
-        pass
+        return False
 
-    def ppuMapRead(self, addr: int) -> (bool, int):
-        pass
+    def clone(self, chr):
+        """Copy of the mapper registers and cartridge ram
 
-    def ppuMapWrite(self, addr: int, data: int) -> (bool, int):
-        pass
+        Lists and bytearrays (registers, bank windows, ram) are copied,
+        the ROM images are shared.
+
+        :param chr: CHR image of the cloned cartridge (its own CHR-RAM)
+        """
+        mapper = copy.copy(self)
+        for name in self.__fields():
+            value = getattr(self, name, None)
+            if isinstance(value, (list, bytearray)):
+                setattr(mapper, name, value[:])
+        mapper._scheduler = None
+        if chr is not None and self._vCHRMemory.obj is not chr:
+            mapper._vCHRMemory = memoryview(chr)
+            mapper._pCHRViews = {}
+            mapper.updateBanks()
+        return mapper
+
+    def __fields(self) -> list:
+        """Names of the instance attributes, slots of every class in the mro and the __dict__ if any"""
+        names = [name for cls in type(self).__mro__ for name in cls.__dict__.get("__slots__", ())]
+        return names + list(getattr(self, "__dict__", ()))
+
+    def save_state(self) -> bytes:
+        """Pack the mapper registers and cartridge ram, fixed layout per mapper"""
+        return b''
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        """Unpack the mapper state at offset and republish the bank windows
+
+        :return: the offset following the mapper state
+        """
+        self.updateBanks()
+        return offset
 
     def reset(self):
         pass
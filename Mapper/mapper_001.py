@@ -3,11 +3,20 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-18
 """
 
+import struct
+
 from Mapper.mapper import Mapper
-from utils import MIRROR
+from utils import MIRROR, MAPPER_CAPS
 
 
 class Mapper_001(Mapper):
+    CAPS = MAPPER_CAPS.CHR_RAM | MAPPER_CAPS.PRG_RAM
+    # Save state layout: chr selects 4Lo/4Hi/8, prg selects 16Lo/16Hi/32, load register/count, control, mirror
+    STATE = struct.Struct('<9BB')
+    __slots__ = ("nCHRBankSelect4Lo", "nCHRBankSelect4Hi", "nCHRBankSelect8",
+                 "nPRGBankSelect16Lo", "nPRGBankSelect16Hi", "nPRGBankSelect32",
+                 "nLoadRegister", "nLoadRegisterCount", "nControlRegister", "mirrormode", "vRAMStatic")
+
     def __init__(self, prgBanks: int, chrBanks: int):
         super().__init__(prgBanks, chrBanks)
         self.nCHRBankSelect4Lo = 0x00
@@ -24,38 +33,26 @@ class Mapper_001(Mapper):
 
         self.mirrormode = MIRROR.HORIZONTAL
 
-        self.vRAMStatic = [0 for i in range(32 * 1024)]
+        # 8KB PRG-RAM at $6000 ~ $7FFF
+        self.vRAMStatic = bytearray(8 * 1024)
 
-    def cpuMapRead(self, addr: int) -> (bool, int, int):
+    def cpuMapRead(self, addr: int) -> int:
         if 0x6000 <= addr <= 0x7FFF:
-            mapped_addr = 0xFFFFFFFF  # Read is from cartridge
-            data = self.vRAMStatic[addr & 0x1FFF]
-            return True, mapped_addr, data
-        elif addr >= 0x8000:
-            if self.nControlRegister & 0b01000:
-                # 16K Mode
-                if 0x8000 <= addr <= 0xBFFF:
-                    mapped_addr = self.nPRGBankSelect16Lo * 0x4000 + (addr & 0x3FFF)
-                    return True, mapped_addr, 0x00
-                elif 0xC000 <= addr <= 0xFFFF:
-                    mapped_addr = self.nPRGBankSelect16Hi * 0x4000 + (addr & 0x3FFF)
-                    return True, mapped_addr, 0x00
-            else:
-                mapped_addr = self.nPRGBankSelect32 * 0x8000 + (addr & 0x7FFF)
-                return True, mapped_addr, 0x00
+            # Read is from cartridge
+            return self.vRAMStatic[addr & 0x1FFF]
         else:
-            return False, 0x00, 0x00
+            return -1
 
-    def cpuMapWrite(self, addr: int, data: int) -> (bool, int):
+    def cpuMapWrite(self, addr: int, data: int) -> bool:
         if 0x6000 <= addr <= 0x7FFF:
-            mapped_addr = 0xFFFFFFFF
             self.vRAMStatic[addr & 0x1FFF] = data
-            return True, mapped_addr
+            return True
         if addr >= 0x8000:
             if data & 0x80:
                 self.nLoadRegister = 0x00
                 self.nLoadRegisterCount = 0
                 self.nControlRegister |= 0x0C
+                self.updateBanks()
             else:
                 self.nLoadRegister >>= 1
                 self.nLoadRegister |= (data & 0x01) << 4
@@ -94,4 +91,58 @@ class Mapper_001(Mapper):
                             self.nPRGBankSelect16Hi = self._nPRGBanks - 1
                     self.nLoadRegister = 0x00
                     self.nLoadRegisterCount = 0
-        return False, 0x00
\ No newline at end of file
+                    self.updateBanks()
+            return True
+        return False
+
+    def updateBanks(self):
+        if self.nControlRegister & 0b10000:
+            # 4K CHR Mode
+            self._mapCHR(0, 4, self.nCHRBankSelect4Lo)
+            self._mapCHR(4, 4, self.nCHRBankSelect4Hi)
+        else:
+            # 8K CHR Mode, the select is stored in 4K units
+            self._mapCHR(0, 8, self.nCHRBankSelect8 >> 1)
+
+        if self.nControlRegister & 0b01000:
+            # 16K PRG Mode
+            self._mapPRG(0, 16, self.nPRGBankSelect16Lo)
+            self._mapPRG(2, 16, self.nPRGBankSelect16Hi)
+        else:
+            # 32K PRG Mode
+            self._mapPRG(0, 32, self.nPRGBankSelect32)
+
+    def save_state(self) -> bytes:
+        return self.STATE.pack(
+            self.nCHRBankSelect4Lo, self.nCHRBankSelect4Hi, self.nCHRBankSelect8,
+            self.nPRGBankSelect16Lo, self.nPRGBankSelect16Hi, self.nPRGBankSelect32,
+            self.nLoadRegister, self.nLoadRegisterCount, self.nControlRegister,
+            list(MIRROR).index(self.mirrormode)
+        ) + bytes(self.vRAMStatic)
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        (self.nCHRBankSelect4Lo, self.nCHRBankSelect4Hi, self.nCHRBankSelect8,
+         self.nPRGBankSelect16Lo, self.nPRGBankSelect16Hi, self.nPRGBankSelect32,
+         self.nLoadRegister, self.nLoadRegisterCount, self.nControlRegister,
+         mirror) = self.STATE.unpack_from(buf, offset)
+        self.mirrormode = list(MIRROR)[mirror]
+        offset += self.STATE.size
+        self.vRAMStatic[:0x2000] = buf[offset:offset + 0x2000]
+        return super().load_state(buf, offset + 0x2000)
+
+    def reset(self):
+        self.nControlRegister = 0x1C
+        self.nLoadRegister = 0x00
+        self.nLoadRegisterCount = 0x00
+
+        self.nCHRBankSelect4Lo = 0
+        self.nCHRBankSelect4Hi = 0
+        self.nCHRBankSelect8 = 0
+
+        self.nPRGBankSelect32 = 0
+        self.nPRGBankSelect16Lo = 0
+        self.nPRGBankSelect16Hi = self._nPRGBanks - 1
+        self.updateBanks()
+
+    def mirror(self):
+        return self.mirrormode
\ No newline at end of file
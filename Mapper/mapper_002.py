@@ -3,26 +3,44 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-18
 """
 
+import struct
+
 from Mapper.mapper import Mapper
+from utils import MAPPER_CAPS
 
 
 class Mapper_002(Mapper):
+    CAPS = MAPPER_CAPS.CHR_RAM
+    # Save state layout: prg select lo, hi
+    STATE = struct.Struct('<2B')
+    __slots__ = ("nPRGBankSelectLo", "nPRGBankSelectHi")
+
     def __init__(self, prgBanks: int, chrBanks: int):
         super().__init__(prgBanks, chrBanks)
         self.nPRGBankSelectLo = 0x00
-        self.nPRGBankSelectHi = 0x00
-
-    def cpuMapRead(self, addr: int) -> (bool, int, int):
-        if 0x8000 <= addr < 0xBFFF:
-            mapped_addr = self.nPRGBankSelectLo * 0x4000 + (addr & 0x3FFF)
-            return True, mapped_addr, 0x00
-        elif 0xC000 <= addr < 0xFFFF:
-            mapped_addr = self.nPRGBankSelectHi * 0x4000 + (addr & 0x3FFF)
-            return True, mapped_addr, 0x00
-        else:
-            return False, addr, 0x00
-
-    def cpuMapWrite(self, addr: int, data: int) -> (bool, int):
-        if 0x8000 <= addr < 0xFFFF:
+        self.nPRGBankSelectHi = prgBanks - 1
+
+    def cpuMapWrite(self, addr: int, data: int) -> bool:
+        if 0x8000 <= addr <= 0xFFFF:
             self.nPRGBankSelectLo = data & 0x0F
-        return False
\ No newline at end of file
+            self.updateBanks()
+            return True
+        return False
+
+    def updateBanks(self):
+        # $8000 ~ $BFFF switchable, $C000 ~ $FFFF fixed to the last bank
+        self._mapPRG(0, 16, self.nPRGBankSelectLo)
+        self._mapPRG(2, 16, self.nPRGBankSelectHi)
+        self._mapCHR(0, 8, 0)
+
+    def save_state(self) -> bytes:
+        return self.STATE.pack(self.nPRGBankSelectLo, self.nPRGBankSelectHi & 0xFF)
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        self.nPRGBankSelectLo, self.nPRGBankSelectHi = self.STATE.unpack_from(buf, offset)
+        return super().load_state(buf, offset + self.STATE.size)
+
+    def reset(self):
+        self.nPRGBankSelectLo = 0
+        self.nPRGBankSelectHi = self._nPRGBanks - 1
+        self.updateBanks()
@@ -3,28 +3,41 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-18
 """
 
+import struct
+
 from Mapper.mapper import Mapper
+from utils import MAPPER_CAPS
 
 
 class Mapper_003(Mapper):
+    CAPS = MAPPER_CAPS.NONE
+    # Save state layout: chr select
+    STATE = struct.Struct('<B')
+    __slots__ = ("nCHRBankSelect",)
+
     def __init__(self, prgBanks: int, chrBanks: int):
         super().__init__(prgBanks, chrBanks)
         self.nCHRBankSelect = 0x00
 
-    def cpuMapRead(self, addr: int) -> (bool, int, int):
-        if 0x8000 <= addr < 0xFFFF:
-            if self._nPRGBanks == 1:
-                mapped_addr = addr & 0x3FFF
-                return True, mapped_addr, 0x00
-            elif self._nPRGBanks == 2:
-                mapped_addr = addr & 0x7FFF
-                return True, mapped_addr, 0x00
-        else:
-            return False, addr, 0x00
-
-    def cpuMapWrite(self, addr: int, data: int) -> (bool, int):
-        if 0x8000 <= addr < 0xFFFF:
+    def cpuMapWrite(self, addr: int, data: int) -> bool:
+        if 0x8000 <= addr <= 0xFFFF:
             self.nCHRBankSelect = data & 0x03
-            mapped_addr = addr
-        return False, mapped_addr
+            self.updateBanks()
+            return True
+        return False
+
+    def updateBanks(self):
+        # 16KB PRG is mirrored into $C000 ~ $FFFF, 32KB is mapped as is
+        self._mapPRG(0, 32, 0)
+        self._mapCHR(0, 8, self.nCHRBankSelect)
+
+    def save_state(self) -> bytes:
+        return self.STATE.pack(self.nCHRBankSelect)
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        self.nCHRBankSelect, = self.STATE.unpack_from(buf, offset)
+        return super().load_state(buf, offset + self.STATE.size)
 
+    def reset(self):
+        self.nCHRBankSelect = 0
+        self.updateBanks()
@@ -3,15 +3,25 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-18
 """
 
+import struct
+
 from Mapper.mapper import Mapper
-from utils import MIRROR
+from utils import MIRROR, MAPPER_CAPS
 
 
 class Mapper_004(Mapper):
+    CAPS = MAPPER_CAPS.IRQ | MAPPER_CAPS.SCANLINE | MAPPER_CAPS.CHR_RAM | MAPPER_CAPS.PRG_RAM
+    # Save state layout: target register, prg mode, chr inversion, mirror, registers, chr banks, prg banks,
+    #                    irq active/enable/update, irq counter, irq reload, irq sync clock
+    STATE = struct.Struct('<B2?B8B8I4I3?BBQ')
+    __slots__ = ("vRAMStatic", "nTargetRegister", "bPRGBankMode", "bCHRInversion", "mirrormode",
+                 "pRegister", "pCHRBank", "pPRGBank", "bIRQActive", "bIRQEnable", "bIRQUpdate",
+                 "nIRQCounter", "nIRQReload", "nIRQSyncClock")
+
     def __init__(self, prgBanks: int, chrBanks: int):
         super().__init__(prgBanks, chrBanks)
-        # The extent RAM address $0x6000 ~ $0x7FFF
-        self.vRAMStatic = [0 for i in range(32 * 1024)]
+        # The extent RAM address $0x6000 ~ $0x7FFF, 8KB
+        self.vRAMStatic = bytearray(8 * 1024)
         # Control variables
         self.nTargetRegister = 0x00
         self.bPRGBankMode = False
@@ -27,34 +37,20 @@ class Mapper_004(Mapper):
         self.bIRQUpdate = False
         self.nIRQCounter = 0x0000
         self.nIRQReload = 0x00000
+        # Scanline clock the counter was last brought up to date at
+        self.nIRQSyncClock = 0
 
-    def cpuMapRead(self, addr: int) -> (bool, int, int):
+    def cpuMapRead(self, addr: int) -> int:
         if 0x6000 <= addr <= 0x7FFF:
             # Read the ram on cartridge
-            mapped_addr = 0xFFFFFFFF
-            data = self.vRAMStatic[addr & 0x1FFF]
-            return True, mapped_addr, data
-        elif 0x8000 <= addr <= 0x9FFFF:
-            mapped_addr = self.pPRGBank[0] + (addr & 0x1FFF)
-            return True, mapped_addr, 0x00
-        elif 0xA000 <= addr <= 0xBFFF:
-            # Address for Register Control
-            mapped_addr = self.pPRGBank[1] + (addr & 0x1FFF)
-            return True, mapped_addr, 0x00
-        elif 0xC000 <= addr <= 0xDFFF:
-            mapped_addr = self.pPRGBank[2] + (addr & 0x1FFF)
-            return True, mapped_addr, 0x00
-        elif 0xE000 <= addr <= 0xFFFF:
-            mapped_addr = self.pPRGBank[3] + (addr & 0x1FFF)
-            return True, mapped_addr, 0x00
-        return False, 0x00, 0x00
+            return self.vRAMStatic[addr & 0x1FFF]
+        return -1
 
-    def cpuMapWrite(self, addr: int, data: int) -> (bool, int):
+    def cpuMapWrite(self, addr: int, data: int) -> bool:
         if 0x6000 <= addr <= 0x7FFF:
             # Write to static ram on cartridge
-            mapped_addr = 0xFFFFFFFF
             self.vRAMStatic[addr & 0x1FFF] = data
-            return True, mapped_addr
+            return True
         elif 0x8000 <= addr <= 0x9FFF:
             # Bank Select!
             if not addr & 0x0001:
@@ -89,7 +85,8 @@ class Mapper_004(Mapper):
                     self.pPRGBank[2] = (self._nPRGBanks * 2 - 2) * 0x2000
                 self.pPRGBank[1] = (self.pRegister[7] & 0x3F) * 0x2000
                 self.pPRGBank[3] = (self._nPRGBanks * 2 - 1) * 0x2000
-            return False, 0x00
+                self.updateBanks()
+            return True
         elif 0xA000 <= addr <= 0xBFFF:
             if not addr & 0x0001:
                 if data & 0x01:
@@ -99,18 +96,134 @@ class Mapper_004(Mapper):
             else:
                 # PRG Ram Protect
                 pass
-            return False, 0x00
+            return True
         elif 0xC000 <= addr <= 0xDFFF:
+            self.__syncIRQ()
             if not addr & 0x0001:
                 self.nIRQReload = data
             else:
                 self.nIRQCounter = 0x0000
-            return False, 0x00
+            self.__scheduleIRQ()
+            return True
         elif 0xE000 <= addr <= 0xFFFF:
+            self.__syncIRQ()
             if not addr & 0x0001:
                 self.bIRQEnable = False
                 self.bIRQActive = False
             else:
                 self.bIRQEnable = True
-            return False, 0x00
-        return False, 0x00
+            self.__scheduleIRQ()
+            return True
+        return False
+
+    def updateBanks(self):
+        # pPRGBank / pCHRBank hold byte offsets of 8KB / 1KB banks
+        for i in range(4):
+            self._mapPRG(i, 8, self.pPRGBank[i] // 0x2000)
+        for i in range(8):
+            self._mapCHR(i, 1, self.pCHRBank[i] // 0x0400)
+
+    def save_state(self) -> bytes:
+        return self.STATE.pack(
+            self.nTargetRegister, bool(self.bPRGBankMode), bool(self.bCHRInversion),
+            list(MIRROR).index(self.mirrormode),
+            *self.pRegister, *self.pCHRBank, *self.pPRGBank,
+            self.bIRQActive, self.bIRQEnable, self.bIRQUpdate,
+            self.nIRQCounter, self.nIRQReload, self.nIRQSyncClock
+        ) + bytes(self.vRAMStatic)
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        state = self.STATE.unpack_from(buf, offset)
+        self.nTargetRegister, self.bPRGBankMode, self.bCHRInversion, mirror = state[0:4]
+        self.mirrormode = list(MIRROR)[mirror]
+        self.pRegister[:] = state[4:12]
+        self.pCHRBank[:] = state[12:20]
+        self.pPRGBank[:] = state[20:24]
+        (self.bIRQActive, self.bIRQEnable, self.bIRQUpdate,
+         self.nIRQCounter, self.nIRQReload, self.nIRQSyncClock) = state[24:30]
+        offset += self.STATE.size
+        self.vRAMStatic[:0x2000] = buf[offset:offset + 0x2000]
+        return super().load_state(buf, offset + 0x2000)
+
+    def reset(self):
+        self.nTargetRegister = 0x00
+        self.bPRGBankMode = False
+        self.bCHRInversion = False
+        self.mirrormode = MIRROR.HORIZONTAL
+
+        self.bIRQActive = False
+        self.bIRQEnable = False
+        self.bIRQUpdate = False
+        self.nIRQCounter = 0x0000
+        self.nIRQReload = 0x0000
+        self.__syncIRQ()
+        self.__scheduleIRQ()
+
+        for i in range(4):
+            self.pPRGBank[i] = 0
+        for i in range(8):
+            self.pCHRBank[i] = 0
+            self.pRegister[i] = 0
+
+        self.pPRGBank[0] = 0 * 0x2000
+        self.pPRGBank[1] = 1 * 0x2000
+        self.pPRGBank[2] = (self._nPRGBanks * 2 - 2) * 0x2000
+        self.pPRGBank[3] = (self._nPRGBanks * 2 - 1) * 0x2000
+        self.updateBanks()
+
+    def mirror(self):
+        return self.mirrormode
+
+    def irqState(self):
+        return self.bIRQActive
+
+    def irqClear(self):
+        self.bIRQActive = False
+
+    def scanline(self):
+        """Scheduled scanline clock
+
+        Only called by the ppu on the clock registered in ppu.nIRQClock,
+        the counter reaches zero with the irq enabled right here.
+        """
+        self.__syncIRQ()
+        if self.nIRQCounter == 0 and self.bIRQEnable:
+            self.bIRQActive = True
+        self.__scheduleIRQ()
+
+    def __syncIRQ(self):
+        """Bring the counter up to date with the scanline clocks elapsed since the last sync
+
+        Every clock reloads the counter when it is zero, otherwise decrements it.
+        So once at zero it runs through a cycle of nIRQReload + 1 clocks.
+        """
+        if self._scheduler is None:
+            return
+        now = self._scheduler.nScanlineClocks
+        n = now - self.nIRQSyncClock
+        self.nIRQSyncClock = now
+        if n <= 0:
+            return
+        if self.nIRQCounter > 0:
+            if n <= self.nIRQCounter:
+                self.nIRQCounter -= n
+                return
+            n -= self.nIRQCounter
+            self.nIRQCounter = 0
+        n %= self.nIRQReload + 1
+        if n > 0:
+            self.nIRQCounter = self.nIRQReload - (n - 1)
+
+    def __scheduleIRQ(self):
+        """Predict the scanline clock the counter next hits zero on and register it"""
+        if self._scheduler is None:
+            return
+        if not self.bIRQEnable:
+            self._scheduler.nIRQClock = -1
+            return
+        if self.nIRQCounter > 0:
+            nClocks = self.nIRQCounter
+        else:
+            # Reloads on the next clock, then counts down to zero
+            nClocks = self.nIRQReload + 1 if self.nIRQReload > 0 else 1
+        self._scheduler.nIRQClock = self.nIRQSyncClock + nClocks
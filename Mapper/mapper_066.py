@@ -7,5 +7,7 @@ from Mapper.mapper import Mapper
 
 
 class Mapper_066(Mapper):
+    __slots__ = ()
+
     def __init__(self, prgBanks: int, chrBanks: int):
         super().__init__(prgBanks, chrBanks)
\ No newline at end of file
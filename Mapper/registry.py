@@ -0,0 +1,84 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Mapper Registry
+
+Maps iNES mapper IDs to the module and class implementing them.
+Modules are only imported the first time a cartridge needs them.
+
+Third party mappers register themselves either lazily by module name:
+
+    RegisterMapper(5, "my_mappers.mapper_005", "Mapper_005")
+
+or directly from their own module with the decorator:
+
+    @Register(5)
+    class Mapper_005(Mapper):
+        CAPS = MAPPER_CAPS.IRQ | MAPPER_CAPS.SCANLINE
+
+"""
+
+import importlib
+
+_registry = {
+    0: ("Mapper.mapper_000", "Mapper_000"),
+    1: ("Mapper.mapper_001", "Mapper_001"),
+    2: ("Mapper.mapper_002", "Mapper_002"),
+    3: ("Mapper.mapper_003", "Mapper_003"),
+    4: ("Mapper.mapper_004", "Mapper_004"),
+}
+# Resolved classes, filled on first use
+_classes = {}
+
+
+def RegisterMapper(nMapperID: int, module: str, name: str):
+    """Register a mapper by module path and class name, imported on first use"""
+    _registry[nMapperID] = (module, name)
+    _classes.pop(nMapperID, None)
+
+
+def Register(nMapperID: int):
+    """Class decorator registering an already imported mapper class"""
+    def decorator(cls):
+        _registry[nMapperID] = (cls.__module__, cls.__name__)
+        _classes[nMapperID] = cls
+        return cls
+    return decorator
+
+
+def IsSupported(nMapperID: int) -> bool:
+    return nMapperID in _registry
+
+
+def SupportedMappers() -> list:
+    return sorted(_registry)
+
+
+def LoadMapper(nMapperID: int):
+    """Return the mapper class for the ID, importing its module if needed
+
+    :return: mapper class or None if the ID is not registered
+    """
+    cls = _classes.get(nMapperID)
+    if cls is None:
+        entry = _registry.get(nMapperID)
+        if entry is None:
+            return None
+        module, name = entry
+        cls = getattr(importlib.import_module(module), name)
+        _classes[nMapperID] = cls
+    return cls
+
+
+def MapperCaps(nMapperID: int):
+    """Capability flags (MAPPER_CAPS) of the mapper, None if the ID is not registered"""
+    cls = LoadMapper(nMapperID)
+    return None if cls is None else cls.CAPS
+
+
+def CreateMapper(nMapperID: int, prgBanks: int, chrBanks: int):
+    """Instantiate the mapper, None if the ID is not registered"""
+    cls = LoadMapper(nMapperID)
+    return None if cls is None else cls(prgBanks, chrBanks)
@@ -47,20 +47,109 @@ table ref: https://www.cnblogs.com/xiayong123/archive/2011/08/14/3717572.html
 
 """
 
+import copy
+import gc
+import struct
+
 from cpu import Cpu6502
 from ppu import Ppu2c02
 from cartridge import Cartridge
 
 
+"""Save State
+
+A versioned, fixed-layout binary blob, the offsets only depend on the mapper:
+
+ | HEADER   : magic "RNST", version, mapper id, total size
+ | cpu      : Cpu6502.STATE
+ | BUS      : system clock counter, dma page/addr/data, dma dummy/transfer,
+              frame number, controller shift registers and strobe,
+              controller buttons, input polled / lag frame flags, lag frame count
+ | cpuRam   : 2KB
+ | ppu      : Ppu2c02.STATE + sprites + OAM + name tables + palette
+ | mapper   : mapper STATE + cartridge ram
+ | chrRam   : CHR-RAM if the cartridge has it
+ | prgRam   : 8KB PRG-RAM if the cartridge provides it instead of the mapper
+
+"""
+STATE_MAGIC = b'RNST'
+STATE_VERSION = 3
+STATE_HEADER = struct.Struct('<4sHHI')
+BUS_STATE = struct.Struct('<Q3B2?I3B2B2?I')
+
+
+"""Controller Ports
+
+Standard pads behind $4016 (pad 1) and $4017 (pad 2). Writing 1 then 0 to
+bit 0 of $4016 (strobe) latches the buttons of both pads into their shift
+registers, each read returns the next button in bit 0: A, B, Select, Start,
+Up, Down, Left, Right, then 1s.
+
+The buttons latched come from the input source of the pad (Bus.SetInput):
+
+ | None     : Bus.controller[pad], set by the caller between frames
+ | callable : source(frame) -> buttons, called on every latch
+ | schedule : bytes, one buttons byte per frame number (InputSchedule)
+
+A schedule is looked up without any call back into Python, so scripted
+and replay runs latch at the cost of an index.
+
+"""
+
+
+def InputSchedule(buttons, frames: int = 0) -> bytes:
+    """Compact input schedule, the buttons byte of every frame
+
+    :param buttons: {frame: buttons}, each entry held until the next one,
+        or a sequence of buttons bytes, one per frame
+    :param frames: length of the schedule, by default up to the last entry
+    :return: bytes indexed by frame number, frames past the end have no button pressed
+    """
+    if not isinstance(buttons, dict):
+        schedule = bytearray(buttons)
+        if frames:
+            schedule = schedule[:frames] + bytes(max(frames - len(schedule), 0))
+        return bytes(schedule)
+    nLength = frames or (max(buttons) + 1 if buttons else 0)
+    schedule = bytearray(nLength)
+    held = 0x00
+    nFrame = 0
+    for frame in sorted(buttons):
+        if frame >= nLength:
+            break
+        schedule[nFrame:frame] = bytes([held]) * (frame - nFrame)
+        held = buttons[frame] & 0xFF
+        nFrame = frame
+    schedule[nFrame:nLength] = bytes([held]) * (nLength - nFrame)
+    return bytes(schedule)
+
+
+def FreezeHeap():
+    """Move every object alive now out of reach of the garbage collector
+
+    Call it once the emulator is built and reset, later collections then
+    never traverse the ROM, tables and screen again.
+    """
+    gc.collect()
+    gc.freeze()
+
+
 class Bus:
+    __slots__ = ("__nSystemClockCounter", "cpuRam", "ppu", "cpu", "__cart", "__bCartInserted", "__prgBank",
+                 "dma_page", "dma_addr", "dma_data", "dma_dummy", "dma_transfer", "controller",
+                 "bInputPolled", "bLagFrame", "nLagFrames", "nFrame", "__input", "__shift", "__strobe",
+                 "frame_hook")
+
     def __init__(self):
         self.__nSystemClockCounter = 0
-        self.cpuRam = [0 for i in range(2 * 1024)]  # $0000 ~ $07FF NES 2KB RAM
+        self.cpuRam = bytearray(2 * 1024)  # $0000 ~ $07FF NES 2KB RAM
         self.ppu = Ppu2c02()
         self.cpu = Cpu6502()
         self.cpu.connectBus(self)
         self.__cart = None
         self.__bCartInserted = False
+        # Active PRG-ROM windows published by the mapper
+        self.__prgBank = None
 
         self.dma_page = 0x00
         self.dma_addr = 0x00
@@ -69,33 +158,247 @@ class Bus:
         self.dma_dummy = True
         self.dma_transfer = False
 
+        # Buttons held on pad 1 and 2: A, B, Select, Start, Up, Down, Left, Right from bit 7 to bit 0
+        self.controller = [0x00, 0x00]
+        # Lag frames: frames in which the game never read $4016 / $4017, the input of such a frame is ignored
+        self.bInputPolled = False
+        self.bLagFrame = False
+        self.nLagFrames = 0
+        # Frames completed since reset, the frame number input sources are asked for
+        self.nFrame = 0
+        self.__input = [None, None]
+        self.__shift = [0x00, 0x00]
+        self.__strobe = False
+        # Called with the bus after every frame clockFrame completes, e.g. hashlog.FrameHashLog
+        self.frame_hook = None
+
     def cpuWrite(self, addr: int, data: int):
-        if self.__cart.cpuWrite(addr, data):
-            pass
-        elif 0 < addr < 0x1fff:
+        if 0x0000 <= addr <= 0x1FFF:
             # 8KB [$0000~$1FFF]: 2KB Ram and 3 * 2KB Mirror Ram
             self.cpuRam[addr & 0x07ff] = data
         elif 0x2000 <= addr <= 0x3fff:
             # 8KB [$2000~$3FFF]: 1024 Mirror * 8B PPU Resister
             self.ppu.cpuWrite(addr & 0x0007, data)
+        elif self.__cart.cpuWrite(addr, data):
+            pass
+        elif addr == 0x4014:
+            # OAM DMA: the cpu is suspended while page $XX00 ~ $XXFF is copied into OAM
+            self.dma_page = data
+            self.dma_addr = 0x00
+            self.dma_transfer = True
+        elif addr == 0x4016:
+            # The buttons are latched as long as the strobe is high, so the write lowering it latches too
+            if self.__strobe or data & 0x01:
+                self.__latchControllers()
+            self.__strobe = bool(data & 0x01)
 
     def cpuRead(self, addr: int, readonly: bool) -> int:
-        bCartRead, data = self.__cart.cpuRead(addr, readonly)
-        if bCartRead:
-            pass
-        elif 0 < addr < 0x1fff:
+        if addr >= 0x8000:
+            # 32KB [$8000~$FFFF]: PRG-ROM, straight out of the active bank
+            return self.__prgBank[(addr >> 13) & 0x03][addr & 0x1FFF]
+        if addr <= 0x1FFF:
             # 8KB [$0000~$1FFF]: 2KB Ram and 3 * 2KB Mirror Ram
-            data = self.cpuRam[addr & 0x07ff]
-        elif 0x2000 <= addr <= 0x3fff:
+            return self.cpuRam[addr & 0x07ff]
+        if addr <= 0x3FFF:
             # 8KB [$2000~$3FFF]: 1024 Mirror * 8B PPU Resister
-            data = self.ppu.cpuRead(addr & 0x0007, readonly)
-        return data
+            return self.ppu.cpuRead(addr & 0x0007, readonly)
+        # $4000 ~ $7FFF: io registers and cartridge space (PRG-RAM), open bus reads 0
+        if addr == 0x4016 or addr == 0x4017:
+            return self.__readController(addr & 0x01, readonly)
+        data = self.__cart.cpuRead(addr, readonly)
+        return data if data >= 0 else 0x00
+
+    def SetInput(self, pad: int, source=None):
+        """Where the buttons of a pad come from, see Controller Ports
+
+        :param pad: 0 for pad 1 ($4016), 1 for pad 2 ($4017)
+        :param source: None for Bus.controller, a callable source(frame) -> buttons or a schedule (InputSchedule)
+        """
+        if source is not None and not callable(source):
+            source = bytes(source)
+        self.__input[pad] = source
+
+    def GetInput(self, pad: int):
+        return self.__input[pad]
+
+    def __latchControllers(self):
+        nFrame = self.nFrame
+        for pad in (0, 1):
+            source = self.__input[pad]
+            if source is None:
+                buttons = self.controller[pad]
+            elif callable(source):
+                buttons = self.controller[pad] = source(nFrame) & 0xFF
+            else:
+                buttons = self.controller[pad] = source[nFrame] if nFrame < len(source) else 0x00
+            self.__shift[pad] = buttons
+
+    def __readController(self, pad: int, readonly: bool) -> int:
+        if self.__strobe and not readonly:
+            self.__latchControllers()
+        shift = self.__shift[pad]
+        if not readonly:
+            self.bInputPolled = True
+            if not self.__strobe:
+                # Pads shift 1s in once the 8 buttons are out
+                self.__shift[pad] = ((shift << 1) | 0x01) & 0xFF
+        return (shift >> 7) & 0x01
+
+    def clockFrame(self, pause_gc: bool = False, skip_lag: int = 0, until: int = -1) -> int:
+        """Clock the system until the ppu completes the current frame
+
+        After the frame bLagFrame tells if the game never read the controller
+        ports during it, nLagFrames counts such frames since reset.
+
+        :param pause_gc: keep the cyclic garbage collector off during the frame,
+            a collection then only runs between frames
+        :param skip_lag: keep emulating while the completed frame is a lag frame,
+            for at most skip_lag more frames, the caller only sees frames that took input
+        :param until: stop at this master clock (GetSystemClock) even in the middle of
+            a frame, the next call goes on with that frame, -1 for no limit
+        :return: number of frames completed
+        """
+        ppu = self.ppu
+        nFrames = 0
+        bEnabled = pause_gc and gc.isenabled()
+        if bEnabled:
+            gc.disable()
+        try:
+            while True:
+                if until < 0:
+                    while not ppu.frame_complete:
+                        self.clock()
+                else:
+                    while not ppu.frame_complete and self.__nSystemClockCounter < until:
+                        self.clock()
+                    if not ppu.frame_complete:
+                        break
+                ppu.frame_complete = False
+                self.nFrame += 1
+                nFrames += 1
+                self.bLagFrame = not self.bInputPolled
+                self.bInputPolled = False
+                if self.frame_hook is not None:
+                    self.frame_hook(self)
+                if not self.bLagFrame:
+                    break
+                self.nLagFrames += 1
+                if nFrames > skip_lag:
+                    break
+        finally:
+            if bEnabled:
+                gc.enable()
+        return nFrames
+
+    def GetCartridge(self) -> Cartridge:
+        return self.__cart
+
+    def GetSystemClock(self) -> int:
+        """Master clock ticks since reset, one per ppu dot"""
+        return self.__nSystemClockCounter
 
     def insertCartridge(self, cart: Cartridge):
         self.__cart = cart
+        self.__prgBank = cart.GetMapper().vPRGBank
+        cart.GetMapper().connectScheduler(self.ppu)
         self.ppu.connectCart(self.__cart)
         self.__bCartInserted = True
 
+    def save_state(self) -> bytes:
+        """Snapshot the whole system
+
+        :return: the save state blob
+        """
+        body = b''.join((
+            self.cpu.save_state(),
+            BUS_STATE.pack(self.__nSystemClockCounter, self.dma_page & 0xFF, self.dma_addr & 0xFF,
+                           self.dma_data & 0xFF, self.dma_dummy, self.dma_transfer, self.nFrame,
+                           self.__shift[0], self.__shift[1], self.__strobe,
+                           self.controller[0] & 0xFF, self.controller[1] & 0xFF,
+                           self.bInputPolled, self.bLagFrame, self.nLagFrames),
+            bytes(self.cpuRam),
+            self.ppu.save_state(),
+            self.__cart.GetMapper().save_state(),
+            bytes(self.__cart.vCHRMemory) if self.__cart.bCHRRam else b'',
+            bytes(self.__cart.vPRGRam) if self.__cart.bPRGRam else b'',
+        ))
+        return STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, self.__cart.nMapperID,
+                                 STATE_HEADER.size + len(body)) + body
+
+    def load_state(self, buf):
+        """Restore a snapshot taken by save_state
+
+        Input sources (SetInput) and frame_hook are left as they are, they are
+        wiring of the host rather than emulator state: a movie attaches its
+        schedules again after loading a keyframe (Movie.attach).
+
+        :param buf: any buffer (bytes, bytearray, mmap, memoryview), it is read in place
+        """
+        buf = memoryview(buf)
+        magic, version, nMapperID, size = STATE_HEADER.unpack_from(buf, 0)
+        if magic != STATE_MAGIC or version != STATE_VERSION:
+            raise ValueError("Not a version {} save state".format(STATE_VERSION))
+        if nMapperID != self.__cart.nMapperID or size > len(buf):
+            raise ValueError("Save state does not match the inserted cartridge")
+
+        offset = self.cpu.load_state(buf, STATE_HEADER.size)
+        (self.__nSystemClockCounter, self.dma_page, self.dma_addr,
+         self.dma_data, self.dma_dummy, self.dma_transfer, self.nFrame,
+         self.__shift[0], self.__shift[1], self.__strobe,
+         self.controller[0], self.controller[1],
+         self.bInputPolled, self.bLagFrame, self.nLagFrames) = BUS_STATE.unpack_from(buf, offset)
+        offset += BUS_STATE.size
+        self.cpuRam[:] = buf[offset:offset + 2048]
+        offset += 2048
+        offset = self.ppu.load_state(buf, offset)
+        offset = self.__cart.GetMapper().load_state(buf, offset)
+        if self.__cart.bCHRRam:
+            nSize = len(self.__cart.vCHRMemory)
+            self.__cart.vCHRMemory[:] = buf[offset:offset + nSize]
+            offset += nSize
+        if self.__cart.bPRGRam:
+            self.__cart.vPRGRam[:] = buf[offset:offset + 0x2000]
+
+    def clone(self, render: bool = False):
+        """Independent copy of the running emulator
+
+        Shares the ROM images and lookup tables, copies only the mutable state
+        (ram, vram, OAM, registers, mapper state). Much cheaper than deepcopy
+        or building a new Bus, meant for tree search rollouts.
+
+        :param render: if false the clone emulates without producing pixels
+        """
+        bus = copy.copy(self)
+        bus.cpuRam = self.cpuRam[:]
+        bus.controller = self.controller[:]
+        bus.__input = self.__input[:]
+        bus.__shift = self.__shift[:]
+        bus.frame_hook = None
+        bus.cpu = self.cpu.clone()
+        bus.cpu.connectBus(bus)
+        bus.ppu = self.ppu.clone(render)
+        if self.__cart is not None:
+            bus.__cart = self.__cart.clone()
+            bus.__prgBank = bus.__cart.GetMapper().vPRGBank
+            bus.__cart.GetMapper().connectScheduler(bus.ppu)
+            bus.ppu.connectCart(bus.__cart)
+        return bus
+
+    def __clockDMA(self):
+        """One cpu cycle of OAM DMA, the cpu is suspended meanwhile"""
+        if self.dma_dummy:
+            if self.__nSystemClockCounter % 2 == 1:
+                self.dma_dummy = False
+        else:
+            if self.__nSystemClockCounter % 2 == 0:
+                self.dma_data = self.cpuRead(self.dma_page << 8 | self.dma_addr, False)
+            else:
+                self.ppu.writeOAM(self.dma_addr, self.dma_data)
+                self.dma_addr = (self.dma_addr + 1) & 0xFF
+                if self.dma_addr == 0x00:
+                    self.dma_transfer = False
+                    self.dma_dummy = True
+
     def reset(self):
         self.__cart.reset()
         self.cpu.reset()
@@ -106,23 +409,18 @@ class Bus:
         self.dma_data = 0x00
         self.dma_dummy = True
         self.dma_transfer = False
+        self.bInputPolled = False
+        self.bLagFrame = False
+        self.nLagFrames = 0
+        self.nFrame = 0
+        self.__shift = [0x00, 0x00]
+        self.__strobe = False
 
     def clock(self):
         self.ppu.clock()
         if self.__nSystemClockCounter % 3 == 0:
             if self.dma_transfer:
-                if self.dma_dummy:
-                    if self.__nSystemClockCounter % 2 == 1:
-                        self.dma_dummy = False
-                else:
-                    if self.__nSystemClockCounter % 2 == 0:
-                        self.dma_data = self.cpuRead(self.dma_page << 8 | self.dma_addr, False)
-                    else:
-                        self.ppu.OAM[self.dma_addr] = self.dma_data
-                        self.dma_addr += 1
-                        if self.dma_addr == 0x00:
-                            self.dma_transfer = False
-                            self.dma_dummy = True
+                self.__clockDMA()
             else:
                 self.cpu.clock()
 
@@ -130,7 +428,9 @@ class Bus:
             self.ppu.nmi = False
             self.cpu.nmi()
 
-        if self.__cart.GetMapper().irqState():
+        if self.ppu.irq:
+            # Raised by the ppu on the scanline clock the mapper scheduled
+            self.ppu.irq = False
             self.__cart.GetMapper().irqClear()
             self.cpu.irq()
 
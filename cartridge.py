@@ -3,123 +3,214 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-18
 """
 
-from Mapper.mapper import Mapper
-from Mapper.mapper_000 import Mapper_000
-from Mapper.mapper_001 import Mapper_001
-from Mapper.mapper_002 import Mapper_002
-from Mapper.mapper_003 import Mapper_003
-from Mapper.mapper_004 import Mapper_004
-from utils import MIRROR
+import copy
+import mmap
+import struct
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from Mapper.registry import CreateMapper
+from utils import MIRROR, MAPPER_CAPS
+
+"""iNES / NES 2.0 Header
+
+ | 0-3   : "NES" + $1A
+ | 4     : PRG-ROM size LSB (16KB units)
+ | 5     : CHR-ROM size LSB (8KB units)
+ | 6     : flags 6  (mapper D0..D3, four screen, trainer, battery, mirroring)
+ | 7     : flags 7  (mapper D4..D7, NES 2.0 identifier, console type)
+ | 8     : iNES: PRG-RAM size (8KB units)     NES 2.0: submapper, mapper D8..D11
+ | 9     : iNES: TV system                    NES 2.0: CHR-ROM / PRG-ROM size MSB
+ | 10    : NES 2.0: PRG-RAM / PRG-NVRAM shift count
+ | 11    : NES 2.0: CHR-RAM / CHR-NVRAM shift count
+ | 12    : NES 2.0: CPU/PPU timing
+ | 13-15 : NES 2.0: system type, misc roms, default expansion device
+
+"""
+HEADER = struct.Struct('<4s12B')
+TRAINER_SIZE = 512
+
+
+def romSize(lsb: int, msb: int, unit: int) -> int:
+    """Decode a NES 2.0 ROM size
+
+    If the MSB nibble is $F the LSB uses exponent-multiplier notation:
+    size = 2^E * (MM * 2 + 1), with LSB = EEEEEEMM
+    """
+    if msb == 0x0F:
+        return (1 << (lsb >> 2)) * ((lsb & 0x03) * 2 + 1)
+    return ((msb << 8) | lsb) * unit
 
 
 class Cartridge(object):
-    def __init__(self, path):
+    def __init__(self, path=None, memory_map: bool = False, image=None):
+        """Load an iNES / NES 2.0 image
+
+        :param path: the .nes file
+        :param memory_map: if true PRG/CHR-ROM are memoryviews into a read-only
+            mmap of the file instead of bytes copied into the process
+        :param image: an already loaded image (bytes-like) used instead of path,
+            PRG/CHR-ROM are slices of it (zero-copy for memoryviews)
+        """
         self.bImageValid = False
 
+        self.nFileType = 0
         self.nMapperID = 0
+        self.nSubMapperID = 0
         self.nPRGBanks = 0
         self.nCHRBanks = 0
+        self.nPRGRamSize = 0
+        self.nCHRRamSize = 0
+        self.nTVSystem = 0
+        self.bBattery = False
+        self.bFourScreen = False
+        self.bCHRRam = False
+        # PRG-RAM the cartridge provides itself, for a trainer on a mapper without cartridge ram
+        self.bPRGRam = False
+        self.vPRGRam = None
 
-        self.vPRGMemory = []
-        self.vCHRMemory = []
+        self.vPRGMemory = b''
+        self.vCHRMemory = b''
+        self.vTrainer = b''
         self.hw_mirror = MIRROR.HORIZONTAL
         self.pMapper = None
 
-        with open(path, 'rb') as f:
-            name = str(f.read(4), encoding='utf-8')
-            prg_rom_chunks = int.from_bytes(f.read(1), byteorder='little')
-            chr_rom_chunks = int.from_bytes(f.read(1), byteorder='little')
-            mapper1 = int.from_bytes(f.read(1), byteorder='little')
-            mapper2 = int.from_bytes(f.read(1), byteorder='little')
-            prg_ram_size = int.from_bytes(f.read(1), byteorder='little')
-            tv_system1 = int.from_bytes(f.read(1), byteorder='little')
-            tv_system2 = int.from_bytes(f.read(1), byteorder='little')
-            unused = int.from_bytes(f.read(5), byteorder='little')
-            # Print Cartridge INFO
-            print(
-                "Cartridge Info:\n" +
-                "\tName: {}\n".format(name) +
-                "\tPRG Chunks: {}\n".format(prg_rom_chunks) +
-                "\tCHR Chunks: {}\n".format(chr_rom_chunks) +
-                "\tMapper1: {}\n".format(mapper1) +
-                "\tMapper2: {}\n".format(mapper2) +
-                "\tPRG RAM Size: {}\n".format(prg_ram_size) +
-                "\tTV System 1: {}\n".format(tv_system1) +
-                "\tTV System 2: {}\n".format(tv_system2) +
-                "\tUnused: {}\n".format(unused)
-            )
-
-            # File Type
-            nFileType = 2 if (mapper2 & 0x0C) == 0x08 else 1
-            # According to file type, set nPRG and nCHR
-            if nFileType == 1:
-                self.nPRGBanks = prg_rom_chunks
-                self.vPRGMemory = list(f.read(self.nPRGBanks * 16384))  # PRG SIZE = nPRG * 16KB
-                self.nCHRBanks = chr_rom_chunks
-                self.vCHRMemory = list(f.read(self.nCHRBanks * 8192))  # CHR SIZE = nCHR * 8KB
-            elif nFileType == 2:
-                pass
-
-            # mirror type
-            self.hw_mirror = MIRROR.VERTICAL if mapper1 & 0x01 > 0 else MIRROR.HORIZONTAL
-            # mapper selection
-            self.nMapperID = ((mapper2 >> 4) << 4) | (mapper1 >> 4)
-            if self.nMapperID == 0:
-                self.pMapper = Mapper_000(self.nPRGBanks, self.nCHRBanks)
-            elif self.nMapperID == 1:
-                self.pMapper = Mapper_001(self.nPRGBanks, self.nCHRBanks)
-            elif self.nMapperID == 2:
-                self.pMapper = Mapper_002(self.nPRGBanks, self.nCHRBanks)
-            elif self.nMapperID == 3:
-                self.pMapper = Mapper_003(self.nPRGBanks, self.nCHRBanks)
-            elif self.nMapperID == 4:
-                self.pMapper = Mapper_004(self.nPRGBanks, self.nCHRBanks)
+        if image is None:
+            with open(path, 'rb') as f:
+                if memory_map:
+                    image = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                else:
+                    image = f.read()
+        self.__load(image)
+
+    def __load(self, image):
+        if len(image) < HEADER.size:
+            return
+        (name, prg_lsb, chr_lsb, flags6, flags7,
+         flags8, flags9, flags10, flags11, flags12, _, _, _) = HEADER.unpack_from(image)
+        if bytes(name) != b'NES\x1a':
+            return
+
+        # File Type: 1 for iNES, 2 for NES 2.0
+        self.nFileType = 2 if (flags7 & 0x0C) == 0x08 else 1
+        self.nMapperID = (flags7 & 0xF0) | (flags6 >> 4)
+        self.bBattery = (flags6 & 0x02) > 0
+        self.bFourScreen = (flags6 & 0x08) > 0
+        # mirror type
+        self.hw_mirror = MIRROR.VERTICAL if flags6 & 0x01 > 0 else MIRROR.HORIZONTAL
+
+        if self.nFileType == 1:
+            nPRGSize = prg_lsb * 16384  # PRG SIZE = nPRG * 16KB
+            nCHRSize = chr_lsb * 8192  # CHR SIZE = nCHR * 8KB
+            self.nPRGRamSize = (flags8 or 1) * 8192
+            self.nCHRRamSize = 8192 if nCHRSize == 0 else 0
+            self.nTVSystem = flags9 & 0x01
+        else:
+            self.nMapperID |= (flags8 & 0x0F) << 8
+            self.nSubMapperID = flags8 >> 4
+            nPRGSize = romSize(prg_lsb, flags9 & 0x0F, 16384)
+            nCHRSize = romSize(chr_lsb, flags9 >> 4, 8192)
+            self.nPRGRamSize = 64 << (flags10 & 0x0F) if flags10 & 0x0F else 0
+            self.nCHRRamSize = 64 << (flags11 & 0x0F) if flags11 & 0x0F else 0
+            self.nTVSystem = flags12 & 0x03
+            if nCHRSize == 0 and self.nCHRRamSize == 0:
+                self.nCHRRamSize = 8192
+
+        offset = HEADER.size
+        if flags6 & 0x04:
+            self.vTrainer = image[offset:offset + TRAINER_SIZE]
+            offset += TRAINER_SIZE
+        if len(image) < offset + nPRGSize + nCHRSize:
+            return
+
+        self.nPRGBanks = nPRGSize // 16384
+        self.vPRGMemory = image[offset:offset + nPRGSize]
+        offset += nPRGSize
+        self.nCHRBanks = nCHRSize // 8192
+        if nCHRSize == 0:
+            # No CHR-ROM, the cartridge provides writable CHR-RAM instead
+            self.bCHRRam = True
+            self.vCHRMemory = bytearray(self.nCHRRamSize)
+        else:
+            self.vCHRMemory = image[offset:offset + nCHRSize]
+
+        # mapper selection, the module is only imported when first needed
+        self.pMapper = CreateMapper(self.nMapperID, self.nPRGBanks, self.nCHRBanks)
+        if self.pMapper is None:
+            # Unsupported mapper, the image is left invalid
+            return
+        # Publish the initial bank windows over the images
+        self.pMapper.connectMemory(self.vPRGMemory, self.vCHRMemory)
+        if len(self.vTrainer) > 0:
+            # The trainer lives at $7000 ~ $71FF of the cartridge ram
+            if self.pMapper.CAPS & MAPPER_CAPS.PRG_RAM:
+                ram = self.pMapper.vRAMStatic
             else:
-                self.pMapper = Mapper(self.nPRGBanks, self.nCHRBanks)
-            print(
-                "SUMINFO:\nFileType: {}, MapperID: {},\n".format(nFileType, self.nMapperID) +
-                "PRG Banks: {}, CHR Banks: {},\nMirrorType: {}".format(self.nPRGBanks, self.nCHRBanks, self.hw_mirror)
-            )
+                # Mappers without cartridge ram (NROM, UxROM, CNROM, ...) get 8KB from the cartridge
+                self.bPRGRam = True
+                self.vPRGRam = ram = bytearray(8 * 1024)
+            ram[0x1000:0x1000 + len(self.vTrainer)] = self.vTrainer
         self.bImageValid = True
 
+    def Info(self) -> str:
+        return (
+            "Cartridge Info:\n" +
+            "\tFileType: {}, MapperID: {}, SubMapperID: {}\n".format(
+                self.nFileType, self.nMapperID, self.nSubMapperID) +
+            "\tPRG Banks: {}, CHR Banks: {}\n".format(self.nPRGBanks, self.nCHRBanks) +
+            "\tPRG RAM Size: {}, CHR RAM Size: {}\n".format(self.nPRGRamSize, self.nCHRRamSize) +
+            "\tMirrorType: {}, Four Screen: {}, Battery: {}\n".format(
+                self.hw_mirror, self.bFourScreen, self.bBattery) +
+            "\tTV System: {}, Trainer: {}".format(self.nTVSystem, len(self.vTrainer) > 0)
+        )
+
+    def clone(self):
+        """Copy sharing the ROM images, with its own CHR-RAM and mapper state"""
+        cart = copy.copy(self)
+        if self.bCHRRam:
+            cart.vCHRMemory = bytearray(self.vCHRMemory)
+        if self.bPRGRam:
+            cart.vPRGRam = bytearray(self.vPRGRam)
+        cart.pMapper = self.pMapper.clone(cart.vCHRMemory)
+        return cart
+
     def ImageValid(self) -> bool:
         return self.bImageValid
 
     def cpuWrite(self, addr: int, data: int) -> bool:
-        flag, mapped_addr = self.pMapper.cpuMapWrite(addr, data)
-        if flag:
-            if mapped_addr == 0xFFFFFFFF:
-                return True
-            else:
-                self.vPRGMemory[mapped_addr] = data
-                return True
-        else:
-            return False
+        # Mapper registers and cartridge ram are handled by the mapper itself,
+        # PRG-ROM is never written
+        if self.pMapper.cpuMapWrite(addr, data):
+            return True
+        if self.bPRGRam and 0x6000 <= addr <= 0x7FFF:
+            self.vPRGRam[addr & 0x1FFF] = data
+            return True
+        return False
 
-    def cpuRead(self, addr: int, readonly: bool) -> (bool, int):
-        flag, mapped_addr, data = self.pMapper.cpuMapRead(addr)
-        if flag:
-            if mapped_addr == 0xFFFFFFFF:
-                return True, data
-            else:
-                data = self.vPRGMemory[mapped_addr]
-                return True, data
-        else:
-            return False, 0x00
+    def cpuRead(self, addr: int, readonly: bool) -> int:
+        """
+        :return: data, -1 if the cartridge does not respond to addr
+        """
+        if addr >= 0x8000:
+            return self.pMapper.vPRGBank[(addr >> 13) & 0x03][addr & 0x1FFF]
+        data = self.pMapper.cpuMapRead(addr)
+        if data < 0 and self.bPRGRam and 0x6000 <= addr <= 0x7FFF:
+            return self.vPRGRam[addr & 0x1FFF]
+        return data
 
     def ppuWrite(self, addr: int, data: int) -> bool:
-        flag, mapped_addr = self.pMapper.cpuMapWrite(addr, data)
-        if flag:
-            self.vCHRMemory[mapped_addr] = data
+        if 0x0000 <= addr <= 0x1FFF:
+            if self.bCHRRam:
+                # CHR-RAM, the windows are writable views
+                self.pMapper.vCHRBank[addr >> 10][addr & 0x03FF] = data
             return True
         else:
             return False
 
     def ppuRead(self, addr: int) -> (bool, int):
-        flag, mapped_addr = self.pMapper.ppuMapRead(addr)
-        if flag:
-            data = self.vCHRMemory[mapped_addr]
-            return True, data
+        if 0x0000 <= addr <= 0x1FFF:
+            return True, self.pMapper.vCHRBank[addr >> 10][addr & 0x03FF]
         else:
             return False, 0x0
 
@@ -136,3 +227,69 @@ class Cartridge(object):
             return self.hw_mirror
         else:
             return m
+
+
+def AttachSharedMemory(name: str) -> SharedMemory:
+    """Attach to a segment created by another process, which stays its owner"""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # Before python 3.13 attaching registers the segment with the resource
+    # tracker, which would unlink it when this process exits. Only the
+    # creator stays registered
+    shm = SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def UnlinkSharedMemory(shm: SharedMemory):
+    """Destroy a segment created by this process"""
+    if sys.version_info < (3, 13):
+        # Workers started by multiprocessing share the tracker of the creator,
+        # so the unregister of their attach also took its registration away.
+        # Registering again keeps unlink from unregistering an unknown name
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class SharedRom(object):
+    """ROM image in a named shared memory segment
+
+    The parent loads the file once with SharedRom(path), workers attach to it
+    with SharedRom(name=...) (or simply receive the pickled object) and build
+    their cartridges with GetCartridge(). PRG/CHR-ROM of those cartridges are
+    read-only views into the segment, so every worker and its mapper reads the
+    same physical pages. Only CHR-RAM and the mapper state are per process.
+
+    The creator owns the segment and must unlink() it when the pool is done.
+    """
+
+    def __init__(self, path=None, name=None):
+        if name is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.__shm = SharedMemory(create=True, size=max(len(data), 1))
+            self.__shm.buf[:len(data)] = data
+            self.bOwner = True
+        else:
+            self.__shm = AttachSharedMemory(name)
+            self.bOwner = False
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    def GetCartridge(self) -> Cartridge:
+        return Cartridge(image=self.__shm.buf.toreadonly())
+
+    def close(self):
+        """Detach from the segment, all cartridges built from it must be released first"""
+        self.__shm.close()
+
+    def unlink(self):
+        """Destroy the segment, only for the creator"""
+        if self.bOwner:
+            UnlinkSharedMemory(self.__shm)
+
+    def __reduce__(self):
+        # Workers re-attach by name instead of copying the image
+        return SharedRom, (None, self.name)
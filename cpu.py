@@ -3,6 +3,10 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-23
 """
 
+import copy
+import functools
+import struct
+
 from utils import INSTRUCTION, FLAGS
 
 
@@ -10,6 +14,12 @@ class Cpu6502(object):
     """The 6502 CPU Emulation:
 
     """
+    # Save state layout: a, x, y, stkp, status, fetched, opcode, pc, temp, addr_abs, addr_rel, cycles, clock
+    STATE = struct.Struct('<7B4HIQ')
+    # Instruction table of unbound handlers, shared at class level
+    LOOKUP = None
+    __slots__ = ("a", "x", "y", "pc", "stkp", "status", "__fetched", "__temp", "__addr_abs", "__addr_rel",
+                 "__opcode", "__cycles", "__clock", "nInstructions", "bTrace", "__lookup", "__bus")
 
     def __init__(self):
         """CPU Register
@@ -36,8 +46,13 @@ class Cpu6502(object):
         # Clock and Cycle
         self.__cycles = 0
         self.__clock = 0
-        # Instruction map
-        self.__lookup = self.__InitLookup()
+        self.nInstructions = 0  # executed instructions, for throughput statistics
+        # Print every executed instruction
+        self.bTrace = False
+        # Instruction map, built once and shared by every cpu
+        if Cpu6502.LOOKUP is None:
+            Cpu6502.LOOKUP = Cpu6502.__InitLookup()
+        self.__lookup = Cpu6502.LOOKUP
         # Device
         self.__bus = None
 
@@ -84,9 +99,10 @@ class Cpu6502(object):
             # Push the status data to the stack
             self.__SetFlag(FLAGS.B, False)
             self.__SetFlag(FLAGS.U, True)
-            self.__SetFlag(FLAGS.I, True)
             self.__write(0x0100 + self.stkp, self.status)
             self.stkp -= 1
+            # Interrupts are disabled after the status is pushed, RTI enables them again
+            self.__SetFlag(FLAGS.I, True)
             # Get new program counter
             self.__addr_abs = 0xFFFE
             lo = self.__read(self.__addr_abs + 0)
@@ -107,9 +123,9 @@ class Cpu6502(object):
         # update flag
         self.__SetFlag(FLAGS.B, False)
         self.__SetFlag(FLAGS.U, True)
-        self.__SetFlag(FLAGS.I, True)
         self.__write(0x0100 + self.stkp, self.status)
         self.stkp -= 1
+        self.__SetFlag(FLAGS.I, True)
         # Set new pc
         self.__addr_abs = 0xFFFA
         lo = self.__read(self.__addr_abs + 0)
@@ -135,23 +151,63 @@ class Cpu6502(object):
             self.__SetFlag(FLAGS.U, True)
             self.pc += 1
             self.__cycles = self.__lookup[self.__opcode].cycles
-            additional_cycle_1 = self.__lookup[self.__opcode].addrmode()
-            additional_cycle_2 = self.__lookup[self.__opcode].operate()
+            additional_cycle_1 = self.__lookup[self.__opcode].addrmode(self)
+            additional_cycle_2 = self.__lookup[self.__opcode].operate(self)
             self.__cycles += (additional_cycle_1 & additional_cycle_2)
             self.__SetFlag(FLAGS.U, True)
-
-
-            print(
-                "CPU CLOCK INFO:\n" +
-                "OP: {} ADDR: {}, \nPC: {}, CYCLE: {}\n".format(
-                    self.__lookup[self.__opcode].opname,
-                    self.__lookup[self.__opcode].addrmode.__name__,
-                    hex(self.pc), self.__cycles)
-            )
+            self.nInstructions += 1
+
+            if self.bTrace:
+                print(
+                    "CPU CLOCK INFO:\n" +
+                    "OP: {} ADDR: {}, \nPC: {}, CYCLE: {}\n".format(
+                        self.__lookup[self.__opcode].opname,
+                        self.__lookup[self.__opcode].addrmode.__name__,
+                        hex(self.pc), self.__cycles)
+                )
         # Update counter per clock
         self.__clock += 1
         self.__cycles -= 1
 
+    def save_state(self) -> bytes:
+        """Pack the registers into STATE
+
+        Registers are only masked at the start of the next instruction,
+        so they are masked here as well.
+        """
+        return self.STATE.pack(
+            self.a & 0xFF, self.x & 0xFF, self.y & 0xFF, self.stkp & 0xFF, self.status & 0xFF,
+            self.__fetched & 0xFF, self.__opcode & 0xFF,
+            self.pc & 0xFFFF, self.__temp & 0xFFFF, self.__addr_abs & 0xFFFF, self.__addr_rel & 0xFFFF,
+            self.__cycles, self.__clock
+        )
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        """Unpack the registers from STATE at offset
+
+        :return: the offset following the cpu state
+        """
+        (self.a, self.x, self.y, self.stkp, self.status,
+         self.__fetched, self.__opcode,
+         self.pc, self.__temp, self.__addr_abs, self.__addr_rel,
+         self.__cycles, self.__clock) = self.STATE.unpack_from(buf, offset)
+        return offset + self.STATE.size
+
+    def clone(self):
+        """Copy of the registers sharing the instruction table, connect it to a bus before use"""
+        return copy.copy(self)
+
+    def getLookup(self) -> list:
+        return self.__lookup
+
+    def setLookup(self, lookup=None):
+        """Swap the instruction table of this cpu
+
+        :param lookup: 256 INSTRUCTIONs with the same semantics (e.g. instrumented
+            handlers), None restores the shared table
+        """
+        self.__lookup = Cpu6502.LOOKUP if lookup is None else lookup
+
     def complete(self) -> bool:
         """Completes the Instruction and return true"""
         return self.__cycles == 0
@@ -168,7 +224,8 @@ class Cpu6502(object):
         return self.__bus.cpuWrite(addr, data)
 
     def __fetch(self) -> int:
-        if not self.__lookup[self.__opcode].addrmode == self.__IMP:
+        # Addressing modes are compared on the shared table, self.__lookup may be an instrumented copy
+        if Cpu6502.LOOKUP[self.__opcode].addrmode is not Cpu6502.__IMP:
             self.__fetched = self.__read(self.__addr_abs)
         return self.__fetched
 
@@ -181,264 +238,265 @@ class Cpu6502(object):
     def __GetFlag(self, flag: FLAGS):
         return 1 if (self.status & flag.value) > 0 else 0
 
-    def __InitLookup(self):
+    @classmethod
+    def __InitLookup(cls):
         instruction_array = [
-            INSTRUCTION("BRK", self.__BRK, self.__IMM, 7),  # 0x00
-            INSTRUCTION("ORA", self.__ORA, self.__IZX, 6),  # 0x01
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),  # 0x02
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),  # 0x03
-            INSTRUCTION("???", self.__NOP, self.__IMP, 3),
-            INSTRUCTION("ORA", self.__ORA, self.__ZP0, 3),
-            INSTRUCTION("ASL", self.__ASL, self.__ZP0, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("PHP", self.__PHP, self.__IMP, 3),
-            INSTRUCTION("ORA", self.__ORA, self.__IMM, 2),
-            INSTRUCTION("ASL", self.__ASL, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("ORA", self.__ORA, self.__ABS, 4),
-            INSTRUCTION("ASL", self.__ASL, self.__ABS, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("BPL", self.__BPL, self.__REL, 2),
-            INSTRUCTION("ORA", self.__ORA, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("ORA", self.__ORA, self.__ZPX, 4),
-            INSTRUCTION("ASL", self.__ASL, self.__ZPX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("CLC", self.__CLC, self.__IMP, 2),
-            INSTRUCTION("ORA", self.__ORA, self.__ABY, 4),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("ORA", self.__ORA, self.__ABX, 4),
-            INSTRUCTION("ASL", self.__ASL, self.__ABX, 7),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("JSR", self.__JSR, self.__ABS, 6),
-            INSTRUCTION("AND", self.__AND, self.__IZX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("BIT", self.__BIT, self.__ZP0, 3),
-            INSTRUCTION("AND", self.__AND, self.__ZP0, 3),
-            INSTRUCTION("ROL", self.__ROL, self.__ZP0, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("PLP", self.__PLP, self.__IMP, 4),
-            INSTRUCTION("AND", self.__AND, self.__IMM, 2),
-            INSTRUCTION("ROL", self.__ROL, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("BIT", self.__BIT, self.__ABS, 4),
-            INSTRUCTION("AND", self.__AND, self.__ABS, 4),
-            INSTRUCTION("ROL", self.__ROL, self.__ABS, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("BMI", self.__BMI, self.__REL, 2),
-            INSTRUCTION("AND", self.__AND, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("AND", self.__AND, self.__ZPX, 4),
-            INSTRUCTION("ROL", self.__ROL, self.__ZPX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("SEC", self.__SEC, self.__IMP, 2),
-            INSTRUCTION("AND", self.__AND, self.__ABY, 4),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("AND", self.__AND, self.__ABX, 4),
-            INSTRUCTION("ROL", self.__ROL, self.__ABX, 7),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("RTI", self.__RTI, self.__IMP, 6),
-            INSTRUCTION("EOR", self.__EOR, self.__IZX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 3),
-            INSTRUCTION("EOR", self.__EOR, self.__ZP0, 3),
-            INSTRUCTION("LSR", self.__LSR, self.__ZP0, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("PHA", self.__PHA, self.__IMP, 3),
-            INSTRUCTION("EOR", self.__EOR, self.__IMM, 2),
-            INSTRUCTION("LSR", self.__LSR, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("JMP", self.__JMP, self.__ABS, 3),
-            INSTRUCTION("EOR", self.__EOR, self.__ABS, 4),
-            INSTRUCTION("LSR", self.__LSR, self.__ABS, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("BVC", self.__BVC, self.__REL, 2),
-            INSTRUCTION("EOR", self.__EOR, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("EOR", self.__EOR, self.__ZPX, 4),
-            INSTRUCTION("LSR", self.__LSR, self.__ZPX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("CLI", self.__CLI, self.__IMP, 2),
-            INSTRUCTION("EOR", self.__EOR, self.__ABY, 4),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("EOR", self.__EOR, self.__ABX, 4),
-            INSTRUCTION("LSR", self.__LSR, self.__ABX, 7),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("RTS", self.__RTS, self.__IMP, 6),
-            INSTRUCTION("ADC", self.__ADC, self.__IZX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 3),
-            INSTRUCTION("ADC", self.__ADC, self.__ZP0, 3),
-            INSTRUCTION("ROR", self.__ROR, self.__ZP0, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("PLA", self.__PLA, self.__IMP, 4),
-            INSTRUCTION("ADC", self.__ADC, self.__IMM, 2),
-            INSTRUCTION("ROR", self.__ROR, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("JMP", self.__JMP, self.__IND, 5),
-            INSTRUCTION("ADC", self.__ADC, self.__ABS, 4),
-            INSTRUCTION("ROR", self.__ROR, self.__ABS, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("BVS", self.__BVS, self.__REL, 2),
-            INSTRUCTION("ADC", self.__ADC, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("ADC", self.__ADC, self.__ZPX, 4),
-            INSTRUCTION("ROR", self.__ROR, self.__ZPX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("SEI", self.__SEI, self.__IMP, 2),
-            INSTRUCTION("ADC", self.__ADC, self.__ABY, 4),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("ADC", self.__ADC, self.__ABX, 4),
-            INSTRUCTION("ROR", self.__ROR, self.__ABX, 7),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("STA", self.__STA, self.__IZX, 6),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("STY", self.__STY, self.__ZP0, 3),
-            INSTRUCTION("STA", self.__STA, self.__ZP0, 3),
-            INSTRUCTION("STX", self.__STX, self.__ZP0, 3),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 3),
-            INSTRUCTION("DEY", self.__DEY, self.__IMP, 2),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("TXA", self.__TXA, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("STY", self.__STY, self.__ABS, 4),
-            INSTRUCTION("STA", self.__STA, self.__ABS, 4),
-            INSTRUCTION("STX", self.__STX, self.__ABS, 4),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 4),
-            INSTRUCTION("BCC", self.__BCC, self.__REL, 2),
-            INSTRUCTION("STA", self.__STA, self.__IZY, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("STY", self.__STY, self.__ZPX, 4),
-            INSTRUCTION("STA", self.__STA, self.__ZPX, 4),
-            INSTRUCTION("STX", self.__STX, self.__ZPY, 4),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 4),
-            INSTRUCTION("TYA", self.__TYA, self.__IMP, 2),
-            INSTRUCTION("STA", self.__STA, self.__ABY, 5),
-            INSTRUCTION("TXS", self.__TXS, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 5),
-            INSTRUCTION("STA", self.__STA, self.__ABX, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("LDY", self.__LDY, self.__IMM, 2),
-            INSTRUCTION("LDA", self.__LDA, self.__IZX, 6),
-            INSTRUCTION("LDX", self.__LDX, self.__IMM, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("LDY", self.__LDY, self.__ZP0, 3),
-            INSTRUCTION("LDA", self.__LDA, self.__ZP0, 3),
-            INSTRUCTION("LDX", self.__LDX, self.__ZP0, 3),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 3),
-            INSTRUCTION("TAY", self.__TAY, self.__IMP, 2),
-            INSTRUCTION("LDA", self.__LDA, self.__IMM, 2),
-            INSTRUCTION("TAX", self.__TAX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("LDY", self.__LDY, self.__ABS, 4),
-            INSTRUCTION("LDA", self.__LDA, self.__ABS, 4),
-            INSTRUCTION("LDX", self.__LDX, self.__ABS, 4),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 4),
-            INSTRUCTION("BCS", self.__BCS, self.__REL, 2),
-            INSTRUCTION("LDA", self.__LDA, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("LDY", self.__LDY, self.__ZPX, 4),
-            INSTRUCTION("LDA", self.__LDA, self.__ZPX, 4),
-            INSTRUCTION("LDX", self.__LDX, self.__ZPY, 4),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 4),
-            INSTRUCTION("CLV", self.__CLV, self.__IMP, 2),
-            INSTRUCTION("LDA", self.__LDA, self.__ABY, 4),
-            INSTRUCTION("TSX", self.__TSX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 4),
-            INSTRUCTION("LDY", self.__LDY, self.__ABX, 4),
-            INSTRUCTION("LDA", self.__LDA, self.__ABX, 4),
-            INSTRUCTION("LDX", self.__LDX, self.__ABY, 4),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 4),
-            INSTRUCTION("CPY", self.__CPY, self.__IMM, 2),
-            INSTRUCTION("CMP", self.__CMP, self.__IZX, 6),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("CPY", self.__CPY, self.__ZP0, 3),
-            INSTRUCTION("CMP", self.__CMP, self.__ZP0, 3),
-            INSTRUCTION("DEC", self.__DEC, self.__ZP0, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("INY", self.__INY, self.__IMP, 2),
-            INSTRUCTION("CMP", self.__CMP, self.__IMM, 2),
-            INSTRUCTION("DEX", self.__DEX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("CPY", self.__CPY, self.__ABS, 4),
-            INSTRUCTION("CMP", self.__CMP, self.__ABS, 4),
-            INSTRUCTION("DEC", self.__DEC, self.__ABS, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("BNE", self.__BNE, self.__REL, 2),
-            INSTRUCTION("CMP", self.__CMP, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("CMP", self.__CMP, self.__ZPX, 4),
-            INSTRUCTION("DEC", self.__DEC, self.__ZPX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("CLD", self.__CLD, self.__IMP, 2),
-            INSTRUCTION("CMP", self.__CMP, self.__ABY, 4),
-            INSTRUCTION("NOP", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("CMP", self.__CMP, self.__ABX, 4),
-            INSTRUCTION("DEC", self.__DEC, self.__ABX, 7),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("CPX", self.__CPX, self.__IMM, 2),
-            INSTRUCTION("SBC", self.__SBC, self.__IZX, 6),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("CPX", self.__CPX, self.__ZP0, 3),
-            INSTRUCTION("SBC", self.__SBC, self.__ZP0, 3),
-            INSTRUCTION("INC", self.__INC, self.__ZP0, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 5),
-            INSTRUCTION("INX", self.__INX, self.__IMP, 2),
-            INSTRUCTION("SBC", self.__SBC, self.__IMM, 2),
-            INSTRUCTION("NOP", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("CPX", self.__CPX, self.__ABS, 4),
-            INSTRUCTION("SBC", self.__SBC, self.__ABS, 4),
-            INSTRUCTION("INC", self.__INC, self.__ABS, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("BEQ", self.__BEQ, self.__REL, 2),
-            INSTRUCTION("SBC", self.__SBC, self.__IZY, 5),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 8),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("SBC", self.__SBC, self.__ZPX, 4),
-            INSTRUCTION("INC", self.__INC, self.__ZPX, 6),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 6),
-            INSTRUCTION("SED", self.__SED, self.__IMP, 2),
-            INSTRUCTION("SBC", self.__SBC, self.__ABY, 4),
-            INSTRUCTION("NOP", self.__NOP, self.__IMP, 2),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7),
-            INSTRUCTION("???", self.__NOP, self.__IMP, 4),
-            INSTRUCTION("SBC", self.__SBC, self.__ABX, 4),
-            INSTRUCTION("INC", self.__INC, self.__ABX, 7),
-            INSTRUCTION("???", self.__XXX, self.__IMP, 7)
+            INSTRUCTION("BRK", cls.__BRK, cls.__IMM, 7),  # 0x00
+            INSTRUCTION("ORA", cls.__ORA, cls.__IZX, 6),  # 0x01
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),  # 0x02
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),  # 0x03
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 3),
+            INSTRUCTION("ORA", cls.__ORA, cls.__ZP0, 3),
+            INSTRUCTION("ASL", cls.__ASL, cls.__ZP0, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("PHP", cls.__PHP, cls.__IMP, 3),
+            INSTRUCTION("ORA", cls.__ORA, cls.__IMM, 2),
+            INSTRUCTION("ASL", cls.__ASL, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("ORA", cls.__ORA, cls.__ABS, 4),
+            INSTRUCTION("ASL", cls.__ASL, cls.__ABS, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("BPL", cls.__BPL, cls.__REL, 2),
+            INSTRUCTION("ORA", cls.__ORA, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("ORA", cls.__ORA, cls.__ZPX, 4),
+            INSTRUCTION("ASL", cls.__ASL, cls.__ZPX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("CLC", cls.__CLC, cls.__IMP, 2),
+            INSTRUCTION("ORA", cls.__ORA, cls.__ABY, 4),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("ORA", cls.__ORA, cls.__ABX, 4),
+            INSTRUCTION("ASL", cls.__ASL, cls.__ABX, 7),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("JSR", cls.__JSR, cls.__ABS, 6),
+            INSTRUCTION("AND", cls.__AND, cls.__IZX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("BIT", cls.__BIT, cls.__ZP0, 3),
+            INSTRUCTION("AND", cls.__AND, cls.__ZP0, 3),
+            INSTRUCTION("ROL", cls.__ROL, cls.__ZP0, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("PLP", cls.__PLP, cls.__IMP, 4),
+            INSTRUCTION("AND", cls.__AND, cls.__IMM, 2),
+            INSTRUCTION("ROL", cls.__ROL, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("BIT", cls.__BIT, cls.__ABS, 4),
+            INSTRUCTION("AND", cls.__AND, cls.__ABS, 4),
+            INSTRUCTION("ROL", cls.__ROL, cls.__ABS, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("BMI", cls.__BMI, cls.__REL, 2),
+            INSTRUCTION("AND", cls.__AND, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("AND", cls.__AND, cls.__ZPX, 4),
+            INSTRUCTION("ROL", cls.__ROL, cls.__ZPX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("SEC", cls.__SEC, cls.__IMP, 2),
+            INSTRUCTION("AND", cls.__AND, cls.__ABY, 4),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("AND", cls.__AND, cls.__ABX, 4),
+            INSTRUCTION("ROL", cls.__ROL, cls.__ABX, 7),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("RTI", cls.__RTI, cls.__IMP, 6),
+            INSTRUCTION("EOR", cls.__EOR, cls.__IZX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 3),
+            INSTRUCTION("EOR", cls.__EOR, cls.__ZP0, 3),
+            INSTRUCTION("LSR", cls.__LSR, cls.__ZP0, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("PHA", cls.__PHA, cls.__IMP, 3),
+            INSTRUCTION("EOR", cls.__EOR, cls.__IMM, 2),
+            INSTRUCTION("LSR", cls.__LSR, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("JMP", cls.__JMP, cls.__ABS, 3),
+            INSTRUCTION("EOR", cls.__EOR, cls.__ABS, 4),
+            INSTRUCTION("LSR", cls.__LSR, cls.__ABS, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("BVC", cls.__BVC, cls.__REL, 2),
+            INSTRUCTION("EOR", cls.__EOR, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("EOR", cls.__EOR, cls.__ZPX, 4),
+            INSTRUCTION("LSR", cls.__LSR, cls.__ZPX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("CLI", cls.__CLI, cls.__IMP, 2),
+            INSTRUCTION("EOR", cls.__EOR, cls.__ABY, 4),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("EOR", cls.__EOR, cls.__ABX, 4),
+            INSTRUCTION("LSR", cls.__LSR, cls.__ABX, 7),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("RTS", cls.__RTS, cls.__IMP, 6),
+            INSTRUCTION("ADC", cls.__ADC, cls.__IZX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 3),
+            INSTRUCTION("ADC", cls.__ADC, cls.__ZP0, 3),
+            INSTRUCTION("ROR", cls.__ROR, cls.__ZP0, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("PLA", cls.__PLA, cls.__IMP, 4),
+            INSTRUCTION("ADC", cls.__ADC, cls.__IMM, 2),
+            INSTRUCTION("ROR", cls.__ROR, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("JMP", cls.__JMP, cls.__IND, 5),
+            INSTRUCTION("ADC", cls.__ADC, cls.__ABS, 4),
+            INSTRUCTION("ROR", cls.__ROR, cls.__ABS, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("BVS", cls.__BVS, cls.__REL, 2),
+            INSTRUCTION("ADC", cls.__ADC, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("ADC", cls.__ADC, cls.__ZPX, 4),
+            INSTRUCTION("ROR", cls.__ROR, cls.__ZPX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("SEI", cls.__SEI, cls.__IMP, 2),
+            INSTRUCTION("ADC", cls.__ADC, cls.__ABY, 4),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("ADC", cls.__ADC, cls.__ABX, 4),
+            INSTRUCTION("ROR", cls.__ROR, cls.__ABX, 7),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("STA", cls.__STA, cls.__IZX, 6),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("STY", cls.__STY, cls.__ZP0, 3),
+            INSTRUCTION("STA", cls.__STA, cls.__ZP0, 3),
+            INSTRUCTION("STX", cls.__STX, cls.__ZP0, 3),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 3),
+            INSTRUCTION("DEY", cls.__DEY, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("TXA", cls.__TXA, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("STY", cls.__STY, cls.__ABS, 4),
+            INSTRUCTION("STA", cls.__STA, cls.__ABS, 4),
+            INSTRUCTION("STX", cls.__STX, cls.__ABS, 4),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 4),
+            INSTRUCTION("BCC", cls.__BCC, cls.__REL, 2),
+            INSTRUCTION("STA", cls.__STA, cls.__IZY, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("STY", cls.__STY, cls.__ZPX, 4),
+            INSTRUCTION("STA", cls.__STA, cls.__ZPX, 4),
+            INSTRUCTION("STX", cls.__STX, cls.__ZPY, 4),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 4),
+            INSTRUCTION("TYA", cls.__TYA, cls.__IMP, 2),
+            INSTRUCTION("STA", cls.__STA, cls.__ABY, 5),
+            INSTRUCTION("TXS", cls.__TXS, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 5),
+            INSTRUCTION("STA", cls.__STA, cls.__ABX, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("LDY", cls.__LDY, cls.__IMM, 2),
+            INSTRUCTION("LDA", cls.__LDA, cls.__IZX, 6),
+            INSTRUCTION("LDX", cls.__LDX, cls.__IMM, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("LDY", cls.__LDY, cls.__ZP0, 3),
+            INSTRUCTION("LDA", cls.__LDA, cls.__ZP0, 3),
+            INSTRUCTION("LDX", cls.__LDX, cls.__ZP0, 3),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 3),
+            INSTRUCTION("TAY", cls.__TAY, cls.__IMP, 2),
+            INSTRUCTION("LDA", cls.__LDA, cls.__IMM, 2),
+            INSTRUCTION("TAX", cls.__TAX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("LDY", cls.__LDY, cls.__ABS, 4),
+            INSTRUCTION("LDA", cls.__LDA, cls.__ABS, 4),
+            INSTRUCTION("LDX", cls.__LDX, cls.__ABS, 4),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 4),
+            INSTRUCTION("BCS", cls.__BCS, cls.__REL, 2),
+            INSTRUCTION("LDA", cls.__LDA, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("LDY", cls.__LDY, cls.__ZPX, 4),
+            INSTRUCTION("LDA", cls.__LDA, cls.__ZPX, 4),
+            INSTRUCTION("LDX", cls.__LDX, cls.__ZPY, 4),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 4),
+            INSTRUCTION("CLV", cls.__CLV, cls.__IMP, 2),
+            INSTRUCTION("LDA", cls.__LDA, cls.__ABY, 4),
+            INSTRUCTION("TSX", cls.__TSX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 4),
+            INSTRUCTION("LDY", cls.__LDY, cls.__ABX, 4),
+            INSTRUCTION("LDA", cls.__LDA, cls.__ABX, 4),
+            INSTRUCTION("LDX", cls.__LDX, cls.__ABY, 4),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 4),
+            INSTRUCTION("CPY", cls.__CPY, cls.__IMM, 2),
+            INSTRUCTION("CMP", cls.__CMP, cls.__IZX, 6),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("CPY", cls.__CPY, cls.__ZP0, 3),
+            INSTRUCTION("CMP", cls.__CMP, cls.__ZP0, 3),
+            INSTRUCTION("DEC", cls.__DEC, cls.__ZP0, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("INY", cls.__INY, cls.__IMP, 2),
+            INSTRUCTION("CMP", cls.__CMP, cls.__IMM, 2),
+            INSTRUCTION("DEX", cls.__DEX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("CPY", cls.__CPY, cls.__ABS, 4),
+            INSTRUCTION("CMP", cls.__CMP, cls.__ABS, 4),
+            INSTRUCTION("DEC", cls.__DEC, cls.__ABS, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("BNE", cls.__BNE, cls.__REL, 2),
+            INSTRUCTION("CMP", cls.__CMP, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("CMP", cls.__CMP, cls.__ZPX, 4),
+            INSTRUCTION("DEC", cls.__DEC, cls.__ZPX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("CLD", cls.__CLD, cls.__IMP, 2),
+            INSTRUCTION("CMP", cls.__CMP, cls.__ABY, 4),
+            INSTRUCTION("NOP", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("CMP", cls.__CMP, cls.__ABX, 4),
+            INSTRUCTION("DEC", cls.__DEC, cls.__ABX, 7),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("CPX", cls.__CPX, cls.__IMM, 2),
+            INSTRUCTION("SBC", cls.__SBC, cls.__IZX, 6),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("CPX", cls.__CPX, cls.__ZP0, 3),
+            INSTRUCTION("SBC", cls.__SBC, cls.__ZP0, 3),
+            INSTRUCTION("INC", cls.__INC, cls.__ZP0, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 5),
+            INSTRUCTION("INX", cls.__INX, cls.__IMP, 2),
+            INSTRUCTION("SBC", cls.__SBC, cls.__IMM, 2),
+            INSTRUCTION("NOP", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("CPX", cls.__CPX, cls.__ABS, 4),
+            INSTRUCTION("SBC", cls.__SBC, cls.__ABS, 4),
+            INSTRUCTION("INC", cls.__INC, cls.__ABS, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("BEQ", cls.__BEQ, cls.__REL, 2),
+            INSTRUCTION("SBC", cls.__SBC, cls.__IZY, 5),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 8),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("SBC", cls.__SBC, cls.__ZPX, 4),
+            INSTRUCTION("INC", cls.__INC, cls.__ZPX, 6),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 6),
+            INSTRUCTION("SED", cls.__SED, cls.__IMP, 2),
+            INSTRUCTION("SBC", cls.__SBC, cls.__ABY, 4),
+            INSTRUCTION("NOP", cls.__NOP, cls.__IMP, 2),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7),
+            INSTRUCTION("???", cls.__NOP, cls.__IMP, 4),
+            INSTRUCTION("SBC", cls.__SBC, cls.__ABX, 4),
+            INSTRUCTION("INC", cls.__INC, cls.__ABX, 7),
+            INSTRUCTION("???", cls.__XXX, cls.__IMP, 7)
         ]
         return instruction_array
 
@@ -464,8 +522,8 @@ class Cpu6502(object):
         Directly specify an 8 bit constant within the instruction.
         :return: 0 cycle
         """
-        self.pc += 1
         self.__addr_abs = self.pc
+        self.pc += 1
         return 0
 
     def __ZP0(self) -> int:
@@ -677,7 +735,7 @@ class Cpu6502(object):
         self.__SetFlag(FLAGS.C, self.__temp & 0xFF00 > 0)
         self.__SetFlag(FLAGS.Z, self.__temp & 0x00FF == 0)
         self.__SetFlag(FLAGS.N, (self.__temp & 0x0080) > 0)
-        if self.__lookup[self.__opcode].addrmode == self.__IMP:
+        if Cpu6502.LOOKUP[self.__opcode].addrmode is Cpu6502.__IMP:
             self.a = self.__temp & 0x000000FF
         else:
             self.__write(self.__addr_abs, self.__temp & 0x000000FF)
@@ -929,7 +987,7 @@ class Cpu6502(object):
         Subtracts one from the X register setting the zero and negative flags as appropriate.
         :return: 0 cycle
         """
-        self.x -= 1
+        self.x = (self.x - 1) & 0xFF
         self.__SetFlag(FLAGS.Z, self.x == 0x00)
         self.__SetFlag(FLAGS.N, self.x & 0x80 > 0)
         return 0
@@ -940,7 +998,7 @@ class Cpu6502(object):
         Subtracts one from the Y register setting the zero and negative flags as appropriate.
         :return: 0 cycle
         """
-        self.y -= 1
+        self.y = (self.y - 1) & 0xFF
 
         self.__SetFlag(FLAGS.Z, self.y == 0x00)
         self.__SetFlag(FLAGS.N, self.y & 0x80 > 0)
@@ -977,7 +1035,7 @@ class Cpu6502(object):
         Adds one to the X register setting the zero and negative flags as appropriate.
         :return: 0 cycle
         """
-        self.x += 1
+        self.x = (self.x + 1) & 0xFF
         self.__SetFlag(FLAGS.Z, self.x == 0x00)
         self.__SetFlag(FLAGS.N, self.x & 0x80 > 0)
         return 0
@@ -988,7 +1046,7 @@ class Cpu6502(object):
         Adds one to the Y register setting the zero and negative flags as appropriate.
         :return: 0 cycle
         """
-        self.y += 1
+        self.y = (self.y + 1) & 0xFF
         self.__SetFlag(FLAGS.Z, self.y == 0x00)
         self.__SetFlag(FLAGS.N, self.y & 0x80 > 0)
         return 0
@@ -1065,7 +1123,7 @@ class Cpu6502(object):
         self.__temp = self.__fetched >> 1
         self.__SetFlag(FLAGS.Z, self.__temp & 0x00FF == 0)
         self.__SetFlag(FLAGS.N, self.__temp & 0x0080 > 0)
-        if self.__lookup[self.__opcode].addrmode == self.__IMP:
+        if Cpu6502.LOOKUP[self.__opcode].addrmode is Cpu6502.__IMP:
             self.a = self.__temp & 0x00FF
         else:
             self.__write(self.__addr_abs, self.__temp & 0x00FF)
@@ -1153,7 +1211,7 @@ class Cpu6502(object):
         self.__SetFlag(FLAGS.C, self.__temp & 0xFF00 > 0)
         self.__SetFlag(FLAGS.Z, self.__temp & 0X00FF == 0)
         self.__SetFlag(FLAGS.N, self.__temp & 0X0080 > 0)
-        if self.__lookup[self.__opcode].addrmode == self.__IMP:
+        if Cpu6502.LOOKUP[self.__opcode].addrmode is Cpu6502.__IMP:
             self.a = self.__temp & 0X00FF
         else:
             self.__write(self.__addr_abs, self.__temp & 0X00FF)
@@ -1171,7 +1229,7 @@ class Cpu6502(object):
         self.__SetFlag(FLAGS.C, self.__fetched & 0x01 > 0)
         self.__SetFlag(FLAGS.Z, self.__temp & 0x00FF == 0)
         self.__SetFlag(FLAGS.N, self.__temp & 0X0080 > 0)
-        if self.__lookup[self.__opcode].addrmode == self.__IMP:
+        if Cpu6502.LOOKUP[self.__opcode].addrmode is Cpu6502.__IMP:
             self.a = self.__temp & 0X000000FF
         else:
             self.__write(self.__addr_abs, self.__temp & 0x000000FF)
@@ -1275,5 +1333,62 @@ class Cpu6502(object):
     
     """
 
-    def __disassemble(self, nstart: int, nstop: int):
-        pass
+    def disassemble(self, nstart: int, nstop: int) -> dict:
+        """Disassemble the cpu address range [nstart, nstop]
+
+        Memory is read without side effects, the text of every instruction is
+        cached by its address and bytes (see DecodeInstruction).
+
+        :return: {address: "$8000: LDA #$10 {IMM}"} in address order
+        """
+        lines = {}
+        addr = nstart
+        while addr <= nstop:
+            text, nLength = Cpu6502.DecodeInstruction(
+                addr, self.__bus.cpuRead(addr, True),
+                self.__bus.cpuRead((addr + 1) & 0xFFFF, True), self.__bus.cpuRead((addr + 2) & 0xFFFF, True))
+            lines[addr] = "${:04X}: {}".format(addr, text)
+            addr += nLength
+        return lines
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1 << 16)
+    def DecodeInstruction(addr: int, opcode: int, lo: int, hi: int) -> (str, int):
+        """Text of the instruction at addr
+
+        :param opcode: the byte at addr
+        :param lo: the byte at addr + 1
+        :param hi: the byte at addr + 2
+        :return: the text and the length of the instruction in bytes
+        """
+        if Cpu6502.LOOKUP is None:
+            Cpu6502.LOOKUP = Cpu6502.__InitLookup()
+        op = Cpu6502.LOOKUP[opcode]
+        mode = op.addrmode.__name__.lstrip("_")
+        word = (hi << 8) | lo
+        if mode == "IMP":
+            return "{} {{IMP}}".format(op.opname), 1
+        elif mode == "IMM":
+            operand, nLength = "#${:02X}".format(lo), 2
+        elif mode == "ZP0":
+            operand, nLength = "${:02X}".format(lo), 2
+        elif mode == "ZPX":
+            operand, nLength = "${:02X},X".format(lo), 2
+        elif mode == "ZPY":
+            operand, nLength = "${:02X},Y".format(lo), 2
+        elif mode == "IZX":
+            operand, nLength = "(${:02X},X)".format(lo), 2
+        elif mode == "IZY":
+            operand, nLength = "(${:02X}),Y".format(lo), 2
+        elif mode == "REL":
+            target = (addr + 2 + (lo - 0x100 if lo & 0x80 else lo)) & 0xFFFF
+            operand, nLength = "${:04X} [${:02X}]".format(target, lo), 2
+        elif mode == "ABS":
+            operand, nLength = "${:04X}".format(word), 3
+        elif mode == "ABX":
+            operand, nLength = "${:04X},X".format(word), 3
+        elif mode == "ABY":
+            operand, nLength = "${:04X},Y".format(word), 3
+        else:  # IND
+            operand, nLength = "(${:04X})".format(word), 3
+        return "{} {} {{{}}}".format(op.opname, operand, mode), nLength
@@ -7,11 +7,33 @@ import tkinter as tk
 from bus import Bus
 import random
 import threading
+import time
 
 from cartridge import Cartridge
 from sprite import Sprite
 
 
+def ScreenToRows(screen: Sprite) -> list:
+    """Convert a screen sprite into rows of tk colour strings"""
+    data = screen.ColData
+    rows = []
+    for y in range(screen.height):
+        row = []
+        for x in range(screen.width):
+            p = data[y * screen.width + x]
+            row.append("#{:02x}{:02x}{:02x}".format(p.red, p.green, p.blue))
+        rows.append(row)
+    return rows
+
+
+def RowsToPhotoData(rows: list) -> str:
+    """Join colour rows into the data string of PhotoImage.put"""
+    pixel_data = ""
+    for row in rows:
+        pixel_data += "{" + " ".join(row) + "} "
+    return pixel_data
+
+
 class Display:
     def __init__(self, root, width=256, height=240, pixel_size=1, threads = 32):
         root.title('NES-DEV')
@@ -20,6 +42,8 @@ class Display:
         self.height = height
         self.pixel_size = pixel_size
         self.bus = None
+        # Optional hosttime.FrameStats charged with the conversion and blit time
+        self.stats = None
 
         # Create a canvas to draw on
         self.canvas = tk.Canvas(root, width=self.width * self.pixel_size, height=self.height * self.pixel_size)
@@ -57,14 +81,10 @@ class Display:
             new_pixel_data = []
             if self.bus is not None:
                 sprScreen : Sprite = self.bus.ppu.GetScreen()
-                data = sprScreen.ColData
-                for y in range(self.height):
-                    row = []
-                    for x in range(self.width):
-                        index = y * 256 + x
-                        color = "#{:02x}{:02x}{:02x}".format(data[index].red, data[index].green, data[index].blue)
-                        row.append(color)
-                    new_pixel_data.append(row)
+                start = time.perf_counter()
+                new_pixel_data = ScreenToRows(sprScreen)
+                if self.stats is not None:
+                    self.stats.add("output", time.perf_counter() - start)
             else:
                 for y in range(self.height):
                     row = []
@@ -76,10 +96,10 @@ class Display:
             self.pixel_data = new_pixel_data
 
     def update_canvas(self):
-        pixel_data = ""
-        for row in self.pixel_data:
-            pixel_data += "{" + " ".join(row) + "} "
-        self.image.put(pixel_data)
+        start = time.perf_counter()
+        self.image.put(RowsToPhotoData(self.pixel_data))
+        if self.stats is not None:
+            self.stats.add("output", time.perf_counter() - start)
 
         # Schedule the next update
         if self.running:
@@ -94,6 +114,9 @@ class Display:
     def connectBus(self, bus: Bus):
         self.bus = bus
 
+    def connectStats(self, stats):
+        self.stats = stats
+
 
 if __name__ == "__main__":
     root = tk.Tk()
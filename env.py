@@ -0,0 +1,413 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Vectorized Environments
+
+Steps N emulators in lockstep, gym VecEnv style. Actions are the button
+bits of pad 1 (Bus.controller), observations of all the emulators are
+written into one contiguous uint8 buffer:
+
+ | index : 240 * 256 system palette indices (ppu vScreenIndex)
+ | rgb   : 240 * 256 * 3 RGB bytes
+ | gray  : 240 * 256 luma bytes
+ | ram   : the 2KB cpu ram
+
+With size and/or crop the screen observations are cropped and decimated by
+the ppu itself while rendering (screen.ScreenFormat), gray through a palette
+to luma table, so no full frame is produced to be shrunk afterwards:
+
+    env = VecEnv("Rom/mario.nes", 64, obs_type="gray", size=(84, 84), crop=(0, 8, 256, 224),
+                 frame_skip=4, max_pool=True)
+
+    env = VecEnv("Rom/mario.nes", 64, obs_type="index", frame_skip=4, workers=8,
+                 rewards=((0x07DD, 100000), (0x07DE, 10000)), done=(0x0770, 0xFF, 0x03))
+    obs = env.reset()                 # memoryview, shape (64, 240, 256)
+    obs, rewards, dones, infos = env.step(actions)
+    frames = numpy.asarray(obs)       # zero copy, if numpy is around
+
+Observations, rewards and done flags are views over one step buffer that
+the next step overwrites, copy what must be kept. With workers the buffer
+is a shared memory segment owned by VecEnv: every worker renders straight
+into the slots of its emulators and only a command byte and the ended
+episodes go through its pipe, no frame is copied between processes.
+
+Every emulator boots once (reset, then boot_frames frames), the post-boot
+save state and observation are cached and an episode that ends is put
+back to them right inside step, the observation returned for it is then
+the first one of the new episode.
+
+A reward is the change of ram bytes weighted by their scale, summed over
+the skipped frames: rewards=((addr, scale), ...). An episode ends when
+ram[addr] & mask == value for done=(addr, mask, value), or after
+max_frames frames. Frames the game does not read the pads in (lag frames)
+are emulated through without ending a step with skip_lag, frame counts
+include them.
+
+"""
+
+import gc
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+from bus import Bus
+from cartridge import AttachSharedMemory, Cartridge, SharedRom, UnlinkSharedMemory
+from ppu import Ppu2c02
+from screen import ScreenFormat
+
+OBS_TYPES = ("index", "rgb", "gray", "ram")
+
+
+def obsShape(obs_type: str, size: tuple = None) -> tuple:
+    """Shape of one observation
+
+    :param size: (width, height) of a reduced screen, the whole screen if None
+    """
+    if obs_type not in OBS_TYPES:
+        raise ValueError("Unknown observation type {}, expected one of {}".format(obs_type, OBS_TYPES))
+    if obs_type == "ram":
+        return 2048,
+    width, height = size or (256, 240)
+    return (height, width, 3) if obs_type == "rgb" else (height, width)
+
+
+def obsSize(shape: tuple) -> int:
+    size = 1
+    for n in shape:
+        size *= n
+    return size
+
+
+def paletteTables() -> (bytes, bytes, bytes):
+    """bytes.translate tables from system palette index to red, green and blue"""
+    pal = Ppu2c02.palScreen
+    fill = bytes(256 - len(pal))
+    return (bytes(p.red for p in pal) + fill,
+            bytes(p.green for p in pal) + fill,
+            bytes(p.blue for p in pal) + fill)
+
+
+class EnvGroup(object):
+    """Emulators of one process stepped in lockstep, VecEnv runs one per worker"""
+
+    def __init__(self, rom, num_envs: int, obs_type: str = "index", frame_skip: int = 1, rewards=(),
+                 done=None, max_frames: int = 0, boot_frames: int = 60, size: tuple = None, crop: tuple = None,
+                 max_pool: bool = False, skip_lag: int = 0):
+        self.nEnvs = num_envs
+        self.obs_type = obs_type
+        self.nObsSize = obsSize(obsShape(obs_type, size))
+        self.nFrameSkip = max(frame_skip, 1)
+        self.pRewards = tuple(rewards)
+        self.done = done
+        self.nMaxFrames = max_frames
+        self.__rgb = paletteTables() if obs_type == "rgb" else None
+        # Screens other than the full palette index / RGB one are produced by the ppu as a ScreenFormat
+        self.bReduced = obs_type == "gray" or (obs_type != "ram" and (size is not None or crop is not None))
+        if max_pool and obs_type != "gray":
+            raise ValueError("Max-pooling is only done on gray observations")
+        self.bMaxPool = max_pool
+        self.nSkipLag = skip_lag
+
+        cart = rom.GetCartridge() if isinstance(rom, SharedRom) else Cartridge(rom)
+        if not cart.ImageValid():
+            raise ValueError("Can not load {}".format(rom.name if isinstance(rom, SharedRom) else rom))
+        boot = Bus()
+        boot.insertCartridge(cart)
+        boot.reset()
+        if self.bReduced:
+            fmt = ScreenFormat(size or (256, 240), crop or (0, 0, 256, 240), gray=obs_type == "gray")
+            boot.ppu.SetScreenOutput(sprite=False, reduced=fmt)
+        else:
+            boot.ppu.SetScreenOutput(sprite=False, index=obs_type != "ram")
+        boot.ppu.bRender = True
+        for _ in range(boot_frames):
+            boot.clockFrame()
+        self.vBootState = boot.save_state()
+        self.vBootObs = bytearray(self.nObsSize)
+        self.__observe(boot, self.vBootObs, 0)
+        self.buses = [boot.clone() for _ in range(num_envs)]
+        self.nFrames = [0] * num_envs
+        self.fReturns = [0.0] * num_envs
+        self.pScores = [self.__score(bus) for bus in self.buses]
+
+    def __observe(self, bus, out, offset: int):
+        if self.obs_type == "ram":
+            out[offset:offset + 2048] = bus.cpuRam
+            return
+        if not self.bReduced:
+            screen = bus.ppu.vScreenIndex
+        elif self.bMaxPool:
+            screen = bus.ppu.pReducedScreen.pooled()
+        else:
+            screen = bus.ppu.pReducedScreen.frame
+        if self.obs_type != "rgb":
+            out[offset:offset + self.nObsSize] = screen
+        else:
+            index = screen
+            end = offset + self.nObsSize
+            out[offset:end:3] = index.translate(self.__rgb[0])
+            out[offset + 1:end:3] = index.translate(self.__rgb[1])
+            out[offset + 2:end:3] = index.translate(self.__rgb[2])
+
+    def __score(self, bus) -> float:
+        ram = bus.cpuRam
+        return sum(ram[addr] * scale for addr, scale in self.pRewards)
+
+    def __done(self, bus) -> bool:
+        if self.done is None:
+            return False
+        addr, mask, value = self.done
+        return bus.cpuRam[addr] & mask == value
+
+    def __restart(self, i: int, out, offset: int):
+        bus = self.buses[i]
+        bus.load_state(self.vBootState)
+        self.nFrames[i] = 0
+        self.fReturns[i] = 0.0
+        self.pScores[i] = self.__score(bus)
+        out[offset:offset + self.nObsSize] = self.vBootObs
+
+    def reset(self, out, offset: int = 0):
+        """Put every emulator back to the post-boot state and write the observations at offset"""
+        for i in range(self.nEnvs):
+            self.__restart(i, out, offset + i * self.nObsSize)
+
+    def step(self, actions, out, offset: int = 0, rewards=None, dones=None) -> dict:
+        """Emulate frame_skip frames on every emulator
+
+        :param actions: pad 1 buttons, one byte per emulator
+        :param out: observation buffer, written from offset
+        :param rewards: float64 buffer the rewards are written to, one per emulator
+        :param dones: uint8 buffer the done flags are written to, one per emulator
+        :return: {emulator: {"episode_frames", "episode_reward"}} for the episodes that ended
+        """
+        ended = {}
+        nSkip = self.nFrameSkip
+        for i, bus in enumerate(self.buses):
+            bus.controller[0] = actions[i] & 0xFF
+            ppu = bus.ppu
+            bDone = False
+            for frame in range(nSkip):
+                if frame == nSkip - 1 and self.bMaxPool:
+                    # The frame drawn before this one, the previous step's if there is no skip
+                    ppu.pReducedScreen.keep()
+                ppu.bRender = frame >= nSkip - (2 if self.bMaxPool else 1)
+                self.nFrames[i] += bus.clockFrame(skip_lag=self.nSkipLag)
+                if self.__done(bus) or (self.nMaxFrames and self.nFrames[i] >= self.nMaxFrames):
+                    bDone = True
+                    break
+            score = self.__score(bus)
+            reward = score - self.pScores[i]
+            self.pScores[i] = score
+            self.fReturns[i] += reward
+            if rewards is not None:
+                rewards[i] = reward
+            if dones is not None:
+                dones[i] = bDone
+            nOffset = offset + i * self.nObsSize
+            if bDone:
+                ended[i] = {"episode_frames": self.nFrames[i], "episode_reward": self.fReturns[i]}
+                self.__restart(i, out, nOffset)
+            else:
+                self.__observe(bus, out, nOffset)
+        return ended
+
+    def close(self):
+        """Release the emulators, a SharedRom they were built from can be closed after"""
+        self.buses = []
+        gc.collect()
+
+
+class StepBuffers(object):
+    """Everything a step exchanges, in one buffer
+
+     | 8 * N    : rewards (float64)
+     | N * size : observations
+     | N        : actions (pad 1 buttons)
+     | N        : dones (uint8)
+
+    Over a bytearray for emulators in this process, over a shared memory
+    segment owned by VecEnv when they run in workers.
+    """
+
+    def __init__(self, buf, num_envs: int, shape: tuple):
+        self.buf = memoryview(buf)
+        nObs = num_envs * obsSize(shape)
+        offset = 8 * num_envs
+        self.rewards = self.buf[:offset].cast('d')
+        self.obs = self.buf[offset:offset + nObs]
+        self.shaped = self.obs.cast('B', (num_envs,) + shape)
+        offset += nObs
+        self.actions = self.buf[offset:offset + num_envs]
+        self.dones = self.buf[offset + num_envs:offset + 2 * num_envs]
+
+    @staticmethod
+    def size(num_envs: int, shape: tuple) -> int:
+        return num_envs * (obsSize(shape) + 10)
+
+    def release(self):
+        """Release the views, the segment can only be closed after"""
+        for view in (self.shaped, self.obs, self.rewards, self.actions, self.dones, self.buf):
+            view.release()
+
+
+def EnvWorker(conn, name: str, num_envs: int, shape: tuple, first: int, args: tuple, kwargs: dict):
+    """Worker process loop stepping emulators [first, first + count) of the VecEnv
+
+    Observations, rewards and done flags are written straight into the slots
+    of the shared segment, the pipe only carries one command byte per step
+    and the ended episodes back:
+
+     | b"s" : step with the actions in the segment -> {emulator: info} of the ended episodes
+     | b"r" : reset                                 -> None
+     | b"c" : close
+    """
+    shm = AttachSharedMemory(name)
+    buffers = StepBuffers(shm.buf, num_envs, shape)
+    group = EnvGroup(*args, **kwargs)
+    count = group.nEnvs
+    end = first + count
+    actions = buffers.actions[first:end]
+    rewards = buffers.rewards[first:end]
+    dones = buffers.dones[first:end]
+    offset = first * group.nObsSize
+    conn.send(None)
+    try:
+        while True:
+            command = conn.recv_bytes()
+            if command == b"s":
+                ended = group.step(actions, buffers.obs, offset, rewards, dones)
+                conn.send({first + i: info for i, info in ended.items()})
+            elif command == b"r":
+                group.reset(buffers.obs, offset)
+                conn.send(None)
+            else:
+                break
+    finally:
+        for view in (actions, rewards, dones):
+            view.release()
+        buffers.release()
+        shm.close()
+        group.close()
+        if isinstance(args[0], SharedRom):
+            # Attached when the job arguments were unpickled
+            args[0].close()
+        conn.close()
+
+
+class VecEnv(object):
+    def __init__(self, rom, num_envs: int, obs_type: str = "index", frame_skip: int = 1, rewards=(),
+                 done=None, max_frames: int = 0, boot_frames: int = 60, size: tuple = None, crop: tuple = None,
+                 max_pool: bool = False, skip_lag: int = 0, workers: int = 0, context: str = None):
+        """
+        :param rom: path of the .nes file or a SharedRom
+        :param num_envs: number of emulators
+        :param obs_type: "index", "rgb", "gray" or "ram"
+        :param frame_skip: frames emulated per step with the same action, only the last one is rendered
+        :param rewards: ((addr, scale), ...), the reward is the weighted change of these ram bytes
+        :param done: (addr, mask, value), the episode ends when ram[addr] & mask == value
+        :param max_frames: episode length limit in frames, 0 for none
+        :param boot_frames: frames emulated after power on before the state episodes start from is taken
+        :param size: (width, height) the screen is decimated to, e.g. (84, 84) or (128, 120)
+        :param crop: (x, y, w, h) region of the screen kept, e.g. (0, 8, 256, 224) drops the overscan rows
+        :param max_pool: gray only, each observation is the pixelwise maximum of the last two frames
+        :param skip_lag: frames of the skip that end as lag frames (Bus.clockFrame) are followed by up to
+            skip_lag more, so every frame of a step polled the action
+        :param workers: worker processes the emulators are spread over, 0 steps them all in this process
+        :param context: multiprocessing start method, the platform default if None
+        """
+        self.num_envs = num_envs
+        self.obs_type = obs_type
+        self.obs_shape = obsShape(obs_type, size)
+        self.nObsSize = obsSize(self.obs_shape)
+        options = dict(obs_type=obs_type, frame_skip=frame_skip, rewards=rewards, done=done,
+                       max_frames=max_frames, boot_frames=boot_frames, size=size, crop=crop, max_pool=max_pool,
+                       skip_lag=skip_lag)
+
+        self.__group = None
+        self.__workers = []
+        self.__shm = None
+        nSize = StepBuffers.size(num_envs, self.obs_shape)
+        if workers <= 0:
+            self.__buffers = StepBuffers(bytearray(nSize), num_envs, self.obs_shape)
+            self.__group = EnvGroup(rom, num_envs, **options)
+            return
+        self.__shm = SharedMemory(create=True, size=nSize)
+        self.__buffers = StepBuffers(self.__shm.buf, num_envs, self.obs_shape)
+        ctx = multiprocessing.get_context(context)
+        workers = min(workers, num_envs)
+        first = 0
+        for w in range(workers):
+            # Emulators are split as evenly as possible, worker w steps envs [first, first + count)
+            count = num_envs // workers + (1 if w < num_envs % workers else 0)
+            parent, child = ctx.Pipe()
+            process = ctx.Process(target=EnvWorker, daemon=True,
+                                  args=(child, self.__shm.name, num_envs, self.obs_shape, first, (rom, count), options))
+            process.start()
+            child.close()
+            self.__workers.append((parent, process))
+            first += count
+        for parent, _ in self.__workers:
+            parent.recv()
+
+    def reset(self) -> memoryview:
+        """Put every emulator back to the post-boot state
+
+        :return: observations, shape (num_envs,) + obs_shape
+        """
+        buffers = self.__buffers
+        if self.__group is not None:
+            self.__group.reset(buffers.obs)
+        else:
+            for parent, _ in self.__workers:
+                parent.send_bytes(b"r")
+            for parent, _ in self.__workers:
+                parent.recv()
+        return buffers.shaped
+
+    def step(self, actions) -> (memoryview, memoryview, memoryview, list):
+        """Step every emulator with its action
+
+        The returned views are over the step buffers, the next step overwrites them.
+
+        :param actions: pad 1 buttons per emulator, any sequence of num_envs ints
+        :return: observations, rewards (float64), dones (uint8), infos
+        """
+        buffers = self.__buffers
+        buffers.actions[:] = bytes(a & 0xFF for a in actions)
+        infos = [{} for _ in range(self.num_envs)]
+        if self.__group is not None:
+            ended = self.__group.step(buffers.actions, buffers.obs, 0, buffers.rewards, buffers.dones)
+            for i, info in ended.items():
+                infos[i] = info
+        else:
+            for parent, _ in self.__workers:
+                parent.send_bytes(b"s")
+            for parent, _ in self.__workers:
+                for i, info in parent.recv().items():
+                    infos[i] = info
+        return buffers.shaped, buffers.rewards, buffers.dones, infos
+
+    def close(self):
+        for parent, process in self.__workers:
+            parent.send_bytes(b"c")
+            parent.close()
+            process.join()
+        self.__workers = []
+        if self.__group is not None:
+            self.__group.close()
+            self.__group = None
+        if self.__buffers is not None:
+            self.__buffers.release()
+            self.__buffers = None
+        if self.__shm is not None:
+            self.__shm.close()
+            UnlinkSharedMemory(self.__shm)
+            self.__shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,241 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Emulator Farm
+
+Runs many independent emulators across worker processes, one core each.
+A job names a ROM, an input script and a frame count, the worker runs it
+headless and sends back what the job asked for:
+
+ | hashes : CRC32 of the RGB screen after every frame (every frame is rendered)
+ | ram    : the 2KB cpu ram after the last frame, or every ram_interval frames
+ | frame  : the RGB screen after the last frame (256 * 240 * 3 bytes)
+
+    with EmulatorFarm(workers=64, batch=4) as farm:
+        rom = farm.share("Rom/mario.nes")
+        jobs = [Job(rom, frames=600, outputs=("hashes",), tag=seed) for seed in range(1000)]
+        for result in farm.run(jobs):
+            print(result["tag"], result["hashes"][-1])
+
+Workers are reused for the whole run. The pool is started by the first
+run, after the ROMs are shared: every worker attaches their segments once
+when it starts, a job only carries the name of its ROM. Every worker loads
+a ROM once and keeps the emulator reset on it, each job runs on a clone of
+that one (Bus.clone), so a job costs no ROM loading, parsing or boot.
+Results are streamed back as jobs complete, in completion order unless
+ordered=True, batch jobs are sent to a worker at a time to cut the IPC
+round trips.
+
+Pad input is a buttons schedule for pad 1 ({frame: buttons} or one byte
+per frame, see bus.InputSchedule), latched by the game through $4016 with
+no call back into Python. The input script is a dict {frame: [(addr, data), ...]},
+cpu writes made through the bus right before that frame is emulated (frame
+0 is the first).
+
+"""
+
+import atexit
+import gc
+import multiprocessing
+import os
+import time
+import zlib
+
+from bus import Bus, InputSchedule
+from cartridge import Cartridge, SharedRom
+from runner import ScreenRGB
+
+OUTPUTS = ("hashes", "ram", "frame")
+
+
+class Job(object):
+    __slots__ = ("rom", "frames", "inputs", "buttons", "outputs", "ram_interval", "tag")
+
+    def __init__(self, rom, frames: int, inputs: dict = None, outputs: tuple = ("hashes",),
+                 ram_interval: int = 0, tag=None, buttons=None):
+        """
+        :param rom: path of the .nes file or a SharedRom of the farm (EmulatorFarm.share)
+        :param frames: number of frames to emulate
+        :param inputs: input script, {frame: [(addr, data), ...]}
+        :param outputs: any of OUTPUTS
+        :param ram_interval: with "ram", snapshot the ram every ram_interval frames instead of only at the end
+        :param tag: anything picklable, returned with the result to identify the job
+        :param buttons: pad 1 schedule, {frame: buttons} or a buttons byte per frame
+        """
+        for output in outputs:
+            if output not in OUTPUTS:
+                raise ValueError("Unknown output {}, expected one of {}".format(output, OUTPUTS))
+        self.rom = romKey(rom)
+        self.frames = frames
+        self.inputs = inputs or {}
+        self.buttons = None if buttons is None else InputSchedule(buttons, frames)
+        self.outputs = tuple(outputs)
+        self.ram_interval = ram_interval
+        self.tag = tag
+
+
+# Worker state, kept for the lifetime of the worker:
+# segment name -> attached SharedRom, ROM key -> emulator reset on it
+_roms = {}
+_emulators = {}
+
+
+def romKey(rom) -> str:
+    return "shm:" + rom.name if isinstance(rom, SharedRom) else "path:" + os.path.abspath(rom)
+
+
+def AttachRoms(names: tuple):
+    """Pool initializer, attaches the shared ROMs of the farm once per worker"""
+    for name in names:
+        # A forked worker inherits the mapping of the creator
+        if name not in _roms:
+            _roms[name] = SharedRom(name=name)
+    atexit.register(releaseRoms)
+
+
+def releaseRoms():
+    # At interpreter exit the segments would be collected before the cartridges viewing into them
+    _emulators.clear()
+    gc.collect()
+    for rom in _roms.values():
+        rom.close()
+    _roms.clear()
+
+
+def ResetEmulator(rom) -> Bus:
+    """The reset emulator of the ROM, built on the first job naming it in this process
+
+    :param rom: path of the .nes file or a SharedRom
+    """
+    if isinstance(rom, SharedRom):
+        _roms.setdefault(rom.name, rom)
+    return romEmulator(romKey(rom))
+
+
+def romEmulator(key: str) -> Bus:
+    bus = _emulators.get(key)
+    if bus is None:
+        kind, _, source = key.partition(":")
+        if kind == "shm":
+            rom = _roms.get(source)
+            if rom is None:
+                raise ValueError("{} was not shared by the farm before its first run".format(source))
+            cart = rom.GetCartridge()
+        else:
+            cart = Cartridge(source)
+        if not cart.ImageValid():
+            raise ValueError("Can not load {}".format(key))
+        bus = _emulators[key] = Bus()
+        bus.insertCartridge(cart)
+        bus.reset()
+    return bus
+
+
+def RunJob(job: Job) -> dict:
+    """Run one job in this process
+
+    :return: {"tag", "frames", "seconds"} and the outputs asked for, or {"tag", "error"}
+        if the job failed, a failed job does not stop the others
+    """
+    fStart = time.perf_counter()
+    try:
+        bHashes = "hashes" in job.outputs
+        bus = romEmulator(job.rom).clone(render=bHashes or "frame" in job.outputs)
+        if job.buttons is not None:
+            bus.SetInput(0, job.buttons)
+        ppu = bus.ppu
+        result = {"tag": job.tag}
+        hashes = []
+        rams = []
+        for frame in range(job.frames):
+            for addr, data in job.inputs.get(frame, ()):
+                bus.cpuWrite(addr, data)
+            # Without hashes only the last frame is drawn
+            ppu.bRender = bHashes or frame == job.frames - 1
+            bus.clockFrame()
+            if bHashes:
+                hashes.append(zlib.crc32(ScreenRGB(ppu.GetScreen())))
+            if job.ram_interval > 0 and (frame + 1) % job.ram_interval == 0:
+                rams.append((frame + 1, bytes(bus.cpuRam)))
+        if bHashes:
+            result["hashes"] = hashes
+        if "ram" in job.outputs:
+            result["ram"] = rams if job.ram_interval > 0 else bytes(bus.cpuRam)
+        if "frame" in job.outputs:
+            result["frame"] = ScreenRGB(ppu.GetScreen())
+        result["frames"] = job.frames
+    except Exception as e:
+        result = {"tag": job.tag, "error": "{}: {}".format(type(e).__name__, e)}
+    result["seconds"] = time.perf_counter() - fStart
+    return result
+
+
+class EmulatorFarm(object):
+    def __init__(self, workers: int = None, batch: int = 1, context: str = None):
+        """
+        :param workers: number of worker processes, os.cpu_count() by default, 0 runs the jobs in this process
+        :param batch: jobs handed to a worker at a time
+        :param context: multiprocessing start method ("fork", "spawn", "forkserver"), the platform default if None
+        """
+        self.nWorkers = os.cpu_count() if workers is None else workers
+        self.nBatch = max(batch, 1)
+        self.__context = context
+        self.__pool = None
+        self.__shared = []
+
+    def share(self, path: str) -> SharedRom:
+        """Load a ROM once into shared memory for the jobs, released on close()
+
+        Only before the first run, the workers attach the shared ROMs when they start.
+        """
+        if self.__pool is not None:
+            raise RuntimeError("ROMs must be shared before the first run of the farm")
+        rom = SharedRom(path)
+        self.__shared.append(rom)
+        # Jobs run in this process find it like the workers do
+        _roms[rom.name] = rom
+        return rom
+
+    def run(self, jobs, ordered: bool = False):
+        """Run the jobs and yield their results as they complete
+
+        :param jobs: iterable of Job, consumed lazily
+        :param ordered: yield the results in job order instead of completion order
+        """
+        if self.nWorkers <= 0:
+            for job in jobs:
+                yield RunJob(job)
+            return
+        if self.__pool is None:
+            self.__pool = multiprocessing.get_context(self.__context).Pool(
+                self.nWorkers, initializer=AttachRoms, initargs=(tuple(rom.name for rom in self.__shared),))
+        if ordered:
+            yield from self.__pool.imap(RunJob, jobs, chunksize=self.nBatch)
+        else:
+            yield from self.__pool.imap_unordered(RunJob, jobs, chunksize=self.nBatch)
+
+    def map(self, jobs) -> list:
+        """Run the jobs and return the results in job order"""
+        return list(self.run(jobs, ordered=True))
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+        for rom in self.__shared:
+            # Emulators of jobs run in this process view into the segment
+            _roms.pop(rom.name, None)
+            if _emulators.pop(romKey(rom), None) is not None:
+                gc.collect()
+            rom.close()
+            rom.unlink()
+        self.__shared = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
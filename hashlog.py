@@ -0,0 +1,144 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Frame Hash Log
+
+CRC32 of the indexed screen (ppu vScreenIndex) and of the 2KB cpu ram after
+every completed frame, streamed to a file. Two runs of the same ROM and
+inputs must log the same hashes, so a change to the cpu or the ppu is
+checked against a log taken before it without keeping any frame:
+
+ | HEADER  : magic "RNFH", version, first frame (Bus.nFrame)
+ | records : screen CRC32, ram CRC32, one pair per frame
+
+    python runner.py Rom/mario.nes --frames 3600 --hash-log before.rnh
+    ... change cpu.py / ppu.py ...
+    python runner.py Rom/mario.nes --frames 3600 --hash-log after.rnh
+    python hashlog.py before.rnh after.rnh
+
+The screen is only produced by rendered frames, the runner renders every
+frame while it logs. RingNES run-ahead hides its look-ahead frames from the
+log and renders the real ones.
+
+"""
+
+import argparse
+import array
+import struct
+import sys
+import zlib
+
+from bus import Bus
+
+HASH_MAGIC = b'RNFH'
+HASH_VERSION = 1
+HASH_HEADER = struct.Struct('<4sHI')
+HASH_RECORD = struct.Struct('<II')
+
+
+class FrameHashLog(object):
+    def __init__(self, bus: Bus, path: str):
+        """Log the frames the bus completes from now on (Bus.frame_hook), until close()
+
+        :param bus: the emulator, its ppu is switched to also produce the indexed screen
+        :param path: the log file, overwritten
+        """
+        self.bus = bus
+        self.nFrames = 0
+        if bus.ppu.vScreenIndex is None:
+            bus.ppu.SetScreenOutput(sprite=bus.ppu.bScreenSprite, index=True,
+                                    reduced=bus.ppu.pReducedScreen)
+        self.__file = open(path, 'wb')
+        self.__file.write(HASH_HEADER.pack(HASH_MAGIC, HASH_VERSION, bus.nFrame))
+        bus.frame_hook = self.__record
+
+    def __record(self, bus: Bus):
+        self.__file.write(HASH_RECORD.pack(zlib.crc32(bus.ppu.vScreenIndex), zlib.crc32(bus.cpuRam)))
+        self.nFrames += 1
+
+    def close(self):
+        if self.__file is None:
+            return
+        if self.bus.frame_hook == self.__record:
+            self.bus.frame_hook = None
+        self.__file.close()
+        self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ReadHashLog(path: str) -> (int, array.array, array.array):
+    """
+    :return: first frame, screen hashes, ram hashes
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, nFirst = HASH_HEADER.unpack_from(data, 0)
+    if magic != HASH_MAGIC or version != HASH_VERSION:
+        raise ValueError("{} is not a version {} frame hash log".format(path, HASH_VERSION))
+    # A run that was killed may leave half a record at the end
+    nEnd = HASH_HEADER.size + (len(data) - HASH_HEADER.size) // HASH_RECORD.size * HASH_RECORD.size
+    hashes = array.array('I', data[HASH_HEADER.size:nEnd])
+    if sys.byteorder != 'little':
+        hashes.byteswap()
+    return nFirst, hashes[0::2], hashes[1::2]
+
+
+def FirstDivergence(path_a: str, path_b: str) -> (int, str):
+    """First frame the two logs disagree on, over the frames both logged
+
+    :return: (frame, "screen" / "ram" / "screen+ram"), or None if they agree
+    """
+    nFirstA, screenA, ramA = ReadHashLog(path_a)
+    nFirstB, screenB, ramB = ReadHashLog(path_b)
+    nFirst = max(nFirstA, nFirstB)
+    nEnd = min(nFirstA + len(screenA), nFirstB + len(screenB))
+    a = nFirst - nFirstA
+    b = nFirst - nFirstB
+    n = max(nEnd - nFirst, 0)
+    # Slice comparisons run in C, the frame is only searched for in a differing block
+    nBlock = 4096
+    for start in range(0, n, nBlock):
+        end = min(start + nBlock, n)
+        if (screenA[a + start:a + end] == screenB[b + start:b + end]
+                and ramA[a + start:a + end] == ramB[b + start:b + end]):
+            continue
+        for i in range(start, end):
+            parts = []
+            if screenA[a + i] != screenB[b + i]:
+                parts.append("screen")
+            if ramA[a + i] != ramB[b + i]:
+                parts.append("ram")
+            if parts:
+                return nFirst + i, "+".join(parts)
+    return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Find the first frame two frame hash logs diverge on")
+    parser.add_argument("before", help="the reference log")
+    parser.add_argument("after", help="the log to check")
+    args = parser.parse_args(argv)
+
+    nFirstA, screenA, _ = ReadHashLog(args.before)
+    nFirstB, screenB, _ = ReadHashLog(args.after)
+    divergence = FirstDivergence(args.before, args.after)
+    if divergence is not None:
+        print("Diverged at frame {} ({})".format(*divergence))
+        return 1
+    print("Identical over frames {} ~ {}".format(max(nFirstA, nFirstB),
+                                                 min(nFirstA + len(screenA), nFirstB + len(screenB)) - 1))
+    if (nFirstA, len(screenA)) != (nFirstB, len(screenB)):
+        print("Logged frames differ: {} from {} and {} from {}".format(len(screenA), nFirstA,
+                                                                     len(screenB), nFirstB))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
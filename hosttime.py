@@ -0,0 +1,145 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Host Time Accounting
+
+Breaks the host time of every emulated frame down per component:
+
+ | cpu    : Cpu6502.clock, without the memory accesses it makes
+ | ppu    : Ppu2c02.clock (rendering, pattern fetches)
+ | bus    : Bus.cpuRead / cpuWrite dispatch, ppu registers and mapper included
+ | dma    : OAM DMA cycles
+ | output : screen conversion and blit in Display (reported by the display)
+ | other  : the rest of the frame (bus clock loop, interrupts, the caller)
+
+Times are exclusive, a component nested in another (the bus inside the
+cpu) is only counted once. The emulator classes are slotted, so HostTimer
+moves each timed object to a subclass of its own class holding the timed
+wrappers and moves it back on detach, an emulator that is not timed runs
+its plain methods. Detach before cloning the emulator.
+
+    stats = FrameStats(log_interval=60)
+    timer = HostTimer(bus, stats)
+    timer.attach()
+    ...
+    print(stats.Format(stats.mean()))
+
+"""
+
+import time
+from collections import deque
+
+from bus import Bus
+
+COMPONENTS = ("cpu", "ppu", "bus", "dma", "output", "other")
+
+
+class FrameStats(object):
+    """Rolling per-component host time of the last frames"""
+
+    def __init__(self, window: int = 120, log_interval: int = 0, log=print):
+        """
+        :param window: number of frames kept
+        :param log_interval: print a line with the mean every log_interval frames, 0 for never
+        :param log: the function receiving the log line
+        """
+        self.frames = deque(maxlen=max(window, 1))
+        self.nLogInterval = log_interval
+        self.log = log
+        self.nFrames = 0
+        self.current = dict.fromkeys(COMPONENTS, 0.0)
+
+    def add(self, component: str, seconds: float):
+        """Charge seconds to component in the frame being emulated"""
+        self.current[component] += seconds
+
+    def endFrame(self, total: float):
+        """Close the current frame
+
+        :param total: host time of the whole frame, the part no component claimed is "other"
+        """
+        frame = self.current
+        frame["other"] = max(total - sum(frame[c] for c in COMPONENTS if c != "other"), 0.0)
+        frame["total"] = total
+        self.frames.append(frame)
+        self.current = dict.fromkeys(COMPONENTS, 0.0)
+        self.nFrames += 1
+        if self.nLogInterval and self.nFrames % self.nLogInterval == 0:
+            self.log(self.Format(self.mean()))
+
+    def last(self) -> dict:
+        return self.frames[-1] if self.frames else None
+
+    def mean(self) -> dict:
+        if not self.frames:
+            return None
+        return {key: sum(frame[key] for frame in self.frames) / len(self.frames) for key in self.frames[0]}
+
+    def worst(self) -> dict:
+        """The slowest frame in the window"""
+        return max(self.frames, key=lambda frame: frame["total"]) if self.frames else None
+
+    def Format(self, frame: dict) -> str:
+        if frame is None:
+            return "no frames"
+        total = frame["total"] or 1.0
+        return "frame {:.1f}ms: ".format(frame["total"] * 1e3) + " ".join(
+            "{} {:.1f}ms ({:.0%})".format(c, frame[c] * 1e3, frame[c] / total) for c in COMPONENTS)
+
+
+class HostTimer(object):
+    def __init__(self, bus: Bus, stats: FrameStats = None):
+        self.bus = bus
+        self.stats = stats if stats is not None else FrameStats()
+        self.__installed = []
+
+    def attach(self):
+        bus = self.bus
+        stats = self.stats
+        clock = time.perf_counter
+        # Time spent in nested timed calls, subtracted from the caller
+        nested = [0.0]
+
+        def timed(component: str, fn):
+            def wrapper(*args):
+                start = clock()
+                outer = nested[0]
+                nested[0] = 0.0
+                result = fn(*args)
+                elapsed = clock() - start
+                stats.current[component] += elapsed - nested[0]
+                nested[0] = outer + elapsed
+                return result
+
+            return wrapper
+
+        ppu = bus.ppu
+        ppu_clock = timed("ppu", ppu.clock)
+        frame = [clock(), ppu.odd_frame]
+
+        def ppu_frame_clock():
+            ppu_clock()
+            # odd_frame flips when the ppu wraps to the pre-render line
+            if ppu.odd_frame != frame[1]:
+                now = clock()
+                stats.endFrame(now - frame[0])
+                frame[0], frame[1] = now, ppu.odd_frame
+
+        self.__install(ppu, clock=ppu_frame_clock)
+        self.__install(bus.cpu, clock=timed("cpu", bus.cpu.clock))
+        self.__install(bus, cpuRead=timed("bus", bus.cpuRead), cpuWrite=timed("bus", bus.cpuWrite),
+                       _Bus__clockDMA=timed("dma", bus._Bus__clockDMA))
+
+    def __install(self, obj, **wrappers):
+        cls = type(obj)
+        methods = {name: staticmethod(wrapper) for name, wrapper in wrappers.items()}
+        # No new slots, so the object layout stays the same and __class__ may be swapped
+        obj.__class__ = type(cls.__name__, (cls,), dict(methods, __slots__=()))
+        self.__installed.append((obj, cls))
+
+    def detach(self):
+        for obj, cls in self.__installed:
+            obj.__class__ = cls
+        self.__installed = []
@@ -0,0 +1,174 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""PC Hotspots and PRG Coverage
+
+Records where the cpu executes, keyed by mapper bank so bank switched code
+is not mixed up:
+
+ | coverage : one bit per PRG-ROM byte, set for every executed opcode
+ |            (and one bit per cpu address below $8000 for code in ram)
+ | hits     : sampled execution counts, every nInterval-th instruction,
+ |            {(bank, addr): count} with bank the 8KB PRG bank (-1 below $8000)
+
+Like the profiler it wraps the instruction table of the cpu, nothing is
+recorded or paid for once it is detached.
+
+    sampler = HotspotSampler(bus)
+    sampler.attach()
+    ...
+    sampler.detach()
+    print(sampler.Hotspots(20))
+    open("prg.asm", "w").write(sampler.AnnotatedDisassembly())
+
+"""
+
+import functools
+
+from bus import Bus
+from cpu import Cpu6502
+from utils import INSTRUCTION
+
+
+class HotspotSampler(object):
+    def __init__(self, bus: Bus, interval: int = 16):
+        """
+        :param bus: the emulator to sample
+        :param interval: record a hit every interval instructions, 1 counts every instruction
+        """
+        self.bus = bus
+        self.nInterval = max(interval, 1)
+        cart = bus.GetCartridge()
+        self.__vPRGMemory = memoryview(cart.vPRGMemory)
+        self.__pPRGWindow = cart.GetMapper().pPRGWindow
+        self.nPRGBanks = (len(self.__vPRGMemory) + 0x1FFF) // 0x2000
+        self.vCoverage = bytearray((len(self.__vPRGMemory) + 7) // 8)
+        self.vRamCoverage = bytearray(0x8000 // 8)
+        # cpu address the window of each bank started at when it first ran
+        self.pBankBase = [-1] * self.nPRGBanks
+        self.hits = {}
+        self.__nCountdown = [self.nInterval]
+        self.__lookup = None
+        self.__previous = None
+
+    def clear(self):
+        self.vCoverage[:] = bytes(len(self.vCoverage))
+        self.vRamCoverage[:] = bytes(len(self.vRamCoverage))
+        self.pBankBase[:] = [-1] * self.nPRGBanks
+        self.hits.clear()
+        self.__nCountdown[0] = self.nInterval
+
+    def attach(self):
+        """Wrap the current instruction table of the cpu (e.g. the profiler's)"""
+        cpu = self.bus.cpu
+        self.__previous = cpu.getLookup()
+        self.__lookup = self.__InitLookup(self.__previous)
+        cpu.setLookup(self.__lookup)
+
+    def detach(self):
+        """Put the cpu back on the table it had before attach"""
+        if self.__previous is not None:
+            self.bus.cpu.setLookup(self.__previous if self.__previous is not Cpu6502.LOOKUP else None)
+            self.__previous = None
+
+    def __InitLookup(self, table: list) -> list:
+        windows = self.__pPRGWindow
+        coverage = self.vCoverage
+        ram_coverage = self.vRamCoverage
+        base = self.pBankBase
+        hits = self.hits
+        countdown = self.__nCountdown
+        interval = self.nInterval
+
+        def record(cpu):
+            # the opcode was fetched and pc moved past it
+            addr = (cpu.pc - 1) & 0xFFFF
+            if addr >= 0x8000:
+                offset = windows[(addr >> 13) & 0x03] + (addr & 0x1FFF)
+                bit = 1 << (offset & 0x07)
+                if not coverage[offset >> 3] & bit:
+                    coverage[offset >> 3] |= bit
+                    if base[offset >> 13] < 0:
+                        base[offset >> 13] = addr & 0xE000
+                bank = offset >> 13
+            else:
+                ram_coverage[addr >> 3] |= 1 << (addr & 0x07)
+                bank = -1
+            countdown[0] -= 1
+            if countdown[0] == 0:
+                countdown[0] = interval
+                key = (bank, addr)
+                hits[key] = hits.get(key, 0) + 1
+
+        lookup = []
+        for op in table:
+            def addrmode(cpu, _f=op.addrmode):
+                record(cpu)
+                return _f(cpu)
+
+            lookup.append(INSTRUCTION(op.opname, op.operate, functools.wraps(op.addrmode)(addrmode), op.cycles))
+        return lookup
+
+    def Covered(self, bank: int, addr: int) -> bool:
+        """True if the opcode at addr of PRG bank (-1 for ram) was executed"""
+        if bank < 0:
+            return bool(self.vRamCoverage[addr >> 3] & (1 << (addr & 0x07)))
+        offset = bank * 0x2000 + (addr & 0x1FFF)
+        return bool(self.vCoverage[offset >> 3] & (1 << (offset & 0x07)))
+
+    def CoveredBytes(self) -> int:
+        """Number of distinct PRG-ROM opcode addresses executed"""
+        return sum(bin(b).count("1") for b in self.vCoverage)
+
+    def Hotspots(self, n: int = 20) -> list:
+        """The n most sampled instructions
+
+        :return: [(hits, bank, addr, text)] most hits first
+        """
+        top = sorted(self.hits.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(count, bank, addr, self.__Decode(bank, addr)[0]) for (bank, addr), count in top]
+
+    def __Decode(self, bank: int, addr: int) -> (str, int):
+        if bank < 0:
+            read = lambda a: self.bus.cpuRead(a & 0xFFFF, True)
+        else:
+            start = bank * 0x2000
+            memory = self.__vPRGMemory
+            read = lambda a: memory[(start + (a & 0x1FFF)) % len(memory)]
+        return Cpu6502.DecodeInstruction(addr, read(addr), read(addr + 1), read(addr + 2))
+
+    def AnnotatedDisassembly(self) -> str:
+        """Disassembly of every executed instruction with its sampled hit count
+
+        Banks are listed in order at the cpu address they first ran at, runs of
+        code that never executed are shown as a gap.
+        """
+        lines = []
+        for bank in range(self.nPRGBanks):
+            if self.pBankBase[bank] < 0:
+                continue
+            lines.append("; PRG bank {} (8KB) at ${:04X}".format(bank, self.pBankBase[bank]))
+            lines += self.__Listing(bank, range(self.pBankBase[bank], self.pBankBase[bank] + 0x2000))
+        if any(self.vRamCoverage):
+            lines.append("; RAM / cartridge $0000 ~ $7FFF")
+            lines += self.__Listing(-1, range(0x0000, 0x8000))
+        return "\n".join(lines) + "\n"
+
+    def __Listing(self, bank: int, addresses: range) -> list:
+        lines = []
+        bGap = False
+        addr = addresses.start
+        while addr < addresses.stop:
+            if not self.Covered(bank, addr):
+                bGap = True
+                addr += 1
+                continue
+            if bGap and lines:
+                lines.append("        ...")
+            bGap = False
+            text, nLength = self.__Decode(bank, addr)
+            lines.append("{:>8} ${:04X}: {}".format(self.hits.get((bank, addr), ""), addr, text))
+            addr += nLength
+        return lines
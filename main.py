@@ -4,13 +4,19 @@ from cartridge import Cartridge
 
 
 class RingNES(object):
-    def __init__(self):
+    def __init__(self, path: str = "./Rom/mario.nes", run_ahead: int = 0):
+        """
+        :param path: the .nes file to run
+        :param run_ahead: number of frames to run ahead of the real emulation,
+            hides that many frames of game internal input lag
+        """
         self.bus = Bus()
-        self.cart = Cartridge("./Rom/mario.nes")
+        self.cart = Cartridge(path)
         self.screen = None
 
         self.bEmulationRun = False
         self.fResidualTime = 0.0
+        self.nRunAhead = run_ahead
 
     def Start(self):
         if self.onUserCreate():
@@ -32,13 +38,43 @@ class RingNES(object):
                 self.fResidualTime -= fElapsedTime
             else:
                 self.fResidualTime += (1.0 / 60.0) - fElapsedTime
-                while not self.bus.ppu.frame_complete:
-                    self.bus.clock()
-                self.bus.ppu.frame_complete = False
+                self.StepFrame()
         else:
             pass
         return True
 
+    def StepFrame(self):
+        """Emulate one host frame
+
+        Without run-ahead the frame is simply emulated and rendered.
+        With run-ahead the real frame is emulated and saved,
+        then nRunAhead frames are emulated with the same input, only the last
+        one is rendered, and the saved state is restored. The screen shows
+        the game nRunAhead frames into the future, while the bus counters
+        (nFrame, nLagFrames, bLagFrame) are back to the real frame: the save
+        state holds them. Bus.frame_hook only sees the real frame, which is
+        rendered while a hook is set, so a FrameHashLog logs the same frames
+        as without run-ahead.
+        """
+        if self.nRunAhead <= 0:
+            self.__RunFrame(True)
+            return
+        hook = self.bus.frame_hook
+        self.__RunFrame(hook is not None)
+        state = self.bus.save_state()
+        self.bus.frame_hook = None
+        try:
+            for i in range(self.nRunAhead):
+                self.__RunFrame(i == self.nRunAhead - 1)
+        finally:
+            self.bus.frame_hook = hook
+        self.bus.load_state(state)
+
+    def __RunFrame(self, bRender: bool):
+        self.bus.ppu.bRender = bRender
+        self.bus.clockFrame()
+        self.bus.ppu.bRender = True
+
 
 def main():
     nes = RingNES()
@@ -0,0 +1,180 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Input Movie
+
+The pad buttons of every frame plus periodic save state keyframes, in one
+seekable file. The emulation is deterministic, so the inputs replay the
+run exactly, the keyframes let playback start anywhere instead of from
+the first frame:
+
+ | HEADER    : magic "RNMV", version, keyframe interval, first frame (Bus.nFrame),
+ |             frames, keyframes, PRG-ROM CRC32, offset of the inputs
+ | keyframes : zlib compressed save states, written while recording
+ | inputs    : pad 1 buttons of every frame, then pad 2
+ | INDEX     : (frame, offset, size) of every keyframe, by frame
+
+Keyframe k holds the state before movie frame INDEX[k].frame is emulated,
+the first one is taken when recording starts, so a movie may start from
+power on as well as from any state.
+
+    with MovieRecorder(bus, "run.rnm", keyframe_interval=600) as recorder:
+        for buttons in script:
+            bus.controller[0] = buttons
+            recorder.clockFrame()
+
+    with Movie("run.rnm") as movie:
+        movie.seek(bus, 54000)        # nearest keyframe, then at most 599 frames
+        bus.clockFrame()              # playback goes on from the schedules
+
+The header is written again on close with the frame counts and the inputs
+offset, a recording that was not closed has no inputs and no index.
+
+"""
+
+import bisect
+import struct
+import zlib
+
+from bus import Bus
+
+MOVIE_MAGIC = b'RNMV'
+MOVIE_VERSION = 1
+MOVIE_HEADER = struct.Struct('<4sHHIIIIQ')
+MOVIE_KEYFRAME = struct.Struct('<IQI')
+
+
+def RomCRC(bus: Bus) -> int:
+    return zlib.crc32(bus.GetCartridge().vPRGMemory)
+
+
+class MovieRecorder(object):
+    def __init__(self, bus: Bus, path: str, keyframe_interval: int = 600, level: int = 1):
+        """
+        :param bus: the emulator, recording starts from its current state
+        :param path: the movie file, overwritten
+        :param keyframe_interval: frames between keyframes
+        :param level: zlib compression level of the keyframes
+        """
+        self.bus = bus
+        self.nKeyInterval = max(keyframe_interval, 1)
+        self.nLevel = level
+        self.nFirst = bus.nFrame
+        self.nFrames = 0
+        self.__inputs = (bytearray(), bytearray())
+        self.__index = []
+        self.__file = open(path, 'wb')
+        self.__writeHeader(0)
+        self.__keyframe()
+
+    def __writeHeader(self, nInputs: int):
+        self.__file.seek(0)
+        self.__file.write(MOVIE_HEADER.pack(MOVIE_MAGIC, MOVIE_VERSION, min(self.nKeyInterval, 0xFFFF),
+                                            self.nFirst, self.nFrames, len(self.__index), RomCRC(self.bus),
+                                            nInputs))
+
+    def __keyframe(self):
+        state = zlib.compress(self.bus.save_state(), self.nLevel)
+        self.__index.append((self.nFrames, self.__file.tell(), len(state)))
+        self.__file.write(state)
+
+    def clockFrame(self, pause_gc: bool = False, skip_lag: int = 0) -> int:
+        """Emulate a frame (Bus.clockFrame) and record the buttons it latched
+
+        :return: number of frames emulated
+        """
+        if self.nFrames - self.__index[-1][0] >= self.nKeyInterval:
+            self.__keyframe()
+        nFrames = self.bus.clockFrame(pause_gc, skip_lag)
+        # With any input source the bus leaves the buttons last latched in controller
+        for pad in (0, 1):
+            self.__inputs[pad].extend(bytes([self.bus.controller[pad] & 0xFF]) * nFrames)
+        self.nFrames += nFrames
+        return nFrames
+
+    def close(self):
+        if self.__file is None:
+            return
+        nInputs = self.__file.tell()
+        self.__file.write(self.__inputs[0])
+        self.__file.write(self.__inputs[1])
+        for entry in self.__index:
+            self.__file.write(MOVIE_KEYFRAME.pack(*entry))
+        self.__writeHeader(nInputs)
+        self.__file.close()
+        self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Movie(object):
+    def __init__(self, path: str):
+        self.__file = open(path, 'rb')
+        (magic, version, self.nKeyInterval, self.nFirst, self.nFrames, nKeyframes,
+         self.nRomCRC, nInputs) = MOVIE_HEADER.unpack(self.__file.read(MOVIE_HEADER.size))
+        if magic != MOVIE_MAGIC or version != MOVIE_VERSION:
+            self.__file.close()
+            raise ValueError("Not a version {} movie".format(MOVIE_VERSION))
+        if nInputs == 0:
+            self.__file.close()
+            raise ValueError("Movie {} was not closed after recording".format(path))
+        self.__file.seek(nInputs)
+        self.vInputs = (self.__file.read(self.nFrames), self.__file.read(self.nFrames))
+        self.pIndex = [MOVIE_KEYFRAME.unpack(self.__file.read(MOVIE_KEYFRAME.size)) for _ in range(nKeyframes)]
+        self.__frames = [entry[0] for entry in self.pIndex]
+
+    def __len__(self) -> int:
+        return self.nFrames
+
+    def keyframe(self, frame: int) -> (int, bytes):
+        """The nearest keyframe at or before a movie frame
+
+        :return: its movie frame and save state
+        """
+        _, offset, size = entry = self.pIndex[bisect.bisect_right(self.__frames, frame) - 1]
+        self.__file.seek(offset)
+        return entry[0], zlib.decompress(self.__file.read(size))
+
+    def attach(self, bus: Bus):
+        """Feed the recorded buttons to the bus as input schedules, indexed by Bus.nFrame"""
+        prefix = bytes(self.nFirst)
+        bus.SetInput(0, prefix + self.vInputs[0])
+        bus.SetInput(1, prefix + self.vInputs[1])
+
+    def seek(self, bus: Bus, frame: int, render: bool = True) -> int:
+        """Put the emulator before movie frame frame, ready to play on from there
+
+        :param bus: an emulator with the movie's cartridge inserted
+        :param frame: 0 ~ len(movie), len(movie) is the end of the recording
+        :param render: render the last frame emulated to get there, the screen is not part of a save state
+        :return: number of frames fast-forwarded from the keyframe
+        """
+        if not 0 <= frame <= self.nFrames:
+            raise IndexError("Frame {} is outside the movie (0 ~ {})".format(frame, self.nFrames))
+        if RomCRC(bus) != self.nRomCRC:
+            raise ValueError("The movie was recorded with another ROM")
+        nKey, state = self.keyframe(frame)
+        bus.load_state(state)
+        self.attach(bus)
+        ppu = bus.ppu
+        bRender = ppu.bRender
+        for n in range(nKey, frame):
+            ppu.bRender = render and n == frame - 1
+            bus.clockFrame()
+        ppu.bRender = bRender
+        return frame - nKey
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -3,21 +3,72 @@ Author: Henry-Sky <https://github.com/Henry-Sky>
 Date: 2024-06-24
 """
 
+import copy
+import struct
+
 from cartridge import Cartridge
 from sprite import Sprite
-from utils import TILE, MIRROR, Pixel, PalInit
+from utils import TILE, MIRROR, MAPPER_CAPS, Pixel, PalInit
+
+# Byte order of an OAM entry
+OAM_FIELDS = ("y", "id", "attribute", "x")
+# Bit reversed bytes, for horizontally flipped sprites
+FLIP_BYTE = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
 
 
 class Ppu2c02:
+    """Save state layout
+
+     | STATE   : scanline, cycle, scanline clocks, irq clock, odd_frame, nmi, irq, frame_complete,
+     |           ppu_data_buffer, address_latch, fine_x, vram_addr, tram_addr, control, mask, status,
+     |           bg next tile id/attrib/lsb/msb, 4 bg shifters, oam_addr, sprite_count,
+     |           sprite zero hit possible / being rendered
+     | 8 * 2B  : sprite shifters lo, hi
+     | 8 * 4B  : spriteScanline (y, id, attribute, x)
+     | 64 * 4B : OAM (y, id, attribute, x)
+     | 2 * 1KB : name tables
+     | 32B     : palette
+    """
+    STATE = struct.Struct('<hHQq4?3B2H3B4B4H2B2?')
+    OAM_STATE = struct.Struct('<256B')
+    SPRITE_STATE = struct.Struct('<16B32B')
+    # System palette, the Pixels are shared by every ppu
+    palScreen = PalInit()
+    __slots__ = ("__scanline", "__cycle", "odd_frame", "__cart", "__chrBank", "__bMapperScanline",
+                 "nmi", "irq", "bRender", "scanline_trigger", "nScanlineClocks", "nIRQClock", "frame_complete",
+                 "ppu_data_buffer", "address_latch", "fine_x", "vram_addr", "tram_addr",
+                 "__control", "__mask", "__status",
+                 "sprScreen", "bScreenSprite", "vScreenIndex", "pReducedScreen", "sprNameTable", "sprPatternTable",
+                 "__tblName", "__tblPalette",
+                 "bg_next_tile_id", "bg_next_tile_attrib", "bg_next_tile_lsb", "bg_next_tile_msb",
+                 "bg_shifter_pattern_lo", "bg_shifter_pattern_hi", "bg_shifter_attrib_lo", "bg_shifter_attrib_hi",
+                 "oam_addr", "OAM", "sprite_count", "spriteScanline",
+                 "sprite_shifter_pattern_lo", "sprite_shifter_pattern_hi",
+                 "bSpriteZEroHitPossible", "bSpriteZeroBeingRendered")
+
     def __init__(self):
         self.__scanline = 0
         self.__cycle = 0
         self.odd_frame = False
 
         self.__cart = None
+        # Active CHR windows published by the mapper
+        self.__chrBank = None
+        # Only call the mapper scanline hook if it needs one
+        self.__bMapperScanline = False
 
         self.nmi = False
+        self.irq = False
+        # If false the frame is emulated without producing pixels (run-ahead, headless)
+        self.bRender = True
         self.scanline_trigger = False
+        # Scanline scheduler: nScanlineClocks counts the scanline clocks (dot 260 of the
+        # pre-render and visible lines while rendering) since power on, mappers read it
+        # to bring their counters up to date. A mapper registers the clock its irq fires on
+        # in nIRQClock (-1 for none), the ppu then calls its scanline() hook
+        # on that clock only and raises irq for the bus.
+        self.nScanlineClocks = 0
+        self.nIRQClock = -1
         self.frame_complete = False
 
         # Internal communications
@@ -94,17 +145,22 @@ class Ppu2c02:
          
         """
 
-        self.palScreen = PalInit()
         self.sprScreen = Sprite(256, 240)
-        self.sprNameTable = [Sprite(256, 240)] * 2
-        self.sprPatternTable = [Sprite(128, 128)] * 2
+        # Screen output, see SetScreenOutput
+        #  bScreenSprite  : draw Pixels into sprScreen
+        #  vScreenIndex   : 256 * 240 system palette indices (0 ~ 63) row by row, None if off
+        #  pReducedScreen : cropped / decimated / gray frame (screen.ScreenFormat), None if off
+        self.bScreenSprite = True
+        self.vScreenIndex = None
+        self.pReducedScreen = None
+        # Debug views, only created on first use (see GetNameTable, GetPatternTable)
+        self.sprNameTable = [None, None]
+        self.sprPatternTable = [None, None]
 
         # 2KB = 2 * (960B[NameTable] + 64B[AttributeTable])
-        self.__tblName = [[0] * 1024] * 2
-        # 8KB = 2 * 4KB[PatternTable]
-        self.__tblPattern = [[0] * 4096] * 2
+        self.__tblName = [bytearray(1024) for i in range(2)]
         # Colour Rom
-        self.__tblPalette = [0] * 32
+        self.__tblPalette = bytearray(32)
 
         # Background rendering
         self.bg_next_tile_id = 0x00
@@ -118,9 +174,10 @@ class Ppu2c02:
 
         #  Foreground rendering
         self.oam_addr = 0x00
-        self.OAM = [TILE(0x00, 0x00, 0x00, 0x00)] * 64
+        self.OAM = [TILE(0x00, 0x00, 0x00, 0x00) for i in range(64)]
         self.sprite_count = 0
-        self.spriteScanline = [TILE(0, 0, 0, 0)] * 8
+        # Copies of the OAM entries on this scanline, their x is counted down while rendering
+        self.spriteScanline = [TILE(0, 0, 0, 0) for i in range(8)]
         self.sprite_shifter_pattern_lo = [0b0] * 8
         self.sprite_shifter_pattern_hi = [0b0] * 8
         self.bSpriteZEroHitPossible = False
@@ -129,7 +186,24 @@ class Ppu2c02:
     def GetScreen(self):
         return self.sprScreen
 
+    def SetScreenOutput(self, sprite: bool = True, index: bool = False, reduced=None):
+        """Choose what a rendered frame (bRender) produces
+
+        :param sprite: Pixels in sprScreen, as the GUI shows them
+        :param index: system palette indices in vScreenIndex, one byte per pixel,
+            much cheaper to produce and convert than the Pixels
+        :param reduced: a screen.ScreenFormat the frame is also sampled into
+        """
+        self.bScreenSprite = sprite
+        self.pReducedScreen = reduced
+        if not index:
+            self.vScreenIndex = None
+        elif self.vScreenIndex is None:
+            self.vScreenIndex = bytearray(256 * 240)
+
     def GetNameTable(self, i: int):
+        if self.sprNameTable[i] is None:
+            self.sprNameTable[i] = Sprite(256, 240)
         return self.sprNameTable[i]
 
     def GetPatternTable(self, i: int, palette: int):
@@ -160,6 +234,8 @@ class Ppu2c02:
         The planes are stored as 8 bytes of LSB, followed by 8 bytes of MSB
 
         """
+        if self.sprPatternTable[i] is None:
+            self.sprPatternTable[i] = Sprite(128, 128)
         for y in range(16):
             for x in range(16):
                 nOffset = y * 256 + x * 16
@@ -187,6 +263,8 @@ class Ppu2c02:
 
     def connectCart(self, cart: Cartridge):
         self.__cart = cart
+        self.__chrBank = cart.GetMapper().vCHRBank
+        self.__bMapperScanline = bool(cart.GetMapper().CAPS & MAPPER_CAPS.SCANLINE)
 
     def reset(self):
         self.fine_x = 0x00
@@ -206,33 +284,135 @@ class Ppu2c02:
         self.vram_addr = 0x0000
         self.tram_addr = 0x0000
 
+    def save_state(self) -> bytes:
+        tiles = []
+        for tile in self.spriteScanline:
+            tiles += (tile.y & 0xFF, tile.id & 0xFF, tile.attribute & 0xFF, tile.x & 0xFF)
+        oam = []
+        for tile in self.OAM:
+            oam += (tile.y & 0xFF, tile.id & 0xFF, tile.attribute & 0xFF, tile.x & 0xFF)
+        return b''.join((
+            self.STATE.pack(
+                self.__scanline, self.__cycle, self.nScanlineClocks, self.nIRQClock,
+                self.odd_frame, self.nmi, self.irq, self.frame_complete,
+                self.ppu_data_buffer & 0xFF, self.address_latch, self.fine_x,
+                self.vram_addr & 0xFFFF, self.tram_addr & 0xFFFF,
+                self.__control, self.__mask, self.__status & 0xFF,
+                self.bg_next_tile_id, self.bg_next_tile_attrib, self.bg_next_tile_lsb, self.bg_next_tile_msb,
+                self.bg_shifter_pattern_lo, self.bg_shifter_pattern_hi,
+                self.bg_shifter_attrib_lo, self.bg_shifter_attrib_hi,
+                self.oam_addr, self.sprite_count,
+                self.bSpriteZEroHitPossible, self.bSpriteZeroBeingRendered
+            ),
+            # Only bit 7 of the sprite shifters is ever looked at
+            bytes([v & 0xFF for v in self.sprite_shifter_pattern_lo]),
+            bytes([v & 0xFF for v in self.sprite_shifter_pattern_hi]),
+            bytes(tiles),
+            bytes(oam),
+            bytes(self.__tblName[0]),
+            bytes(self.__tblName[1]),
+            bytes(self.__tblPalette),
+        ))
+
+    def load_state(self, buf, offset: int = 0) -> int:
+        """Unpack the ppu state at offset
+
+        :return: the offset following the ppu state
+        """
+        buf = memoryview(buf)
+        (self.__scanline, self.__cycle, self.nScanlineClocks, self.nIRQClock,
+         self.odd_frame, self.nmi, self.irq, self.frame_complete,
+         self.ppu_data_buffer, self.address_latch, self.fine_x,
+         self.vram_addr, self.tram_addr,
+         self.__control, self.__mask, self.__status,
+         self.bg_next_tile_id, self.bg_next_tile_attrib, self.bg_next_tile_lsb, self.bg_next_tile_msb,
+         self.bg_shifter_pattern_lo, self.bg_shifter_pattern_hi,
+         self.bg_shifter_attrib_lo, self.bg_shifter_attrib_hi,
+         self.oam_addr, self.sprite_count,
+         self.bSpriteZEroHitPossible, self.bSpriteZeroBeingRendered) = self.STATE.unpack_from(buf, offset)
+        offset += self.STATE.size
+
+        sprites = self.SPRITE_STATE.unpack_from(buf, offset)
+        offset += self.SPRITE_STATE.size
+        self.sprite_shifter_pattern_lo[:] = sprites[0:8]
+        self.sprite_shifter_pattern_hi[:] = sprites[8:16]
+        for i in range(8):
+            tile = self.spriteScanline[i]
+            tile.y, tile.id, tile.attribute, tile.x = sprites[16 + i * 4:20 + i * 4]
+
+        oam = self.OAM_STATE.unpack_from(buf, offset)
+        offset += self.OAM_STATE.size
+        for i in range(64):
+            tile = self.OAM[i]
+            tile.y, tile.id, tile.attribute, tile.x = oam[i * 4:i * 4 + 4]
+
+        self.__tblName[0][:] = buf[offset:offset + 1024]
+        self.__tblName[1][:] = buf[offset + 1024:offset + 2048]
+        offset += 2048
+        self.__tblPalette[:] = buf[offset:offset + 32]
+        return offset + 32
+
+    def clone(self, render: bool = False):
+        """Copy of the ppu state, connect it to a cartridge before use
+
+        The palette and the debug name/pattern table sprites are shared.
+        Copying the screen costs more than the whole state, so by default the
+        clone does not render and only shows the screen of the original.
+
+        :param render: give the clone its own copy of the screen and render into it
+        """
+        ppu = copy.copy(self)
+        ppu.bRender = render
+        if render:
+            ppu.sprScreen = copy.copy(self.sprScreen)
+            ppu.sprScreen.ColData = self.sprScreen.ColData[:]
+        if self.vScreenIndex is not None:
+            ppu.vScreenIndex = self.vScreenIndex[:]
+        if self.pReducedScreen is not None:
+            ppu.pReducedScreen = self.pReducedScreen.copy()
+        ppu.__tblName = [table[:] for table in self.__tblName]
+        ppu.__tblPalette = self.__tblPalette[:]
+        ppu.OAM = [TILE(t.y, t.id, t.attribute, t.x) for t in self.OAM]
+        ppu.spriteScanline = [TILE(t.y, t.id, t.attribute, t.x) for t in self.spriteScanline]
+        ppu.sprite_shifter_pattern_lo = self.sprite_shifter_pattern_lo[:]
+        ppu.sprite_shifter_pattern_hi = self.sprite_shifter_pattern_hi[:]
+        return ppu
+
+    def writeOAM(self, addr: int, data: int):
+        """Write byte addr of OAM, entry addr >> 2 field addr & 3 (y, id, attribute, x)
+
+        The entry is changed in place, a DMA does not allocate.
+        """
+        setattr(self.OAM[addr >> 2], OAM_FIELDS[addr & 0x03], data)
+
+    def readOAM(self, addr: int) -> int:
+        return getattr(self.OAM[addr >> 2], OAM_FIELDS[addr & 0x03])
+
     def cpuWrite(self, addr: int, data: int):
         if addr == 0x0000:  # Control
             self.__control = data
-            self.tram_addr = (self.tram_addr & 0xC0) | (self.__control & 0x3F)
+            # tram_addr->nametable_x, nametable_y
+            self.tram_addr = (self.tram_addr & 0xF3FF) | ((data & 0x03) << 10)
         elif addr == 0x0001:  # Mask
             self.__mask = data
         elif addr == 0x0002:  # Status: Not readable
             pass
         elif addr == 0x0003:  # OAM Address: Not readable
-            pass
+            self.oam_addr = data
         elif addr == 0x0004:  # OAM Data
-            tx = data & 0xFF_00_00_00 >> 24
-            ta = data & 0x00_FF_00_00 >> 16
-            ti = data & 0x00_00_FF_00 >> 8
-            ty = data & 0x00_00_00_FF >> 0
-            self.OAM[self.oam_addr] = TILE(ty, ti, ta, tx)
+            self.writeOAM(self.oam_addr, data)
+            self.oam_addr = (self.oam_addr + 1) & 0xFF
         elif addr == 0x0005:  # Scroll
             if self.address_latch == 0:
                 self.fine_x = data & 0x0007
                 # tram_addr->coarse_x = data >> 3
-                self.tram_addr = (self.tram_addr & 0x07FF) | ((data >> 3) << 11)
+                self.tram_addr = (self.tram_addr & 0xFFE0) | (data >> 3)
                 self.address_latch = 1
             else:
                 # tram_addr->fine_y = data & 0x07
-                self.tram_addr = (self.tram_addr & 0xFFF1) | (data & 0x07 << 1)
+                self.tram_addr = (self.tram_addr & 0x8FFF) | ((data & 0x07) << 12)
                 # tram_addr->coarse_y = data >> 3
-                self.tram_addr = (self.tram_addr & 0xF83F) | ((data >> 3) << 6)
+                self.tram_addr = (self.tram_addr & 0xFC1F) | ((data >> 3) << 5)
                 self.address_latch = 0
         elif addr == 0x0006:
             if self.address_latch == 0:
@@ -244,7 +424,7 @@ class Ppu2c02:
                 self.address_latch = 0
         elif addr == 0x0007:
             self.ppuWrite(self.vram_addr, data)
-            self.vram_addr += 32 if self.__control >= (1 << 5) else 1
+            self.vram_addr += 32 if self.__control & 0x04 else 1
         else:
             pass
 
@@ -301,7 +481,7 @@ class Ppu2c02:
             elif addr == 0x0003:
                 pass
             elif addr == 0x0004:
-                data = self.OAM[self.oam_addr]
+                data = self.readOAM(self.oam_addr)
             elif addr == 0x0005:
                 pass
             elif addr == 0x0006:
@@ -311,7 +491,7 @@ class Ppu2c02:
                 self.ppu_data_buffer = self.ppuRead(self.vram_addr)
                 if self.vram_addr >= 0x3F00:
                     data = self.ppu_data_buffer
-                self.vram_addr += 32 if self.__control >= (1 << 5) else 1
+                self.vram_addr += 32 if self.__control & 0x04 else 1
             else:
                 pass
         return data
@@ -331,11 +511,10 @@ class Ppu2c02:
 
         """
         addr &= 0x3FFF
-        flag, data = self.__cart.ppuRead(addr)
-        if flag:
-            pass
-        elif 0x0000 <= addr <= 0x1FFF:
-            data = self.__tblPattern[(addr & 0x1000) >> 12][addr & 0x0FFF]
+        data = 0x00
+        if addr <= 0x1FFF:
+            # Pattern tables, straight out of the active CHR bank
+            data = self.__chrBank[addr >> 10][addr & 0x03FF]
         elif 0x2000 <= addr <= 0x3EFF:
             addr &= 0x0FFF
             if self.__cart.Mirror() == MIRROR.VERTICAL:
@@ -386,11 +565,9 @@ class Ppu2c02:
         addr &= 0x3FFF
         if self.__cart.ppuWrite(addr, data):
             pass
-        elif 0x0000 <= addr <= 0x1FFF:
-            self.__tblPattern[(addr & 0x1000) >> 12][addr & 0x0FFF] = data
         elif 0x2000 <= addr <= 0x3EFF:
             addr &= 0x0FFF
-            if self.__cart.mirror == MIRROR.VERTICAL:
+            if self.__cart.Mirror() == MIRROR.VERTICAL:
                 if 0x0000 <= addr <= 0x03FF:
                     self.__tblName[0][addr & 0x03FF] = data
                 elif 0x0400 <= addr <= 0x07ff:
@@ -399,7 +576,7 @@ class Ppu2c02:
                     self.__tblName[0][addr & 0x03FF] = data
                 elif 0x0c00 <= addr <= 0x0FFF:
                     self.__tblName[1][addr & 0x03FF] = data
-            elif self.__cart.mirror == MIRROR.HORIZONTAL:
+            elif self.__cart.Mirror() == MIRROR.HORIZONTAL:
                 if 0x0000 <= addr <= 0x03FF:
                     self.__tblName[0][addr & 0x03FF] = data
                 elif 0x0400 <= addr <= 0x07FF:
@@ -415,87 +592,87 @@ class Ppu2c02:
             elif addr == 0x0014:
                 addr = 0x0004
             elif addr == 0x0018:
-                addr = 0x0B08
+                addr = 0x0008
             elif addr == 0x001C:
                 addr = 0x000C
             self.__tblPalette[addr] = data
 
-    def clock(self):
-        # Increment the background tile "pointer" one tile/column horizontally
-        def IncrementScrollX():
-            # Only if rendering is enabled
-            if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
-                if self.vram_addr & 0x0000001F == 31:
-                    self.vram_addr &= 0x0000FFE0
-                    self.vram_addr ^= (1 << 10)
-                else:
-                    self.vram_addr += 1
+    # Increment the background tile "pointer" one tile/column horizontally
+    def __IncrementScrollX(self):
+        # Only if rendering is enabled
+        if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
+            if self.vram_addr & 0x0000001F == 31:
+                self.vram_addr &= 0x0000FFE0
+                self.vram_addr ^= (1 << 10)
+            else:
+                self.vram_addr += 1
 
-        def IncrementScrollY():
-            if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
-                if (self.vram_addr & 0x00007000) >> 12 < 7:
-                    self.vram_addr += 0x1000
+    def __IncrementScrollY(self):
+        if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
+            if (self.vram_addr & 0x00007000) >> 12 < 7:
+                self.vram_addr += 0x1000
+            else:
+                self.vram_addr &= 0x00008FFF
+                if self.vram_addr & 0x000003E0 >> 5 == 29:
+                    # Set the coarse_y = 0
+                    self.vram_addr &= 0x0000FC1F
+                    # Set the ~nametable_y
+                    self.vram_addr ^= (1 << 11)
+                elif self.vram_addr & 0x000003E0 >> 5 == 31:
+                    # Set the coarse_y = 0
+                    self.vram_addr &= 0x0000FC1F
                 else:
-                    self.vram_addr &= 0x00008FFF
-                    if self.vram_addr & 0x000003E0 >> 5 == 29:
-                        # Set the coarse_y = 0
-                        self.vram_addr &= 0x0000FC1F
-                        # Set the ~nametable_y
-                        self.vram_addr ^= (1 << 11)
-                    elif self.vram_addr & 0x000003E0 >> 5 == 31:
-                        # Set the coarse_y = 0
-                        self.vram_addr &= 0x0000FC1F
-                    else:
-                        # Set the coarse_y ++
-                        self.vram_addr += (1 << 5)
-
-        def TransferAddressX():
-            if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
-                # set vram_name_tablex = tram_name_table.
-                self.vram_addr &= ~0x0400
-                self.vram_addr ^= (self.tram_addr & 0x00000400)
-                # coarse_x
-                self.vram_addr &= ~0x001F
-                self.vram_addr ^= (self.tram_addr & 0x0000001F)
-
-        def TransferAddressY():
-            if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
-                self.vram_addr &= ~0x7000
-                self.vram_addr ^= (self.tram_addr & 0x00007000)
-                self.vram_addr &= ~0x0800
-                self.vram_addr ^= (self.tram_addr & 0x00000800)
-                self.vram_addr &= ~0x03E0
-                self.vram_addr ^= (self.tram_addr & 0x000003E0)
-
-        def LoadBackgroundShifters():
-            self.bg_shifter_pattern_lo = (self.bg_shifter_pattern_lo & 0x0000FF00) | self.bg_next_tile_lsb
-            self.bg_shifter_pattern_hi = (self.bg_shifter_pattern_hi & 0x0000FF00) | self.bg_next_tile_msb
-
-            self.bg_shifter_attrib_lo = (self.bg_shifter_attrib_lo & 0x0000FF00) | (
-                0xFF if (self.bg_next_tile_attrib & 0x00000001) else 0x00)
-            self.bg_shifter_attrib_hi = (self.bg_shifter_attrib_hi & 0x0000FF00) | (
-                0xFF if (self.bg_next_tile_attrib & 0x00000002) else 0x00)
-
-        def UpdateShifters():
-            if self.__mask & 0x08:
-                self.bg_shifter_pattern_lo <<= 1
-                self.bg_shifter_pattern_lo &= 0x0000FFFF
-                self.bg_shifter_pattern_hi <<= 1
-                self.bg_shifter_pattern_hi &= 0x0000FFFF
-
-                self.bg_shifter_attrib_lo <<= 1
-                self.bg_shifter_attrib_lo &= 0x0000FFFF
-                self.bg_shifter_attrib_hi <<= 1
-                self.bg_shifter_attrib_hi &= 0x0000FFFF
-
-            if self.__mask & 0x08 and 1 <= self.__cycle < 258:
-                for x in range(self.sprite_count):
-                    if self.spriteScanline[x].x > 0:
-                        self.spriteScanline[x].x -= 1
-                    else:
-                        self.sprite_shifter_pattern_lo[x] <<= 1
-                        self.sprite_shifter_pattern_hi[x] <<= 1
+                    # Set the coarse_y ++
+                    self.vram_addr += (1 << 5)
+
+    def __TransferAddressX(self):
+        if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
+            # set vram_name_tablex = tram_name_table.
+            self.vram_addr &= ~0x0400
+            self.vram_addr ^= (self.tram_addr & 0x00000400)
+            # coarse_x
+            self.vram_addr &= ~0x001F
+            self.vram_addr ^= (self.tram_addr & 0x0000001F)
+
+    def __TransferAddressY(self):
+        if (self.__mask & (1 << 3)) or (self.__mask & (1 << 4)):
+            self.vram_addr &= ~0x7000
+            self.vram_addr ^= (self.tram_addr & 0x00007000)
+            self.vram_addr &= ~0x0800
+            self.vram_addr ^= (self.tram_addr & 0x00000800)
+            self.vram_addr &= ~0x03E0
+            self.vram_addr ^= (self.tram_addr & 0x000003E0)
+
+    def __LoadBackgroundShifters(self):
+        self.bg_shifter_pattern_lo = (self.bg_shifter_pattern_lo & 0x0000FF00) | self.bg_next_tile_lsb
+        self.bg_shifter_pattern_hi = (self.bg_shifter_pattern_hi & 0x0000FF00) | self.bg_next_tile_msb
+
+        self.bg_shifter_attrib_lo = (self.bg_shifter_attrib_lo & 0x0000FF00) | (
+            0xFF if (self.bg_next_tile_attrib & 0x00000001) else 0x00)
+        self.bg_shifter_attrib_hi = (self.bg_shifter_attrib_hi & 0x0000FF00) | (
+            0xFF if (self.bg_next_tile_attrib & 0x00000002) else 0x00)
+
+    def __UpdateShifters(self):
+        if self.__mask & 0x08:
+            self.bg_shifter_pattern_lo <<= 1
+            self.bg_shifter_pattern_lo &= 0x0000FFFF
+            self.bg_shifter_pattern_hi <<= 1
+            self.bg_shifter_pattern_hi &= 0x0000FFFF
+
+            self.bg_shifter_attrib_lo <<= 1
+            self.bg_shifter_attrib_lo &= 0x0000FFFF
+            self.bg_shifter_attrib_hi <<= 1
+            self.bg_shifter_attrib_hi &= 0x0000FFFF
+
+        if self.__mask & 0x08 and 1 <= self.__cycle < 258:
+            for x in range(self.sprite_count):
+                if self.spriteScanline[x].x > 0:
+                    self.spriteScanline[x].x -= 1
+                else:
+                    self.sprite_shifter_pattern_lo[x] <<= 1
+                    self.sprite_shifter_pattern_hi[x] <<= 1
 
+    def clock(self):
         if -1 <= self.__scanline < 240:
             if (self.__scanline == 0 and self.__cycle == 0 and self.odd_frame
                     and ((self.__mask & (1 << 3)) or (self.__mask & (1 << 4)))):
@@ -518,10 +695,10 @@ class Ppu2c02:
                 321 <= self.__cycle < 338 : 这是每条扫描线的最后一个部分，用于准备下一条扫描线的渲染数据。
                 
                 """
-                UpdateShifters()
+                self.__UpdateShifters()
                 flag = (self.__cycle - 1) % 8
                 if flag == 0:
-                    LoadBackgroundShifters()
+                    self.__LoadBackgroundShifters()
                     # Fetch the next background tile ID
                     self.bg_next_tile_id = self.ppuRead(0x2000 | (self.vram_addr & 0x00000FFF))
                     pass
@@ -551,17 +728,17 @@ class Ppu2c02:
                     pass
 
                 elif flag == 7:
-                    IncrementScrollX()
+                    self.__IncrementScrollX()
                     pass
 
             if self.__cycle == 256:
                 # End of a scanline, increase Y scroll
-                IncrementScrollY()
+                self.__IncrementScrollY()
 
             if self.__cycle == 257:
                 # Reset the x position to start a new Scanline
-                LoadBackgroundShifters()
-                TransferAddressX()
+                self.__LoadBackgroundShifters()
+                self.__TransferAddressX()
 
             if self.__cycle == 338 or self.__cycle == 340:
                 #
@@ -569,12 +746,13 @@ class Ppu2c02:
 
             if 280 <= self.__cycle < 305:
                 if self.__scanline == -1:
-                    TransferAddressY()
+                    self.__TransferAddressY()
 
             # Foreground Rendering
 
             if self.__cycle == 257 and self.__scanline >= 0:
-                self.spriteScanline = [TILE(0xFF, 0xFF, 0xFF, 0xFF)] * 8
+                for tile in self.spriteScanline:
+                    tile.y = tile.id = tile.attribute = tile.x = 0xFF
                 self.sprite_count = 0
                 for i in range(8):
                     self.sprite_shifter_pattern_lo[i] = 0
@@ -590,7 +768,9 @@ class Ppu2c02:
                         if self.sprite_count < 8:
                             if nOAMEntry == 0:
                                 self.bSpriteZEroHitPossible = True
-                            self.spriteScanline[self.sprite_count] = self.OAM[nOAMEntry]
+                            entry = self.OAM[nOAMEntry]
+                            tile = self.spriteScanline[self.sprite_count]
+                            tile.y, tile.id, tile.attribute, tile.x = entry.y, entry.id, entry.attribute, entry.x
                         self.sprite_count += 1
                     nOAMEntry += 1
 
@@ -638,14 +818,9 @@ class Ppu2c02:
                     sprite_pattern_bits_hi = self.ppuRead(sprite_pattern_addr_hi)
 
                     if self.spriteScanline[i].attribute & 0x40:
-                        def flipbyte(a):
-                            a = (a & 0xF0) >> 4 | (a & 0x0F) << 4
-                            a = (a & 0xCC) >> 2 | (a & 0x33) << 2
-                            a = (a & 0xAA) >> 1 | (a & 0x55) << 1
-                            return a
-
-                        sprite_pattern_bits_lo = flipbyte(sprite_pattern_bits_lo)
-                        sprite_pattern_bits_hi = flipbyte(sprite_pattern_bits_hi)
+                        # Flip horizontally
+                        sprite_pattern_bits_lo = FLIP_BYTE[sprite_pattern_bits_lo]
+                        sprite_pattern_bits_hi = FLIP_BYTE[sprite_pattern_bits_hi]
 
                     self.sprite_shifter_pattern_lo[i] = sprite_pattern_bits_lo
                     self.sprite_shifter_pattern_hi[i] = sprite_pattern_bits_hi
@@ -660,77 +835,101 @@ class Ppu2c02:
                 if self.__control & 0b10000000:
                     self.nmi = True
 
-        # Background
-        bg_pixel = 0x00
-        bg_palette = 0x00
-        if self.__mask & 0x08:
-            if self.__mask & 0x02 or self.__cycle >= 9:
-                bit_mux = 0x8000 >> self.fine_x
-                p0_pixel = 1 if (self.bg_shifter_pattern_lo & bit_mux) > 0 else 0
-                p1_pixel = 1 if (self.bg_shifter_pattern_hi & bit_mux) > 0 else 0
-
-                bg_pixel = (p1_pixel << 1) | p0_pixel
-
-                bg_pal0 = (self.bg_shifter_attrib_lo & bit_mux) > 0
-                bg_pal1 = (self.bg_shifter_attrib_hi & bit_mux) > 0
-
-                bg_palette = (bg_pal1 << 1) | bg_pal0
-
-        # Foreground
-        fg_pixel = 0x00
-        fg_palette = 0x00
-        fg_priority = 0x00
-
-        if self.__mask & 0x10 or self.__cycle >= 9:
-            self.bSpriteZeroBeingRendered = False
-            for i in range(self.sprite_count):
-                if self.spriteScanline[i].x == 0:
-                    fg_pixel_lo = (self.sprite_shifter_pattern_lo[i] & 0x80) > 0
-                    fg_pixel_hi = (self.sprite_shifter_pattern_hi[i] & 0x80) > 0
-                    fg_pixel = (fg_pixel_hi << 1) | fg_pixel_lo
-
-                    fg_palette = (self.spriteScanline[i].attribute & 0x03) + 0x04
-                    fg_priority = (self.spriteScanline[i].attribute & 0x20) == 0
-
-                    if fg_pixel != 0:
-                        if i == 0:
-                            self.bSpriteZeroBeingRendered = True
-
-        # Combine sprite and background
-        pixel = 0x00
-        palette = 0x00
-        if bg_pixel == 0 and fg_pixel == 0:
+        if not self.bRender and not (self.bSpriteZEroHitPossible and self.__mask & 0x80 and self.__mask & 0x10):
+            # No pixel is drawn and sprite zero can not hit: skip the pixel composition,
+            # only keep the sprite zero flag the composition would have set up to date
+            if self.__mask & 0x10 or self.__cycle >= 9:
+                self.bSpriteZeroBeingRendered = (self.sprite_count > 0 and self.spriteScanline[0].x == 0 and (
+                        self.sprite_shifter_pattern_lo[0] | self.sprite_shifter_pattern_hi[0]) & 0x80 > 0)
+        else:
+            # Background
+            bg_pixel = 0x00
+            bg_palette = 0x00
+            if self.__mask & 0x08:
+                if self.__mask & 0x02 or self.__cycle >= 9:
+                    bit_mux = 0x8000 >> self.fine_x
+                    p0_pixel = 1 if (self.bg_shifter_pattern_lo & bit_mux) > 0 else 0
+                    p1_pixel = 1 if (self.bg_shifter_pattern_hi & bit_mux) > 0 else 0
+
+                    bg_pixel = (p1_pixel << 1) | p0_pixel
+
+                    bg_pal0 = (self.bg_shifter_attrib_lo & bit_mux) > 0
+                    bg_pal1 = (self.bg_shifter_attrib_hi & bit_mux) > 0
+
+                    bg_palette = (bg_pal1 << 1) | bg_pal0
+
+            # Foreground
+            fg_pixel = 0x00
+            fg_palette = 0x00
+            fg_priority = 0x00
+
+            if self.__mask & 0x10 or self.__cycle >= 9:
+                self.bSpriteZeroBeingRendered = False
+                for i in range(self.sprite_count):
+                    if self.spriteScanline[i].x == 0:
+                        fg_pixel_lo = (self.sprite_shifter_pattern_lo[i] & 0x80) > 0
+                        fg_pixel_hi = (self.sprite_shifter_pattern_hi[i] & 0x80) > 0
+                        fg_pixel = (fg_pixel_hi << 1) | fg_pixel_lo
+
+                        fg_palette = (self.spriteScanline[i].attribute & 0x03) + 0x04
+                        fg_priority = (self.spriteScanline[i].attribute & 0x20) == 0
+
+                        if fg_pixel != 0:
+                            if i == 0:
+                                self.bSpriteZeroBeingRendered = True
+
+            # Combine sprite and background
             pixel = 0x00
             palette = 0x00
-        elif bg_pixel == 0 and fg_pixel > 0:
-            pixel = fg_pixel
-            palette = fg_palette
-        elif bg_pixel > 0 and fg_pixel == 0:
-            pixel = bg_pixel
-            palette = bg_palette
-        elif bg_pixel > 0 and fg_pixel > 0:
-            if fg_priority:
+            if bg_pixel == 0 and fg_pixel == 0:
+                pixel = 0x00
+                palette = 0x00
+            elif bg_pixel == 0 and fg_pixel > 0:
                 pixel = fg_pixel
                 palette = fg_palette
-            else:
+            elif bg_pixel > 0 and fg_pixel == 0:
                 pixel = bg_pixel
                 palette = bg_palette
-
-            if self.bSpriteZEroHitPossible and self.bSpriteZeroBeingRendered:
-                if self.__mask & 0x80 and self.__mask & 0x10:
-                    if not (self.__mask & 0x02 or self.__mask & 0x04):
-                        if 9 <= self.__cycle < 258:
-                            self.__status |= 0b01000000
-                    else:
-                        if 1 <= self.__cycle < 258:
-                            self.__status |= 0b01000000
-
-        self.sprScreen.SetPixel(self.__cycle - 1, self.__scanline, self.GetColourFromPaletteRam(palette, pixel))
+            elif bg_pixel > 0 and fg_pixel > 0:
+                if fg_priority:
+                    pixel = fg_pixel
+                    palette = fg_palette
+                else:
+                    pixel = bg_pixel
+                    palette = bg_palette
+
+                if self.bSpriteZEroHitPossible and self.bSpriteZeroBeingRendered:
+                    if self.__mask & 0x80 and self.__mask & 0x10:
+                        if not (self.__mask & 0x02 or self.__mask & 0x04):
+                            if 9 <= self.__cycle < 258:
+                                self.__status |= 0b01000000
+                        else:
+                            if 1 <= self.__cycle < 258:
+                                self.__status |= 0b01000000
+
+            if self.bRender and 0 <= self.__scanline < 240 and 1 <= self.__cycle <= 256:
+                index = self.ppuRead(0x3F00 + (palette << 2) + pixel) & 0x3F
+                if self.bScreenSprite:
+                    self.sprScreen.ColData[(self.__scanline << 8) + self.__cycle - 1] = self.palScreen[index]
+                if self.vScreenIndex is not None:
+                    self.vScreenIndex[(self.__scanline << 8) + self.__cycle - 1] = index
+                reduced = self.pReducedScreen
+                if reduced is not None:
+                    row = reduced.rows[self.__scanline]
+                    if row >= 0:
+                        col = reduced.cols[self.__cycle - 1]
+                        if col >= 0:
+                            reduced.frame[row + col] = reduced.table[index]
 
         self.__cycle += 1
-        if self.__mask & 0x08 and self.__mask & 0x10:
+        if self.__bMapperScanline and self.__mask & 0x08 and self.__mask & 0x10:
             if self.__cycle == 260 and self.__scanline < 240:
-                self.__cart.GetMapper().scanline()
+                self.nScanlineClocks += 1
+                if self.nScanlineClocks == self.nIRQClock:
+                    mapper = self.__cart.GetMapper()
+                    mapper.scanline()
+                    if mapper.irqState():
+                        self.irq = True
 
         if self.__cycle >= 341:
             self.__cycle = 0
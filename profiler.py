@@ -0,0 +1,147 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""CPU Profiler
+
+Counts executions and host time per opcode by swapping the instruction
+table of a Cpu6502 for a copy whose handlers are timed. A cpu without a
+profiler runs the shared table, so profiling costs nothing when it is off.
+
+    profiler = CpuProfiler()
+    profiler.attach(bus.cpu)
+    ...
+    profiler.detach(bus.cpu)
+    print(profiler.report())
+    profiler.dump_stats("cpu.prof")  # python -m pstats cpu.prof
+
+Per opcode the time is split into the addressing mode handler and the
+operation handler, reports aggregate it by opcode, instruction name or
+addressing mode.
+
+"""
+
+import functools
+import marshal
+import time
+
+from cpu import Cpu6502
+from utils import INSTRUCTION
+
+
+class CpuProfiler(object):
+    def __init__(self):
+        self.nCount = [0] * 256
+        self.fAddrTime = [0.0] * 256
+        self.fOpTime = [0.0] * 256
+        self.__lookup = None
+
+    def clear(self):
+        for i in range(256):
+            self.nCount[i] = 0
+            self.fAddrTime[i] = 0.0
+            self.fOpTime[i] = 0.0
+
+    def attach(self, cpu: Cpu6502):
+        """Run cpu on the timed instruction table"""
+        if self.__lookup is None:
+            self.__lookup = self.__InitLookup()
+        cpu.setLookup(self.__lookup)
+
+    @staticmethod
+    def detach(cpu: Cpu6502):
+        """Put cpu back on the shared instruction table"""
+        cpu.setLookup(None)
+
+    def __InitLookup(self) -> list:
+        if Cpu6502.LOOKUP is None:
+            Cpu6502()
+        nCount, fAddrTime, fOpTime = self.nCount, self.fAddrTime, self.fOpTime
+        clock = time.perf_counter
+        lookup = []
+        for opcode, op in enumerate(Cpu6502.LOOKUP):
+            def addrmode(cpu, _f=op.addrmode, _i=opcode):
+                start = clock()
+                result = _f(cpu)
+                fAddrTime[_i] += clock() - start
+                return result
+
+            def operate(cpu, _f=op.operate, _i=opcode):
+                start = clock()
+                result = _f(cpu)
+                fOpTime[_i] += clock() - start
+                nCount[_i] += 1
+                return result
+
+            lookup.append(INSTRUCTION(op.opname, functools.wraps(op.operate)(operate),
+                                      functools.wraps(op.addrmode)(addrmode), op.cycles))
+        return lookup
+
+    def rows(self, by: str = "opcode") -> list:
+        """Aggregated statistics sorted by total time
+
+        :param by: "opcode", "name" (instruction over all its addressing modes) or "mode"
+        :return: [(key, count, addrmode seconds, operate seconds)]
+        """
+        if Cpu6502.LOOKUP is None:
+            Cpu6502()
+        table = {}
+        for opcode, op in enumerate(Cpu6502.LOOKUP):
+            if self.nCount[opcode] == 0:
+                continue
+            mode = op.addrmode.__name__.lstrip("_")
+            if by == "opcode":
+                key = "${:02X} {} {}".format(opcode, op.opname, mode)
+            elif by == "name":
+                key = op.opname
+            elif by == "mode":
+                key = mode
+            else:
+                raise ValueError("Unknown grouping {}".format(by))
+            count, addr_time, op_time = table.get(key, (0, 0.0, 0.0))
+            table[key] = (count + self.nCount[opcode], addr_time + self.fAddrTime[opcode],
+                          op_time + self.fOpTime[opcode])
+        rows = [(key,) + value for key, value in table.items()]
+        rows.sort(key=lambda row: row[2] + row[3], reverse=True)
+        return rows
+
+    def report(self, by: str = "opcode", limit: int = 30) -> str:
+        rows = self.rows(by)
+        fTotal = sum(row[2] + row[3] for row in rows) or 1.0
+        lines = ["{:<16} {:>10} {:>10} {:>10} {:>8} {:>7}".format(
+            by, "count", "addr ms", "op ms", "ns/op", "%")]
+        for key, count, addr_time, op_time in rows[:limit]:
+            lines.append("{:<16} {:>10} {:>10.2f} {:>10.2f} {:>8.0f} {:>6.1f}%".format(
+                key, count, addr_time * 1e3, op_time * 1e3, (addr_time + op_time) / count * 1e9,
+                (addr_time + op_time) / fTotal * 100))
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        """The statistics in the format of pstats (cProfile's Profile.stats)
+
+        Every opcode is a function "cpu.py:<opcode>(NAME MODE)" whose callees are
+        its addressing mode and operation handlers.
+        """
+        if Cpu6502.LOOKUP is None:
+            Cpu6502()
+        stats = {}
+        for opcode, op in enumerate(Cpu6502.LOOKUP):
+            count = self.nCount[opcode]
+            if count == 0:
+                continue
+            mode = op.addrmode.__name__.lstrip("_")
+            func = ("cpu.py", opcode, "{} {}".format(op.opname, mode))
+            total = self.fAddrTime[opcode] + self.fOpTime[opcode]
+            stats[func] = (count, count, 0.0, total, {})
+            for name, t in (("addrmode " + mode, self.fAddrTime[opcode]), ("operate " + op.opname, self.fOpTime[opcode])):
+                handler = ("cpu.py", 0, name)
+                cc, nc, tt, ct, callers = stats.get(handler, (0, 0, 0.0, 0.0, {}))
+                callers[func] = (count, count, t, t)
+                stats[handler] = (cc + count, nc + count, tt + t, ct + t, callers)
+        return stats
+
+    def dump_stats(self, path: str):
+        """Write the statistics as a file pstats.Stats can load"""
+        with open(path, 'wb') as f:
+            marshal.dump(self.stats(), f)
@@ -0,0 +1,88 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Rewind
+
+A ring buffer of per-frame save states. Every nKeyInterval-th state is a
+keyframe, the states in between are stored as the XOR against their keyframe.
+Save states have a fixed layout, so the XOR is mostly zero bytes and zlib
+shrinks it to a few hundred bytes. All entries are zlib compressed.
+
+ | groups : [keyframe, delta, delta, ...], [keyframe, delta, ...], ...
+
+When the compressed size exceeds nBudget the oldest group is dropped as a
+whole, since its deltas can not be decoded without the keyframe.
+
+"""
+
+import zlib
+from collections import deque
+
+from bus import Bus
+
+
+def xorBytes(a: bytes, b) -> bytes:
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+class Rewind(object):
+    def __init__(self, bus: Bus, budget: int = 16 * 1024 * 1024, keyframe_interval: int = 60, level: int = 1):
+        """
+        :param bus: the emulator to snapshot and restore
+        :param budget: upper bound of the compressed states in bytes
+        :param keyframe_interval: number of frames per keyframe
+        :param level: zlib compression level
+        """
+        self.bus = bus
+        self.nBudget = budget
+        self.nKeyInterval = max(keyframe_interval, 1)
+        self.nLevel = level
+        self.nBytes = 0
+        self.__groups = deque()
+        # Uncompressed keyframe of the newest group, deltas are taken against it
+        self.__key = None
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self.__groups)
+
+    def clear(self):
+        self.__groups.clear()
+        self.__key = None
+        self.nBytes = 0
+
+    def push(self):
+        """Record the current state, call once per emulated frame"""
+        state = self.bus.save_state()
+        if not self.__groups or len(self.__groups[-1]) >= self.nKeyInterval or len(state) != len(self.__key):
+            entry = zlib.compress(state, self.nLevel)
+            self.__groups.append([entry])
+            self.__key = state
+        else:
+            entry = zlib.compress(xorBytes(state, self.__key), self.nLevel)
+            self.__groups[-1].append(entry)
+        self.nBytes += len(entry)
+
+        while self.nBytes > self.nBudget and len(self.__groups) > 1:
+            for entry in self.__groups.popleft():
+                self.nBytes -= len(entry)
+
+    def stepBack(self) -> bool:
+        """Restore the most recent recorded state and drop it
+
+        :return: false if there is nothing left to rewind to
+        """
+        if not self.__groups:
+            return False
+        group = self.__groups[-1]
+        entry = group.pop()
+        self.nBytes -= len(entry)
+        if group:
+            state = xorBytes(zlib.decompress(entry), self.__key)
+        else:
+            state = zlib.decompress(entry)
+            self.__groups.pop()
+            self.__key = zlib.decompress(self.__groups[-1][0]) if self.__groups else None
+        self.bus.load_state(state)
+        return True
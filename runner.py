@@ -0,0 +1,210 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Headless Runner
+
+Runs a ROM without any GUI and reports the emulation throughput,
+this is what CI and batch jobs call:
+
+    python runner.py Rom/mario.nes --frames 600
+    python runner.py Rom/mario.nes --seconds 10 --json
+    python runner.py Rom/mario.nes --cycles 1000000 --dump-ram ram.bin --dump-frame frame.ppm
+    python runner.py Rom/mario.nes --frames 60 --profile-cpu opcode --profile-out cpu.prof
+    python runner.py Rom/mario.nes --frames 600 --hotspots prg.asm
+    python runner.py Rom/mario.nes --frames 600 --host-time --log-interval 60
+    python runner.py Rom/mario.nes --frames 600 --gc-freeze --pause-gc
+    python runner.py Rom/mario.nes --frames 3600 --hash-log run.rnh
+
+Frames are emulated without producing pixels. When the frame is dumped
+only the last frame is rendered under a frame budget, every frame under a
+cycles or seconds budget (the dump then shows the screen as drawn when
+the budget ran out), every frame is with --hash-log.
+
+"""
+
+import argparse
+import array
+import json
+import sys
+import time
+
+from bus import Bus, FreezeHeap
+from cartridge import Cartridge
+from hashlog import FrameHashLog
+from hosttime import FrameStats, HostTimer
+from hotspot import HotspotSampler
+from profiler import CpuProfiler
+
+
+def RunHeadless(bus: Bus, frames: int = 0, cycles: int = 0, seconds: float = 0.0, render_last: bool = False,
+                pause_gc: bool = False, render: bool = False) -> dict:
+    """Run until one of the budgets is used up
+
+    :param bus: an emulator with an inserted cartridge, already reset
+    :param frames: number of frames to emulate, 0 for no limit
+    :param cycles: number of master clock ticks (ppu dots) to emulate, 0 for no limit
+    :param seconds: host time budget, checked after every frame, 0 for no limit
+    :param render_last: render the last frame. Only a frame budget knows it in advance,
+        under a cycles or seconds budget every frame is rendered instead
+    :param pause_gc: no garbage collection inside a frame (see Bus.clockFrame)
+    :param render: render every frame
+    :return: throughput statistics
+    """
+    ppu = bus.ppu
+    nStartClock = bus.GetSystemClock()
+    nStartInstructions = bus.cpu.nInstructions
+    nStartLag = bus.nLagFrames
+    nClockLimit = nStartClock + cycles if cycles > 0 else -1
+    nFrames = 0
+    # The frame a cycles or seconds budget stops at is not known in advance
+    bRenderAll = render or (render_last and (cycles > 0 or seconds > 0))
+
+    fStart = time.perf_counter()
+    while True:
+        if frames > 0 and nFrames >= frames:
+            break
+        if seconds > 0 and time.perf_counter() - fStart >= seconds:
+            break
+        ppu.bRender = bRenderAll or (render_last and nFrames == frames - 1)
+        nDone = bus.clockFrame(pause_gc, until=nClockLimit)
+        if nDone == 0:
+            # The cycles budget ran out in the middle of the frame
+            break
+        nFrames += nDone
+    fElapsed = max(time.perf_counter() - fStart, 1e-9)
+    ppu.bRender = True
+
+    nDots = bus.GetSystemClock() - nStartClock
+    nInstructions = bus.cpu.nInstructions - nStartInstructions
+    return {
+        "frames": nFrames,
+        "lag_frames": bus.nLagFrames - nStartLag,
+        "seconds": fElapsed,
+        "fps": nFrames / fElapsed,
+        "instructions": nInstructions,
+        "instructions_per_second": nInstructions / fElapsed,
+        "dots": nDots,
+        "dots_per_second": nDots / fElapsed,
+    }
+
+
+def ScreenRGB(screen) -> bytes:
+    """The pixels of a Sprite as packed RGB bytes, row by row"""
+    # Pixel.n is the pixel packed as little endian RGBA
+    rgba = array.array('I', [p.n for p in screen.ColData])
+    if sys.byteorder != 'little':
+        rgba.byteswap()
+    rgba = rgba.tobytes()
+    data = bytearray(len(screen.ColData) * 3)
+    data[0::3] = rgba[0::4]
+    data[1::3] = rgba[1::4]
+    data[2::3] = rgba[2::4]
+    return bytes(data)
+
+
+def DumpFrame(bus: Bus, path: str):
+    """Write the ppu screen as a binary PPM (P6) image"""
+    screen = bus.ppu.GetScreen()
+    with open(path, 'wb') as f:
+        f.write("P6\n{} {}\n255\n".format(screen.width, screen.height).encode())
+        f.write(ScreenRGB(screen))
+
+
+def DumpRam(bus: Bus, path: str):
+    """Write the 2KB cpu ram"""
+    with open(path, 'wb') as f:
+        f.write(bytes(bus.cpuRam))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a NES ROM headless and report the emulation throughput")
+    parser.add_argument("rom", help="the .nes file")
+    parser.add_argument("--frames", type=int, default=0, help="number of frames to emulate")
+    parser.add_argument("--cycles", type=int, default=0, help="number of master clock ticks (ppu dots) to emulate")
+    parser.add_argument("--seconds", type=float, default=0.0, help="host time budget in seconds")
+    parser.add_argument("--dump-frame", metavar="PPM",
+                        help="write the screen at the end of the run as a PPM image, only the last frame is "
+                             "rendered under --frames, every frame under --cycles or --seconds")
+    parser.add_argument("--dump-ram", metavar="BIN", help="write the final 2KB cpu ram")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--profile-cpu", choices=("opcode", "name", "mode"),
+                        help="profile the cpu and print the handlers grouped by opcode, instruction or addressing mode")
+    parser.add_argument("--profile-out", metavar="PROF", help="write the cpu profile in pstats format")
+    parser.add_argument("--hotspots", metavar="ASM", help="write the executed code as an annotated disassembly")
+    parser.add_argument("--host-time", action="store_true", help="break the frame time down per component")
+    parser.add_argument("--log-interval", type=int, default=0, metavar="N",
+                        help="with --host-time, print the mean breakdown every N frames")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="freeze the heap after loading so collections skip the emulator")
+    parser.add_argument("--pause-gc", action="store_true", help="only collect garbage between frames")
+    parser.add_argument("--hash-log", metavar="RNH",
+                        help="log the screen and ram CRC32 of every frame, compare logs with hashlog.py")
+    args = parser.parse_args(argv)
+
+    if args.frames <= 0 and args.cycles <= 0 and args.seconds <= 0:
+        args.frames = 60
+
+    cart = Cartridge(args.rom)
+    if not cart.ImageValid():
+        print("Can not load {}: invalid image or unsupported mapper {}".format(args.rom, cart.nMapperID),
+              file=sys.stderr)
+        return 1
+    bus = Bus()
+    bus.insertCartridge(cart)
+    bus.reset()
+    if args.gc_freeze:
+        FreezeHeap()
+
+    profiler = None
+    if args.profile_cpu or args.profile_out:
+        profiler = CpuProfiler()
+        profiler.attach(bus.cpu)
+    timer = None
+    if args.host_time:
+        timer = HostTimer(bus, FrameStats(log_interval=args.log_interval,
+                                          log=lambda line: print(line, file=sys.stderr)))
+        timer.attach()
+    hashes = None
+    if args.hash_log:
+        hashes = FrameHashLog(bus, args.hash_log)
+    sampler = None
+    if args.hotspots:
+        sampler = HotspotSampler(bus)
+        sampler.attach()
+    report = RunHeadless(bus, args.frames, args.cycles, args.seconds, render_last=args.dump_frame is not None,
+                         pause_gc=args.pause_gc, render=hashes is not None)
+    if hashes is not None:
+        hashes.close()
+    if timer is not None:
+        timer.detach()
+        report["host_time"] = timer.stats.mean()
+    if sampler is not None:
+        sampler.detach()
+        with open(args.hotspots, 'w') as f:
+            f.write(sampler.AnnotatedDisassembly())
+    if profiler is not None:
+        profiler.detach(bus.cpu)
+        if args.profile_out:
+            profiler.dump_stats(args.profile_out)
+    if args.dump_frame:
+        DumpFrame(bus, args.dump_frame)
+    if args.dump_ram:
+        DumpRam(bus, args.dump_ram)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("Frames: {frames} ({lag_frames} lag), Time: {seconds:.3f}s, FPS: {fps:.2f}\n"
+              "CPU: {instructions} instructions, {instructions_per_second:.0f}/s\n"
+              "PPU: {dots} dots, {dots_per_second:.0f}/s".format(**report))
+    if timer is not None and not args.json:
+        print("Mean " + timer.stats.Format(report["host_time"]))
+    if args.profile_cpu:
+        print(profiler.report(args.profile_cpu), file=sys.stderr if args.json else sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
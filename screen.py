@@ -0,0 +1,89 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Reduced Screen Output
+
+A screen format the ppu produces directly while rendering, for consumers
+that want a small frame (e.g. 84 * 84 grayscale) rather than 256 * 240 Pixels:
+
+ | crop  : (x, y, w, h) region of the 256 * 240 screen that is kept
+ | size  : (width, height) of the output, pixels are sampled nearest neighbour
+ | gray  : luma (0 ~ 255) instead of the system palette index (0 ~ 63)
+
+The sampling is precomputed into a row and a column table, the colour into
+a palette index -> byte table, so the ppu only does three lookups per kept
+pixel and nothing for the dropped ones.
+
+    fmt = ScreenFormat(size=(84, 84), crop=(0, 8, 256, 224), gray=True)
+    ppu.SetScreenOutput(sprite=False, reduced=fmt)
+    ...
+    fmt.frame                 # bytearray, height * width
+
+Max-pooling over the last two frames (flickering sprites) is done with
+keep() after the first of the two frames and pooled() after the second.
+
+"""
+
+from utils import PalInit
+
+
+def LumaTable() -> bytes:
+    """System palette index -> 8 bit luma (ITU-R BT.601)"""
+    return bytes(round(0.299 * p.red + 0.587 * p.green + 0.114 * p.blue) for p in PalInit()) + bytes(192)
+
+
+class ScreenFormat(object):
+    __slots__ = ("width", "height", "crop", "gray", "rows", "cols", "table", "frame", "previous")
+
+    def __init__(self, size: tuple = (256, 240), crop: tuple = (0, 0, 256, 240), gray: bool = False):
+        """
+        :param size: (width, height) of the output
+        :param crop: (x, y, w, h) screen region the output is sampled from
+        :param gray: output luma instead of palette indices
+        """
+        x, y, w, h = crop
+        if x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > 256 or y + h > 240:
+            raise ValueError("Crop {} is not inside the 256 * 240 screen".format(crop))
+        self.width, self.height = size
+        if not (0 < self.width <= w and 0 < self.height <= h):
+            raise ValueError("Size {} must be between 1 * 1 and the crop size".format(size))
+        self.crop = tuple(crop)
+        self.gray = gray
+        # Screen row -> offset of the output row it is sampled into, -1 if dropped
+        self.rows = [-1] * 240
+        for r in range(self.height):
+            self.rows[y + (r * h + h // 2) // self.height] = r * self.width
+        # Screen column -> output column, -1 if dropped
+        self.cols = [-1] * 256
+        for c in range(self.width):
+            self.cols[x + (c * w + w // 2) // self.width] = c
+        self.table = LumaTable() if gray else bytes(range(256))
+        self.frame = bytearray(self.width * self.height)
+        self.previous = None
+
+    @property
+    def shape(self) -> tuple:
+        return self.height, self.width
+
+    def keep(self):
+        """Keep the current frame for pooled()"""
+        if self.previous is None:
+            self.previous = bytearray(self.frame)
+        else:
+            self.previous[:] = self.frame
+
+    def pooled(self) -> bytes:
+        """Pixelwise maximum of the kept and the current frame"""
+        if self.previous is None:
+            return bytes(self.frame)
+        return bytes(map(max, self.previous, self.frame))
+
+    def copy(self):
+        fmt = ScreenFormat.__new__(ScreenFormat)
+        for name in ScreenFormat.__slots__:
+            setattr(fmt, name, getattr(self, name))
+        fmt.frame = bytearray(self.frame)
+        fmt.previous = None if self.previous is None else bytearray(self.previous)
+        return fmt
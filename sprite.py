@@ -1,11 +1,18 @@
 from utils import Pixel
 
+# Returned for pixels outside the sprite, shared instead of allocated on every miss
+BLANK = Pixel(0, 0, 0, 0)
+# Initial colour of every pixel, pixels are replaced and never changed in place so one is shared
+WHITE = Pixel(0xFF, 0xFF, 0xFF, 0xFF)
+
 
 class Sprite(object):
+    __slots__ = ("width", "height", "ColData")
+
     def __init__(self, w: int, h: int):
         self.width = w
         self.height = h
-        self.ColData = [Pixel(0xFF, 0xFF, 0xFF, 0xFF) for i in range(self.width * self.height)]
+        self.ColData = [WHITE] * (self.width * self.height)
 
     def SetPixel(self, x: int, y: int, p: Pixel) -> bool:
         if 0 <= x < self.width and 0 <= y < self.height:
@@ -18,7 +25,7 @@ class Sprite(object):
         if 0 <= x < self.width and 0 <= y < self.height:
             return self.ColData[y * self.width + x]
         else:
-            return Pixel(0, 0, 0, 0)
+            return BLANK
 
     def Clear(self, p: Pixel):
         for a in self.ColData:
@@ -0,0 +1,80 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+"""Test Fixtures
+
+The tests run on the synthetic ROMs of Benchmark/roms.py, no game image is
+needed. A frame takes a fraction of a second, so every test emulates only
+a handful of them.
+
+    python -m pytest -q
+
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Benchmark.roms import BuildProgram, Corpus, WriteCorpus
+
+# NROM, nmi on; the nmi handler reads pad 1 on every other frame into $00 and
+# adds it to $01, so half the frames are lag frames. $02 counts the nmis
+PAD_READER = """
+reset:  SEI
+        CLD
+        LDX #$FF
+        TXS
+        LDA #$80
+        STA PPUCTRL
+loop:   JMP loop
+nmi:    INC $02
+        LDA $02
+        AND #$01
+        BEQ done
+        LDA #$01
+        STA $4016
+        LDA #$00
+        STA $4016
+        LDX #$08
+read:   LDA $4016
+        LSR A
+        ROL $00
+        DEX
+        BNE read
+        LDA $00
+        CLC
+        ADC $01
+        STA $01
+done:
+irq:    RTI
+"""
+
+CORPUS = Corpus()
+
+
+@pytest.fixture(params=sorted(CORPUS))
+def image(request) -> bytes:
+    """Every synthetic ROM in turn"""
+    return CORPUS[request.param]
+
+
+@pytest.fixture
+def mmc3_image() -> bytes:
+    return CORPUS["mmc3_storm"]
+
+
+@pytest.fixture
+def pad_image() -> bytes:
+    return BuildProgram(PAD_READER)
+
+
+@pytest.fixture(scope="session")
+def rom_paths(tmp_path_factory) -> dict:
+    """{name: path} of the corpus written as .nes files"""
+    paths = WriteCorpus(str(tmp_path_factory.mktemp("roms")))
+    return {os.path.splitext(os.path.basename(path))[0]: path for path in paths}
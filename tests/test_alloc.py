@@ -0,0 +1,15 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+from Benchmark.alloc import MeasureFrames, PEAK_BUDGET, RETAINED_BUDGET
+from Benchmark.roms import MakeBus
+
+
+def test_frame_budget(image):
+    # One rendered frame once the mappers have built their bank views, tracemalloc
+    # is slow; python -m Benchmark.alloc measures more frames, headless as well
+    nRetained, nPeak = MeasureFrames(MakeBus(image), frames=1, warmup=3)
+    assert nRetained <= RETAINED_BUDGET
+    assert nPeak <= PEAK_BUDGET
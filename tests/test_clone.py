@@ -0,0 +1,29 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+from Benchmark.roms import MakeBus
+
+
+def test_clone_matches(image):
+    bus = MakeBus(image)
+    bus.clockFrame()
+    clone = bus.clone()
+    assert clone.save_state() == bus.save_state()
+    bus.clockFrame()
+    clone.clockFrame()
+    assert clone.save_state() == bus.save_state()
+
+
+def test_clone_is_independent(pad_image):
+    bus = MakeBus(pad_image)
+    bus.controller[0] = 0x01
+    bus.clockFrame()
+    state = bus.save_state()
+    clone = bus.clone()
+    clone.controller[0] = 0xFF
+    clone.clockFrame()
+    clone.clockFrame()
+    assert bus.save_state() == state
+    assert clone.cpuRam[0x00] == 0xFF and bus.cpuRam[0x00] == 0x01
@@ -0,0 +1,29 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+import pytest
+
+from cartridge import SharedRom
+from env import VecEnv
+
+
+def runEnv(rom, workers: int) -> tuple:
+    with VecEnv(rom, 4, obs_type="gray", size=(84, 84), boot_frames=3, workers=workers) as env:
+        env.reset()
+        for i in range(2):
+            obs, rewards, dones, infos = env.step([i] * 4)
+        return bytes(obs), bytes(rewards), bytes(dones), infos
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_workers_match_in_process(rom_paths, shared):
+    rom = SharedRom(rom_paths["sprites"]) if shared else rom_paths["sprites"]
+    try:
+        assert runEnv(rom, 2) == runEnv(rom, 0)
+    finally:
+        if shared:
+            # Every VecEnv released its cartridges on close
+            rom.close()
+            rom.unlink()
@@ -0,0 +1,14 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+import pytest
+
+from Benchmark.workers import CheckWorkers
+
+
+@pytest.mark.parametrize("context", [None, "spawn"])
+def test_workers(context):
+    bPassed, output = CheckWorkers(workers=2, frames=2, context=context)
+    assert bPassed, output
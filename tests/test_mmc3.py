@@ -0,0 +1,42 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+from Benchmark.roms import MakeBus
+
+
+def bootedStorm(image: bytes):
+    bus = MakeBus(image)
+    # The program waits two vblanks for the palette upload before enabling the irq
+    bus.clockFrame()
+    bus.clockFrame()
+    return bus
+
+
+def test_irq_per_frame(mmc3_image):
+    bus = bootedStorm(mmc3_image)
+    counts = []
+    for _ in range(3):
+        before = bus.cpuRam[0x04]
+        bus.clockFrame()
+        counts.append(bus.cpuRam[0x04] - before)
+    # A reload of 32 fires every 33 of the 241 scanline clocks of a frame
+    assert all(n in (7, 8) for n in counts), counts
+
+
+def test_irq_after_load_mid_frame(mmc3_image):
+    bus = bootedStorm(mmc3_image)
+    for _ in range(30000):
+        bus.clock()
+    state = bus.save_state()
+    nIRQs = bus.cpuRam[0x04]
+    other = MakeBus(mmc3_image)
+    other.load_state(state)
+    clone = bus.clone()
+    bus.clockFrame()
+    other.clockFrame()
+    clone.clockFrame()
+    assert bus.cpuRam[0x04] != nIRQs
+    assert other.save_state() == bus.save_state()
+    assert clone.save_state() == bus.save_state()
@@ -0,0 +1,53 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+import pytest
+
+from Benchmark.roms import Corpus, MakeBus
+from bus import InputSchedule
+from movie import Movie, MovieRecorder
+
+BUTTONS = [0x01, 0x02, 0x04, 0x08, 0x80]
+
+
+@pytest.fixture
+def recording(tmp_path, pad_image) -> (str, list):
+    """A movie of the pad reader, and the state before every movie frame"""
+    bus = MakeBus(pad_image)
+    bus.SetInput(0, InputSchedule(BUTTONS))
+    path = str(tmp_path / "run.rnm")
+    states = []
+    with MovieRecorder(bus, path, keyframe_interval=2) as recorder:
+        for _ in BUTTONS:
+            states.append(bus.save_state())
+            recorder.clockFrame()
+    states.append(bus.save_state())
+    return path, states
+
+
+def test_seek(recording, pad_image):
+    path, states = recording
+    with Movie(path) as movie:
+        assert len(movie) == len(BUTTONS)
+        for frame in (0, 3, len(BUTTONS)):
+            bus = MakeBus(pad_image)
+            movie.seek(bus, frame, render=False)
+            assert bus.save_state() == states[frame]
+
+
+def test_replay(recording, pad_image):
+    path, states = recording
+    bus = MakeBus(pad_image)
+    with Movie(path) as movie:
+        movie.seek(bus, 0)
+    for state in states[1:]:
+        bus.clockFrame()
+        assert bus.save_state() == state
+
+
+def test_other_rom(recording):
+    path, _ = recording
+    with Movie(path) as movie, pytest.raises(ValueError):
+        movie.seek(MakeBus(Corpus()["alu_loop"]), 0)
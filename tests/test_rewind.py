@@ -0,0 +1,33 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+from Benchmark.roms import MakeBus
+from rewind import Rewind
+
+
+def test_step_back(mmc3_image):
+    bus = MakeBus(mmc3_image)
+    rewind = Rewind(bus, keyframe_interval=2)
+    states = []
+    for _ in range(5):
+        rewind.push()
+        states.append(bus.save_state())
+        bus.clockFrame()
+    for state in reversed(states):
+        assert rewind.stepBack()
+        assert bus.save_state() == state
+    assert not rewind.stepBack()
+    assert rewind.nBytes == 0
+
+
+def test_budget_drops_oldest_group(pad_image):
+    bus = MakeBus(pad_image)
+    rewind = Rewind(bus, budget=1, keyframe_interval=2)
+    for _ in range(5):
+        rewind.push()
+    # Groups of two, only the newest one (a lone keyframe) fits the budget
+    assert len(rewind) == 1
+    assert rewind.stepBack()
+    assert not rewind.stepBack()
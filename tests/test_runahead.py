@@ -0,0 +1,38 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+from hashlog import FrameHashLog, ReadHashLog
+from main import RingNES
+
+
+def test_run_ahead_keeps_real_frame(tmp_path, pad_image):
+    path = tmp_path / "pad.nes"
+    path.write_bytes(pad_image)
+    plain = RingNES(str(path))
+    ahead = RingNES(str(path), run_ahead=2)
+    assert plain.onUserCreate() and ahead.onUserCreate()
+    for buttons in (0x01, 0x08, 0x80):
+        for nes in (plain, ahead):
+            nes.bus.controller[0] = buttons
+            nes.StepFrame()
+        assert ahead.bus.save_state() == plain.bus.save_state()
+    assert ahead.bus.nLagFrames == plain.bus.nLagFrames == 1
+
+
+def test_hash_log_sees_real_frames(tmp_path, pad_image):
+    path = tmp_path / "pad.nes"
+    path.write_bytes(pad_image)
+    logs = []
+    for run_ahead in (0, 2):
+        nes = RingNES(str(path), run_ahead=run_ahead)
+        assert nes.onUserCreate()
+        log = str(tmp_path / "{}.rnh".format(run_ahead))
+        with FrameHashLog(nes.bus, log):
+            for buttons in (0x01, 0x08, 0x80):
+                nes.bus.controller[0] = buttons
+                nes.StepFrame()
+        logs.append(ReadHashLog(log))
+    assert len(logs[1][1]) == 3
+    assert logs[1] == logs[0]
@@ -0,0 +1,60 @@
+"""
+Author: Henry-Sky <https://github.com/Henry-Sky>
+Date: 2026-10-19
+"""
+
+import mmap
+
+import pytest
+
+from Benchmark.roms import Corpus, MakeBus
+
+
+def test_round_trip(image):
+    bus = MakeBus(image)
+    bus.clockFrame()
+    state = bus.save_state()
+    other = MakeBus(image)
+    other.load_state(state)
+    assert other.save_state() == state
+    bus.clockFrame()
+    other.clockFrame()
+    assert other.save_state() == bus.save_state()
+
+
+def test_load_from_mmap(tmp_path, pad_image):
+    bus = MakeBus(pad_image)
+    bus.clockFrame()
+    state = bus.save_state()
+    path = tmp_path / "state.bin"
+    path.write_bytes(state)
+    other = MakeBus(pad_image)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        other.load_state(buf)
+    assert other.save_state() == state
+
+
+def test_controller_and_lag(pad_image):
+    bus = MakeBus(pad_image)
+    bus.controller[0] = 0x81
+    bus.controller[1] = 0x42
+    bus.clockFrame()
+    bus.clockFrame()
+    state = bus.save_state()
+    saved = (bus.controller[:], bus.nLagFrames, bus.bLagFrame, bus.bInputPolled)
+    assert bus.nLagFrames == 1
+
+    bus.controller[:] = [0x00, 0x00]
+    bus.clockFrame()
+    bus.load_state(state)
+    assert (bus.controller[:], bus.nLagFrames, bus.bLagFrame, bus.bInputPolled) == saved
+
+
+def test_rejects_other_states(pad_image):
+    bus = MakeBus(pad_image)
+    state = bytearray(bus.save_state())
+    with pytest.raises(ValueError):
+        MakeBus(Corpus()["mmc3_storm"]).load_state(state)
+    state[4] += 1  # version
+    with pytest.raises(ValueError):
+        bus.load_state(state)
@@ -1,7 +1,9 @@
-from enum import Enum
+from enum import Enum, Flag
 
 
 class INSTRUCTION:
+    __slots__ = ("opname", "operate", "addrmode", "cycles")
+
     def __init__(self, opname, operate, addrmode, cycles: int):
         self.opname = opname
         self.operate = operate
@@ -10,6 +12,8 @@ class INSTRUCTION:
 
 
 class TILE:
+    __slots__ = ("y", "id", "attribute", "x")
+
     def __init__(self, y: int, id: int, attr: int, x: int):
         self.y = y
         self.id = id
@@ -36,7 +40,17 @@ class MIRROR(Enum):
     ONESCREEN_HI = "onescreen_hi"
 
 
+class MAPPER_CAPS(Flag):
+    NONE = 0
+    IRQ = 1 << 0  # Mapper raises IRQs, the bus polls irqState
+    CHR_RAM = 1 << 1  # Pattern tables may be writable CHR-RAM
+    PRG_RAM = 1 << 2  # Cartridge ram at $6000 ~ $7FFF
+    SCANLINE = 1 << 3  # Mapper needs the ppu scanline hook
+
+
 class Pixel:
+    __slots__ = ("red", "green", "blue", "alpha", "n")
+
     def __init__(self, red: int, green: int, blue: int, alpha=0xff):
         self.red = red
         self.green = green